@@ -0,0 +1,71 @@
+"""
+Batch upload parsing for /api/remove-bg/batch
+
+Accepts either multipart/form-data (one part per image) or a zip archive
+(application/zip), and returns (name, bytes) pairs in upload order.
+"""
+import io
+import os
+import zipfile
+from email.parser import BytesParser
+from email.policy import HTTP
+
+# Max images per inference call (env: REMOVE_BG_MAX_BATCH)
+MAX_BATCH_SIZE = int(os.environ.get('REMOVE_BG_MAX_BATCH', '8'))
+# Max images per request (env: REMOVE_BG_MAX_BATCH_IMAGES)
+MAX_BATCH_IMAGES = int(os.environ.get('REMOVE_BG_MAX_BATCH_IMAGES', '64'))
+
+ZIP_TYPES = ('application/zip', 'application/x-zip-compressed')
+
+
+def read_batch_images(content_type, body):
+    """Split a batch request body into [(name, bytes), ...], preserving order"""
+    mime = content_type.split(';')[0].strip().lower()
+
+    if mime == 'multipart/form-data':
+        items = _read_multipart(content_type, body)
+    elif mime in ZIP_TYPES or body[:4] == b'PK\x03\x04':
+        items = _read_zip(body)
+    else:
+        raise ValueError("Batch upload must be multipart/form-data or a zip archive")
+
+    if not items:
+        raise ValueError("No images in batch")
+    if len(items) > MAX_BATCH_IMAGES:
+        raise ValueError(f"Too many images ({len(items)} > {MAX_BATCH_IMAGES})")
+    return items
+
+
+def _read_multipart(content_type, body):
+    # Let the email parser handle boundaries; it needs the header in front of the body
+    msg = BytesParser(policy=HTTP).parsebytes(
+        b'Content-Type: ' + content_type.encode('latin-1') + b'\r\n\r\n' + body
+    )
+    if not msg.is_multipart():
+        raise ValueError("Malformed multipart body")
+
+    items = []
+    for index, part in enumerate(msg.iter_parts()):
+        data = part.get_payload(decode=True)
+        if not data:
+            continue
+        name = part.get_filename() or part.get_param('name', header='content-disposition') or f"image_{index}"
+        items.append((name, data))
+    return items
+
+
+def _read_zip(body):
+    try:
+        archive = zipfile.ZipFile(io.BytesIO(body))
+    except zipfile.BadZipFile as e:
+        raise ValueError(f"Invalid zip archive: {e}")
+
+    items = []
+    with archive:
+        for info in archive.infolist():
+            if info.is_dir() or os.path.basename(info.filename).startswith('.'):
+                continue
+            if len(items) >= MAX_BATCH_IMAGES:
+                raise ValueError(f"Too many images (> {MAX_BATCH_IMAGES})")
+            items.append((info.filename, archive.read(info)))
+    return items
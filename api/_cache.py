@@ -0,0 +1,213 @@
+"""
+Content-addressed alpha-mask cache for /api/remove-bg
+
+Users re-preview and switch specs with the same photo, and every call used to
+re-run decode, inference and postprocess. Masks are keyed by the SHA-256 of
+the uploaded bytes plus the model identity (name, file size and mtime, so a
+model republished in place misses) and postprocessing identity, and kept in
+two tiers:
+    memory  LRU of decoded 'L' masks under a byte budget
+    disk    grayscale PNGs, evicted oldest-used first under a size budget
+Concurrent requests for the same key collapse into one computation: the first
+computes, the others wait for its result.
+
+Config (env):
+    REMOVE_BG_CACHE              1 | 0
+    REMOVE_BG_CACHE_MEMORY_MB    in-process tier budget
+    REMOVE_BG_CACHE_DISK_MB      disk tier budget, 0 disables the disk tier
+    REMOVE_BG_CACHE_DIR          disk tier directory
+"""
+import os
+import io
+import hashlib
+import tempfile
+import threading
+from collections import OrderedDict
+
+from PIL import Image
+
+CACHE_ENABLED = os.environ.get('REMOVE_BG_CACHE', '1').strip().lower() in ('1', 'true', 'yes', 'on')
+CACHE_MEMORY_MB = float(os.environ.get('REMOVE_BG_CACHE_MEMORY_MB', '256'))
+CACHE_DISK_MB = float(os.environ.get('REMOVE_BG_CACHE_DISK_MB', '512'))
+CACHE_DIR = os.environ.get('REMOVE_BG_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'remove-bg-cache'))
+
+
+class _Flight:
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class MaskCache:
+    def __init__(self, memory_mb=CACHE_MEMORY_MB, disk_mb=CACHE_DISK_MB, directory=CACHE_DIR):
+        self.memory_budget = int(memory_mb * 1024 * 1024)
+        self.disk_budget = int(disk_mb * 1024 * 1024)
+        self.directory = directory if self.disk_budget > 0 else None
+        self._memory = OrderedDict()  # key -> 'L' Image, in LRU order
+        self._memory_bytes = 0
+        self._flights = {}
+        self._lock = threading.Lock()
+        self._disk_lock = threading.Lock()
+        self._disk_bytes = None  # scanned lazily
+
+        self.counters = {
+            'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'coalesced': 0,
+            'memory_evictions': 0, 'disk_evictions': 0, 'disk_errors': 0,
+        }
+
+    @staticmethod
+    def key(data, *identity):
+        """
+        Content hash of the upload plus model / parameter identity.
+        data is the upload bytes or their precomputed SHA-256 hex digest.
+        """
+        digest = data if isinstance(data, str) else hashlib.sha256(data).hexdigest()
+        suffix = hashlib.sha256('|'.join(str(part) for part in identity).encode()).hexdigest()[:16]
+        return f"{digest}-{suffix}"
+
+    def get_or_compute(self, key, compute):
+        """
+        Cached mask for key, else compute() -> 'L' Image (stored in both tiers).
+        Returns (mask, source) with source memory | disk | coalesced | computed.
+        """
+        with self._lock:
+            mask = self._memory.get(key)
+            if mask is not None:
+                self._memory.move_to_end(key)
+                self.counters['memory_hits'] += 1
+                return mask, 'memory'
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+            else:
+                self.counters['coalesced'] += 1
+        if not leader:
+            # Another request is computing this mask: wait for it
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result, 'coalesced'
+
+        source = 'disk'
+        try:
+            mask = self._disk_get(key)
+            if mask is None:
+                source = 'computed'
+                mask = compute()
+                self._disk_put(key, mask)
+            with self._lock:
+                self.counters['disk_hits' if source == 'disk' else 'misses'] += 1
+                self._memory_put(key, mask)
+            flight.result = mask
+            return mask, source
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+            flight.done.set()
+
+    def _memory_put(self, key, mask):
+        # Caller holds self._lock
+        cost = mask.width * mask.height
+        if cost > self.memory_budget:
+            return
+        self._memory[key] = mask
+        self._memory_bytes += cost
+        while self._memory_bytes > self.memory_budget:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= evicted.width * evicted.height
+            self.counters['memory_evictions'] += 1
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.png")
+
+    def _disk_get(self, key):
+        if not self.directory:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                mask = Image.open(io.BytesIO(f.read()))
+                mask.load()
+            os.utime(path)  # mtime tracks last use for eviction
+            return mask
+        except FileNotFoundError:
+            return None
+        except Exception:
+            with self._lock:
+                self.counters['disk_errors'] += 1
+            return None
+
+    def _disk_put(self, key, mask):
+        if not self.directory:
+            return
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            buffered = io.BytesIO()
+            mask.save(buffered, format="PNG", compress_level=1)
+            data = buffered.getvalue()
+            # Private temp name, published atomically
+            tmp_path = f"{self._path(key)}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, self._path(key))
+            with self._disk_lock:
+                if self._disk_bytes is None:
+                    self._disk_bytes = self._scan()[1]
+                else:
+                    self._disk_bytes += len(data)
+                if self._disk_bytes > self.disk_budget:
+                    self._disk_evict()
+        except OSError:
+            with self._lock:
+                self.counters['disk_errors'] += 1
+
+    def _scan(self):
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith('.png'):
+                continue
+            try:
+                st = os.stat(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                continue
+            entries.append((st.st_mtime, st.st_size, name))
+        return entries, sum(size for _, size, _ in entries)
+
+    def _disk_evict(self):
+        # Caller holds self._disk_lock; drop least recently used files down to 90% of budget
+        entries, total = self._scan()
+        evicted = 0
+        for _, size, name in sorted(entries):
+            if total <= self.disk_budget * 0.9:
+                break
+            try:
+                os.remove(os.path.join(self.directory, name))
+                total -= size
+                evicted += 1
+            except FileNotFoundError:
+                pass
+        self._disk_bytes = total
+        with self._lock:
+            self.counters['disk_evictions'] += evicted
+
+    def stats(self):
+        with self._lock:
+            lookups = sum(self.counters[k] for k in ('memory_hits', 'disk_hits', 'misses', 'coalesced'))
+            hits = lookups - self.counters['misses']
+            return {
+                **self.counters,
+                'hit_rate': round(hits / lookups, 3) if lookups else 0.0,
+                'memory_entries': len(self._memory),
+                'memory_mb': round(self._memory_bytes / 2**20, 2),
+                'memory_budget_mb': round(self.memory_budget / 2**20, 1),
+                'disk_mb': round(self._disk_bytes / 2**20, 2) if self._disk_bytes is not None else None,
+                'disk_budget_mb': round(self.disk_budget / 2**20, 1),
+                'directory': self.directory,
+            }
@@ -0,0 +1,180 @@
+"""
+Response encoding and content negotiation for /api/remove-bg
+
+The cut-out used to be returned only as a base64 PNG in text/plain (+33% on
+the wire, plus a base64 pass on both ends). Clients now pick a binary format
+with the Accept header, or ?format= which takes precedence:
+    png      image/png, RGBA
+    webp     image/webp, lossless RGBA (usually smaller than PNG)
+    jpeg     image/jpeg, flattened onto ?background= (hex, default white)
+    base64   text/plain base64 PNG, the legacy mode
+Requests without an explicit image type (no Accept, */*, text/plain) keep
+getting the legacy response so older clients are unaffected.
+
+Mask-only formats skip the server-side composite: the client already holds
+the photo it uploaded and applies the alpha matte itself.
+    mask         8-bit grayscale PNG at photo resolution
+    mask-lowres  grayscale PNG at model resolution, not upsampled; the client
+                 stretches it to X-Image-Size (X-Mask-Upsample hints how)
+    mask-rle     application/x-alpha-rle: the full-resolution matte in
+                 row-major order as (value: uint8, run length: LEB128 varint)
+                 pairs; the mostly 0/255 interior collapses to a few bytes
+                 per row
+
+Config (env):
+    REMOVE_BG_PNG_COMPRESS_LEVEL  zlib level 0-9; lower is faster, larger
+    REMOVE_BG_JPEG_QUALITY        JPEG quality for flattened output
+"""
+import io
+import os
+import time
+import base64
+
+import numpy as np
+from PIL import Image
+
+PNG_COMPRESS_LEVEL = int(os.environ.get('REMOVE_BG_PNG_COMPRESS_LEVEL', '6'))
+JPEG_QUALITY = int(os.environ.get('REMOVE_BG_JPEG_QUALITY', '95'))
+DEFAULT_BACKGROUND = (255, 255, 255)
+
+CONTENT_TYPES = {
+    'png': 'image/png',
+    'webp': 'image/webp',
+    'jpeg': 'image/jpeg',
+    'base64': 'text/plain',
+    'mask': 'image/png',
+    'mask-lowres': 'image/png',
+    'mask-rle': 'application/x-alpha-rle',
+}
+
+MASK_FORMATS = ('mask', 'mask-lowres', 'mask-rle')
+
+# Accept media type -> format; text/plain and */* fall back to legacy base64
+MEDIA_TYPES = {
+    'image/png': 'png',
+    'image/webp': 'webp',
+    'image/jpeg': 'jpeg',
+    'image/jpg': 'jpeg',
+    'image/*': 'png',
+    'application/x-alpha-rle': 'mask-rle',
+}
+
+
+def _parse_accept(accept):
+    """[(media_type, q)] sorted by preference, q=0 entries dropped"""
+    entries = []
+    for order, part in enumerate(accept.split(',')):
+        fields = [f.strip() for f in part.split(';')]
+        media = fields[0].lower()
+        if not media:
+            continue
+        q = 1.0
+        for param in fields[1:]:
+            if param.startswith('q='):
+                try:
+                    q = float(param[2:])
+                except ValueError:
+                    q = 0.0
+        if q > 0:
+            entries.append((-q, order, media))
+    return [media for _, _, media in sorted(entries)]
+
+
+def negotiate(accept=None, fmt=None):
+    """Response format from ?format= (if given) or the Accept header"""
+    if fmt:
+        fmt = fmt.lower()
+        fmt = 'jpeg' if fmt == 'jpg' else fmt
+        if fmt not in CONTENT_TYPES:
+            raise ValueError(f"Unknown format '{fmt}' (available: {', '.join(CONTENT_TYPES)})")
+        return fmt
+    for media in _parse_accept(accept or ''):
+        if media in MEDIA_TYPES:
+            return MEDIA_TYPES[media]
+        if media in ('text/plain', '*/*', 'text/*'):
+            break
+    return 'base64'
+
+
+def parse_color(value):
+    """'ffffff' / '#fff' -> (r, g, b); None -> default background"""
+    if not value:
+        return DEFAULT_BACKGROUND
+    value = value.lstrip('#')
+    if len(value) == 3:
+        value = ''.join(c * 2 for c in value)
+    if len(value) != 6:
+        raise ValueError(f"Invalid background color '{value}' (expected hex RRGGBB)")
+    try:
+        return tuple(int(value[i:i + 2], 16) for i in (0, 2, 4))
+    except ValueError:
+        raise ValueError(f"Invalid background color '{value}' (expected hex RRGGBB)")
+
+
+def cutout(input_image, mask):
+    # Cut out the subject as RGBA (same pixels as the legacy base64 PNG)
+    empty = Image.new("RGBA", input_image.size, 0)
+    return Image.composite(input_image, empty, mask)
+
+
+def encode_cutout(input_image, mask, fmt, background=None, timings=None):
+    """
+    Encode the cut-out; returns (body bytes, content type). If given, timings
+    receives the 'composite' and 'encode' durations in seconds.
+    """
+    t = time.perf_counter()
+    if fmt == 'jpeg':
+        # No alpha in JPEG: flatten onto the background color instead
+        image = Image.composite(input_image, Image.new("RGB", input_image.size, background or DEFAULT_BACKGROUND), mask)
+    else:
+        image = cutout(input_image, mask)
+    composited = time.perf_counter()
+
+    buffered = io.BytesIO()
+    if fmt == 'jpeg':
+        image.save(buffered, format="JPEG", quality=JPEG_QUALITY)
+    elif fmt == 'webp':
+        image.save(buffered, format="WEBP", lossless=True)
+    else:
+        image.save(buffered, format="PNG", compress_level=PNG_COMPRESS_LEVEL)
+
+    body = buffered.getvalue()
+    if fmt == 'base64':
+        body = base64.b64encode(body)
+    if timings is not None:
+        timings['composite'] = composited - t
+        timings['encode'] = time.perf_counter() - composited
+    return body, CONTENT_TYPES[fmt]
+
+
+def encode_rle(mask):
+    """Row-major (value, LEB128 run length) pairs of an 'L' mask"""
+    flat = np.asarray(mask).ravel()
+    if flat.size == 0:
+        return b''
+    # Run boundaries where the value changes
+    starts = np.concatenate(([0], np.flatnonzero(flat[1:] != flat[:-1]) + 1))
+    lengths = np.diff(np.append(starts, flat.size)).astype(np.uint64)
+
+    # Vectorized LEB128: 7 bits per byte, high bit set on all but the last byte
+    nbytes = np.ones(len(lengths), dtype=np.int64)
+    for k in range(1, 10):
+        nbytes += lengths >= (1 << (7 * k))
+    offsets = np.concatenate(([0], np.cumsum(1 + nbytes)[:-1]))
+    out = np.empty(int((1 + nbytes).sum()), dtype=np.uint8)
+    out[offsets] = flat[starts]
+    for k in range(int(nbytes.max())):
+        has = nbytes > k
+        chunk = (lengths[has] >> np.uint64(7 * k)) & np.uint64(0x7F)
+        more = (nbytes[has] > k + 1).astype(np.uint64) << np.uint64(7)
+        out[offsets[has] + 1 + k] = chunk | more
+    return out.tobytes()
+
+
+def encode_mask(mask, fmt):
+    """Encode an alpha matte ('L') for the mask-only formats; returns (body, content type)"""
+    if fmt == 'mask-rle':
+        return encode_rle(mask), CONTENT_TYPES[fmt]
+    buffered = io.BytesIO()
+    mask.save(buffered, format="PNG", compress_level=PNG_COMPRESS_LEVEL)
+    return buffered.getvalue(), CONTENT_TYPES[fmt]
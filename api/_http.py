@@ -0,0 +1,28 @@
+"""
+Response helpers shared by index.py and _pipeline.py. Standard library only:
+index.py answers preflights and health checks with these before numpy,
+onnxruntime or PIL are imported.
+"""
+import json
+
+
+def send_json(request, status, payload):
+    body = json.dumps(payload).encode()
+    request.send_response(status)
+    request.send_header('Content-Type', 'application/json')
+    request.send_header('Content-Length', str(len(body)))
+    request.send_header('Cache-Control', 'no-store')
+    request.send_header('Access-Control-Allow-Origin', '*')
+    request.end_headers()
+    request.wfile.write(body)
+
+
+def send_too_large(request, error):
+    # 413 before the body is read; the connection is closed afterwards
+    request.send_response(413)
+    request.send_header('Content-Type', 'text/plain')
+    request.send_header('Access-Control-Allow-Origin', '*')
+    request.send_header('Connection', 'close')
+    request.end_headers()
+    request.wfile.write(f"Payload Too Large: {str(error)}".encode())
+    request.close_connection = True
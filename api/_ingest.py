@@ -0,0 +1,128 @@
+"""
+Bounded-memory upload ingestion
+
+Uploads are streamed into a SpooledTemporaryFile that spills to disk above
+a threshold, hashing the bytes on the way for the mask cache. Image
+dimensions are read from the header before anything is decoded, and two
+budgets give each request a predictable memory ceiling:
+    bytes       larger bodies are refused with 413 before being read
+    megapixels  larger images are downscaled while decoding (JPEG DCT
+                scaling via draft(), so the full-size bitmap never exists)
+                or refused with 413 when the policy is 'reject' or the
+                format cannot be decoded at reduced size
+
+Config (env):
+    REMOVE_BG_MAX_UPLOAD_MB     byte budget per upload
+    REMOVE_BG_MAX_BATCH_MB      byte budget per batch upload
+    REMOVE_BG_MAX_MEGAPIXELS    pixel budget per image
+    REMOVE_BG_OVERSIZE          downscale | reject
+    REMOVE_BG_SPOOL_MB          in-memory threshold before spilling to a temp file
+"""
+import os
+import math
+import hashlib
+import tempfile
+
+from PIL import Image
+
+MAX_UPLOAD_BYTES = int(float(os.environ.get('REMOVE_BG_MAX_UPLOAD_MB', '25')) * 1024 * 1024)
+MAX_BATCH_UPLOAD_BYTES = int(float(os.environ.get('REMOVE_BG_MAX_BATCH_MB', '100')) * 1024 * 1024)
+MAX_PIXELS = int(float(os.environ.get('REMOVE_BG_MAX_MEGAPIXELS', '24')) * 1_000_000)
+OVERSIZE_POLICY = os.environ.get('REMOVE_BG_OVERSIZE', 'downscale').lower()
+SPOOL_BYTES = int(float(os.environ.get('REMOVE_BG_SPOOL_MB', '2')) * 1024 * 1024)
+CHUNK_SIZE = 64 * 1024
+
+# Formats whose decoder can produce a reduced-size image directly
+DRAFT_FORMATS = ('JPEG',)
+
+
+class PayloadTooLarge(Exception):
+    """Upload over the byte or pixel budget; handlers answer 413"""
+
+
+class Upload:
+    """A spooled request body and the SHA-256 of its bytes"""
+
+    def __init__(self, file, size, digest):
+        self.file = file
+        self.size = size
+        self.digest = digest
+
+    def read(self):
+        self.file.seek(0)
+        return self.file.read()
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def read_body(rfile, content_length, max_bytes=None):
+    """Stream content_length bytes from rfile into a spooled file, enforcing the byte budget"""
+    max_bytes = MAX_UPLOAD_BYTES if max_bytes is None else max_bytes
+    if content_length > max_bytes:
+        raise PayloadTooLarge(f"Upload of {content_length} bytes exceeds the {max_bytes} byte limit")
+
+    spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_BYTES)
+    sha = hashlib.sha256()
+    remaining = content_length
+    try:
+        while remaining > 0:
+            chunk = rfile.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                raise ValueError(f"Body ended after {content_length - remaining} of {content_length} bytes")
+            sha.update(chunk)
+            spool.write(chunk)
+            remaining -= len(chunk)
+    except Exception:
+        spool.close()
+        raise
+    spool.seek(0)
+    return Upload(spool, content_length, sha.hexdigest())
+
+
+def fit_size(size, max_pixels=None):
+    """Size scaled down (aspect kept) to fit the pixel budget"""
+    max_pixels = MAX_PIXELS if max_pixels is None else max_pixels
+    w, h = size
+    if w * h <= max_pixels:
+        return size
+    scale = math.sqrt(max_pixels / (w * h))
+    return max(1, int(w * scale)), max(1, int(h * scale))
+
+
+def open_image(fp, max_pixels=None, policy=None):
+    """
+    Open an upload lazily (header only) and check it against the pixel budget.
+    Returns (image, target_size); decode with decode_rgb(image, target_size).
+    """
+    policy = policy or OVERSIZE_POLICY
+    try:
+        image = Image.open(fp)
+    except (Image.UnidentifiedImageError, Image.DecompressionBombError):
+        # Handlers answer 400; PIL's message would leak the file object's repr
+        raise ValueError("Not a decodable image")
+    target = fit_size(image.size, max_pixels)
+    if target != image.size:
+        w, h = image.size
+        if policy != 'downscale' or image.format not in DRAFT_FORMATS:
+            limit = (MAX_PIXELS if max_pixels is None else max_pixels) / 1e6
+            raise PayloadTooLarge(f"{image.format} image {w}x{h} ({w * h / 1e6:.1f}MP) exceeds the {limit:.1f}MP limit")
+    return image, target
+
+
+def decode_rgb(image, target_size):
+    """Decode to RGB at target_size, letting JPEG decode at a reduced scale first"""
+    if target_size != image.size:
+        # Decoder-level downscale by 1/2, 1/4 or 1/8, never below target_size, so
+        # the decoded bitmap stays under 4x the pixel budget before the final resize
+        image.draft('RGB', target_size)
+    rgb = image.convert("RGB")
+    if rgb.size != target_size:
+        rgb = rgb.resize(target_size, Image.BILINEAR, reducing_gap=2.0)
+    return rgb
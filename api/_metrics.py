@@ -0,0 +1,170 @@
+"""
+In-process request metrics for the remove-bg service
+
+Per-stage latency histograms, in-flight gauges and request / error counters,
+labeled by endpoint and model, rendered in the Prometheus text format at
+/api/remove-bg/metrics. Standard library only, so index.py can serve it
+without loading the pipeline.
+
+    remove_bg_stage_seconds{endpoint, model, stage}   histogram; stages are
+        decode, preprocess, inference, postprocess, composite, encode, total
+        (plus session / mask when a cache or session load is involved)
+    remove_bg_in_flight{endpoint, model}              gauge
+    remove_bg_requests_total{endpoint, model, status} counter
+    remove_bg_errors_total{endpoint, model, kind}     counter
+
+Metrics are per process. In server.py --processes mode the server process
+records them from each worker response's Server-Timing header instead.
+"""
+import re
+import threading
+
+# Seconds; Prometheus-style upper bounds, +Inf is implicit
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+ERROR_KINDS = {400: 'bad_request', 413: 'too_large', 429: 'busy', 503: 'unavailable'}
+
+_TIMING_ENTRY = re.compile(r'\s*([\w-]+)\s*;\s*dur=([\d.]+)')
+
+
+class Histogram:
+    __slots__ = ('counts', 'sum', 'count')
+
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(BUCKETS):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q):
+        """Upper bucket bound holding the q-th observation (None when empty or past the last bucket)"""
+        target = q * self.count
+        seen = 0
+        for bound, n in zip(BUCKETS, self.counts):
+            seen += n
+            if seen >= target and self.count:
+                return bound
+        return None
+
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.stages = {}      # (endpoint, model, stage) -> Histogram
+        self.in_flight = {}   # (endpoint, model) -> int
+        self.requests = {}    # (endpoint, model, status) -> int
+        self.errors = {}      # (endpoint, model, kind) -> int
+
+    def request(self, endpoint, model):
+        """Context manager tracking one request; set .status and .timings on it"""
+        return RequestMetrics(self, endpoint, model)
+
+    def add_in_flight(self, endpoint, model, delta):
+        with self._lock:
+            key = (endpoint, model)
+            self.in_flight[key] = self.in_flight.get(key, 0) + delta
+
+    def record(self, endpoint, model, status, timings=None):
+        """One finished request: status counters and {stage: seconds} histograms"""
+        with self._lock:
+            key = (endpoint, model, str(status))
+            self.requests[key] = self.requests.get(key, 0) + 1
+            if status >= 400:
+                kind = ERROR_KINDS.get(status, 'internal')
+                key = (endpoint, model, kind)
+                self.errors[key] = self.errors.get(key, 0) + 1
+            for stage, seconds in (timings or {}).items():
+                key = (endpoint, model, stage)
+                if key not in self.stages:
+                    self.stages[key] = Histogram()
+                self.stages[key].observe(seconds)
+
+    @staticmethod
+    def parse_server_timing(header):
+        """{stage: seconds} from a Server-Timing header value ('stage;dur=12.3, ...', milliseconds)"""
+        return {name: float(ms) / 1000 for name, ms in _TIMING_ENTRY.findall(header or '')}
+
+    def snapshot(self):
+        """JSON-friendly summary: per-stage count, mean and approximate p50/p95 in ms"""
+        with self._lock:
+            stages = {}
+            for (endpoint, model, stage), h in sorted(self.stages.items()):
+                p50, p95 = h.quantile(0.5), h.quantile(0.95)
+                stages.setdefault(f"{endpoint}:{model}", {})[stage] = {
+                    'count': h.count,
+                    'mean_ms': round(h.sum / h.count * 1000, 1),
+                    'p50_le_ms': p50 * 1000 if p50 is not None else None,
+                    'p95_le_ms': p95 * 1000 if p95 is not None else None,
+                }
+            return {
+                'stages': stages,
+                'in_flight': {f"{e}:{m}": n for (e, m), n in self.in_flight.items()},
+                'requests': {f"{e}:{m}:{s}": n for (e, m, s), n in self.requests.items()},
+                'errors': {f"{e}:{m}:{k}": n for (e, m, k), n in self.errors.items()},
+            }
+
+    def render(self):
+        """Prometheus text exposition format (version 0.0.4)"""
+        lines = []
+        with self._lock:
+            lines += ['# HELP remove_bg_stage_seconds Time spent per request stage',
+                      '# TYPE remove_bg_stage_seconds histogram']
+            for (endpoint, model, stage), h in sorted(self.stages.items()):
+                labels = _labels(endpoint=endpoint, model=model, stage=stage)
+                cumulative = 0
+                for bound, n in zip(BUCKETS, h.counts):
+                    cumulative += n
+                    lines.append(f'remove_bg_stage_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+                lines.append(f'remove_bg_stage_seconds_bucket{{{labels},le="+Inf"}} {h.count}')
+                lines.append(f'remove_bg_stage_seconds_sum{{{labels}}} {h.sum:.6f}')
+                lines.append(f'remove_bg_stage_seconds_count{{{labels}}} {h.count}')
+
+            lines += ['# HELP remove_bg_in_flight Requests currently being processed',
+                      '# TYPE remove_bg_in_flight gauge']
+            for (endpoint, model), n in sorted(self.in_flight.items()):
+                lines.append(f'remove_bg_in_flight{{{_labels(endpoint=endpoint, model=model)}}} {n}')
+
+            lines += ['# HELP remove_bg_requests_total Finished requests by status code',
+                      '# TYPE remove_bg_requests_total counter']
+            for (endpoint, model, status), n in sorted(self.requests.items()):
+                lines.append(f'remove_bg_requests_total{{{_labels(endpoint=endpoint, model=model, status=status)}}} {n}')
+
+            lines += ['# HELP remove_bg_errors_total Failed requests by kind',
+                      '# TYPE remove_bg_errors_total counter']
+            for (endpoint, model, kind), n in sorted(self.errors.items()):
+                lines.append(f'remove_bg_errors_total{{{_labels(endpoint=endpoint, model=model, kind=kind)}}} {n}')
+        return '\n'.join(lines) + '\n'
+
+
+class RequestMetrics:
+    def __init__(self, registry, endpoint, model):
+        self.registry = registry
+        self.endpoint = endpoint
+        self.model = model
+        self.status = 500  # unless the handler says otherwise
+        self.timings = None
+
+    def __enter__(self):
+        self.registry.add_in_flight(self.endpoint, self.model, 1)
+        return self
+
+    def __exit__(self, *exc):
+        self.registry.add_in_flight(self.endpoint, self.model, -1)
+        self.registry.record(self.endpoint, self.model, self.status, self.timings)
+
+
+def _labels(**labels):
+    def escape(value):
+        return str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+    return ','.join(f'{key}="{escape(value)}"' for key, value in labels.items())
+
+
+# Process-wide registry
+metrics = Registry()
@@ -0,0 +1,183 @@
+"""
+Segmentation model registry and a memory-budgeted session pool
+
+Each ModelSpec describes a model file, its input resolution, normalization
+and postprocessing, so requests can pick a model by name (?model=... or the
+X-Model header) instead of editing code. Loaded sessions live in an LRU with
+a RAM budget: the default model is pinned and stays hot, larger models are
+loaded on demand and evicted under pressure.
+
+Config (env):
+    REMOVE_BG_MODEL              default model name
+    REMOVE_BG_MODEL_VARIANT      fp32 | int8, legacy switch for the Silueta variant
+    REMOVE_BG_MODEL_BUDGET_MB    RAM budget for loaded sessions
+"""
+import os
+import threading
+from collections import OrderedDict
+
+MODEL_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+class ModelSpec:
+    def __init__(self, name, filename, input_size, mean, std, postprocess='minmax', memory_mb=None):
+        self.name = name
+        self.filename = filename
+        self.input_size = input_size
+        self.mean = mean
+        self.std = std
+        self.postprocess = postprocess
+        self.memory_mb = memory_mb
+
+    @property
+    def path(self):
+        return os.path.join(MODEL_DIR, self.filename)
+
+    def memory_bytes(self):
+        """Estimated resident size once loaded: weights (kept twice during load) plus activations"""
+        if self.memory_mb:
+            return int(self.memory_mb * 1024 * 1024)
+        weights = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+        # Rough activation footprint: 64 float32 feature maps at input resolution
+        activations = self.input_size * self.input_size * 64 * 4
+        return 2 * weights + activations
+
+    def identity(self):
+        """
+        File name, size and mtime: changes when the model file is republished in
+        place (quantize_model.py rewrites silueta.int8.onnx), for cache keys
+        """
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return self.filename
+        return f"{self.filename}:{st.st_size}:{st.st_mtime_ns}"
+
+    def to_dict(self):
+        return {'name': self.name, 'file': self.filename, 'input_size': self.input_size,
+                'mean': self.mean, 'std': self.std, 'postprocess': self.postprocess}
+
+
+IMAGENET_MEAN = (0.485, 0.456, 0.406)
+IMAGENET_STD = (0.229, 0.224, 0.225)
+
+MODELS = {
+    # Silueta: U2Net distilled to ~40MB, ImageNet normalization at 320px
+    'silueta': ModelSpec('silueta', 'silueta.onnx', 320, IMAGENET_MEAN, IMAGENET_STD),
+    # INT8 Silueta, published by quantize_model.py once it passes the quality gate
+    'silueta-int8': ModelSpec('silueta-int8', 'silueta.int8.onnx', 320, IMAGENET_MEAN, IMAGENET_STD),
+    # ISNet general-use: 1024px, mean 0.5 / std 1.0
+    'isnet-general-use': ModelSpec('isnet-general-use', 'isnet-general-use.onnx', 1024,
+                                   (0.5, 0.5, 0.5), (1.0, 1.0, 1.0)),
+}
+
+_legacy_default = 'silueta-int8' if os.environ.get('REMOVE_BG_MODEL_VARIANT') == 'int8' else 'silueta'
+DEFAULT_MODEL = os.environ.get('REMOVE_BG_MODEL', _legacy_default)
+MODEL_BUDGET_MB = float(os.environ.get('REMOVE_BG_MODEL_BUDGET_MB', '1024'))
+
+
+def resolve_model(name=None):
+    """Look up a ModelSpec by name; None means the default model"""
+    name = name or DEFAULT_MODEL
+    if name not in MODELS:
+        raise ValueError(f"Unknown model '{name}' (available: {', '.join(MODELS)})")
+    return MODELS[name]
+
+
+class SessionPool:
+    """
+    LRU of loaded model sessions under a RAM budget
+
+    factory(spec, pool) builds a lazily loading session wrapper with
+    ensure_session() and unload() (U2NetSession). acquire() returns it loaded;
+    least recently used unpinned sessions are unloaded to make room. Loads run
+    outside the pool lock, one at a time per model, so a cold load does not
+    hold up requests for models that are already loaded.
+    """
+
+    def __init__(self, factory, budget_mb=MODEL_BUDGET_MB, pinned=(DEFAULT_MODEL,)):
+        self.factory = factory
+        self.budget = int(budget_mb * 1024 * 1024)
+        self.pinned = set(pinned)
+        self._wrappers = {}
+        self._load_locks = {}
+        self._loaded = OrderedDict()  # name -> estimated bytes, in LRU order
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def wrapper(self, name=None):
+        """Session wrapper for a model (not necessarily loaded)"""
+        spec = resolve_model(name)
+        with self._lock:
+            if spec.name not in self._wrappers:
+                self._wrappers[spec.name] = self.factory(spec, self)
+                self._load_locks[spec.name] = threading.Lock()
+            return self._wrappers[spec.name]
+
+    def acquire(self, name=None):
+        """Loaded session wrapper for a model, loading and evicting as needed"""
+        spec = resolve_model(name)
+        self.session(spec.name)
+        return self._wrappers[spec.name]
+
+    def session(self, name=None):
+        """
+        Loaded inference session for a model. The reference stays usable even if
+        the pool evicts the model meanwhile; wrappers reload through here.
+        """
+        spec = resolve_model(name)
+        wrapper = self.wrapper(spec.name)
+        with self._lock:
+            session = self._hit(spec.name, wrapper)
+            if session is not None:
+                return session
+
+        with self._load_locks[spec.name]:
+            # Another thread may have finished loading it while we waited
+            with self._lock:
+                session = self._hit(spec.name, wrapper)
+                if session is not None:
+                    return session
+            session = wrapper.ensure_session()
+            with self._lock:
+                self.misses += 1
+                cost = spec.memory_bytes()
+                self._make_room(cost, keep=spec.name)
+                self._loaded[spec.name] = cost
+                return session
+
+    def _hit(self, name, wrapper):
+        session = wrapper.session
+        if name in self._loaded and session is not None:
+            self._loaded.move_to_end(name)
+            self.hits += 1
+            return session
+        return None
+
+    def _make_room(self, cost, keep):
+        used = sum(self._loaded.values())
+        for name in list(self._loaded):
+            if used + cost <= self.budget:
+                break
+            if name in self.pinned or name == keep:
+                continue
+            used -= self._loaded.pop(name)
+            self._wrappers[name].unload()
+            self.evictions += 1
+            print(f"Evicted model session '{name}' (budget {self.budget / 2**20:.0f}MB)")
+        if used + cost > self.budget:
+            print(f"Model memory budget exceeded: {(used + cost) / 2**20:.0f}MB > {self.budget / 2**20:.0f}MB")
+
+    def stats(self):
+        with self._lock:
+            return {
+                'default': DEFAULT_MODEL,
+                'budget_mb': round(self.budget / 2**20, 1),
+                'used_mb': round(sum(self._loaded.values()) / 2**20, 1),
+                'loaded': list(self._loaded),
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
@@ -0,0 +1,630 @@
+"""
+Heavy half of the remove-bg function: sessions, inference, pre/postprocessing,
+encoding and the request handlers that need them. index.py imports this on
+first use so cold starts and preflights don't pay for numpy / onnxruntime /
+PIL; index.preprocess etc. still resolve here.
+"""
+from http.server import BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs
+import os
+import io
+import sys
+import numpy as np
+from PIL import Image
+import json
+import time
+import threading
+
+# Sibling helpers are importable without index.py too (scripts, benchmarks)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from _batch import read_batch_images, MAX_BATCH_SIZE  # noqa: E402
+from _scheduler import MicroBatcher  # noqa: E402
+from _session import create_session  # noqa: E402
+from _models import MODELS, DEFAULT_MODEL, SessionPool, resolve_model  # noqa: E402
+from _preprocess import input_buffer, normalize_into  # noqa: E402
+from _upsample import upsample_mask, upsampler_identity  # noqa: E402
+from _encode import negotiate, parse_color, encode_cutout, encode_mask, MASK_FORMATS  # noqa: E402
+from _cache import MaskCache, CACHE_ENABLED  # noqa: E402
+from _ingest import read_body, open_image, decode_rgb, PayloadTooLarge, MAX_BATCH_UPLOAD_BYTES  # noqa: E402
+from _http import send_too_large  # noqa: E402
+from _metrics import metrics  # noqa: E402
+
+# Configuration
+# Switching to Silueta (~40MB) for lightweight deployment.
+# Models (file, input size, normalization) are described in _models.MODELS.
+MODEL_PATH = MODELS[DEFAULT_MODEL].path
+# Micro-batching window for concurrent servers; 0 disables (env: REMOVE_BG_BATCH_WINDOW_MS)
+BATCH_WINDOW_MS = float(os.environ.get('REMOVE_BG_BATCH_WINDOW_MS', '0'))
+# Warm-up: models ('all' or comma-separated, default model if empty) and photo sizes (WxH, comma-separated)
+WARMUP_MODELS = os.environ.get('REMOVE_BG_WARMUP_MODELS', '')
+WARMUP_SIZES = os.environ.get('REMOVE_BG_WARMUP_SIZES', '768x1024')
+
+class U2NetSession:
+    def __init__(self, spec=None, pool=None):
+        self.spec = spec or resolve_model()
+        self.pool = pool
+        self.session = None
+        self.load_info = None
+        self._local = threading.local()
+
+    def ensure_session(self):
+        if self.session:
+            return self.session
+        
+        model_path = self.spec.path
+        if not os.path.exists(model_path):
+           # Fail fast if model is missing in production
+           raise FileNotFoundError(f"Model file not found at {model_path}")
+        
+        print(f"Loading ONNX Session from {model_path}...")
+        self.session, self.load_info = create_session(model_path)
+        print(f"ONNX Session ready in {self.load_info['load_time']:.3f}s ({self.load_info['source']})")
+        return self.session
+
+    def unload(self):
+        # In-flight runs keep their own reference; memory is freed when they finish
+        self.session = None
+
+    def _current(self):
+        # Loaded session; after an eviction reload through the pool, so the
+        # reload counts against its memory budget
+        session = self.session
+        if session is not None:
+            return session
+        if self.pool is not None:
+            return self.pool.session(self.spec.name)
+        return self.ensure_session()
+
+    def run_batch(self, batch, max_batch_size=None):
+        """
+        Run inference on an (N, 3, H, W) batch, returning the first output (N, 1, H, W).
+        Chunks by max_batch_size; models exported with a fixed batch of 1 run per image.
+        """
+        session = self._current()
+        model_input = session.get_inputs()[0]
+        chunk = max_batch_size or MAX_BATCH_SIZE
+        if isinstance(model_input.shape[0], int):
+            chunk = min(chunk, model_input.shape[0])
+
+        outputs = []
+        for start in range(0, len(batch), chunk):
+            out = session.run(None, {model_input.name: batch[start:start + chunk]})
+            outputs.append(out[0])
+        return np.concatenate(outputs, axis=0)
+
+    def run(self, tensor):
+        """
+        Single inference through ORT IO binding: ORT reads the (contiguous) input
+        tensor in place and writes the first output into a buffer reused by the
+        calling thread, so it is only valid until that thread's next run().
+        """
+        session = self._current()
+        state = getattr(self._local, 'binding', None)
+        if state is None or state[0] is not session:
+            # New thread or reloaded session: fresh binding and output buffers
+            state = self._local.binding = (session, session.io_binding(), {})
+        _, binding, outputs = state
+
+        tensor = np.ascontiguousarray(tensor, dtype=np.float32)
+        model_input = session.get_inputs()[0]
+        model_output = session.get_outputs()[0]
+        binding.bind_input(model_input.name, 'cpu', 0, np.float32, tensor.shape, tensor.ctypes.data)
+
+        shape = _output_shape(model_input.shape, model_output, tensor.shape)
+        if shape is None:
+            # Output shape unknown up front: let ORT allocate it
+            binding.bind_output(model_output.name, 'cpu')
+            session.run_with_iobinding(binding)
+            return binding.copy_outputs_to_cpu()[0]
+
+        out = outputs.get(shape)
+        if out is None:
+            out = outputs[shape] = np.empty(shape, dtype=np.float32)
+        binding.bind_output(model_output.name, 'cpu', 0, np.float32, shape, out.ctypes.data)
+        session.run_with_iobinding(binding)
+        return out
+
+def _output_shape(input_shape, model_output, tensor_shape):
+    # Concrete output shape: fixed dims as declared, dims named like an input dim
+    # (batch 'N', dynamic H/W) take the input's value; anything else is unknown.
+    if model_output.type != 'tensor(float)':
+        return None
+    dims = dict(zip(input_shape, tensor_shape))
+    shape = []
+    for dim in model_output.shape:
+        if isinstance(dim, int):
+            shape.append(dim)
+        elif dim in dims:
+            shape.append(dims[dim])
+        else:
+            return None
+    return tuple(shape)
+
+# Global Singletons: LRU of loaded sessions; the default model is pinned
+sessions = SessionPool(U2NetSession)
+u2net = sessions.wrapper(DEFAULT_MODEL)
+
+# Content-addressed mask cache (memory + disk tiers); None when disabled
+mask_cache = MaskCache() if CACHE_ENABLED else None
+
+# Optional micro-batching scheduler (one per model). Off by default: a Vercel
+# instance serves one request at a time, so there is nothing to batch.
+# server.py turns it on.
+scheduler = None
+
+class _ModelSchedulers:
+    def __init__(self, window_ms, max_batch_size):
+        self.window_ms = window_ms
+        self.max_batch_size = max_batch_size
+        self._batchers = {}
+
+    def submit(self, tensor, model=None):
+        name = resolve_model(model).name
+        if name not in self._batchers:
+            self._batchers.setdefault(name, MicroBatcher(
+                lambda batch, name=name: sessions.acquire(name).run_batch(batch),
+                window_ms=self.window_ms, max_batch_size=self.max_batch_size,
+            ))
+        return self._batchers[name].submit(tensor)
+
+    def stats(self):
+        return {name: batcher.stats() for name, batcher in self._batchers.items()}
+
+def enable_micro_batching(window_ms=None, max_batch_size=None):
+    global scheduler
+    scheduler = _ModelSchedulers(
+        window_ms=BATCH_WINDOW_MS if window_ms is None else window_ms,
+        max_batch_size=max_batch_size or MAX_BATCH_SIZE,
+    )
+    return scheduler
+
+if BATCH_WINDOW_MS > 0:
+    enable_micro_batching()
+
+def warmup_models():
+    names = [name.strip() for name in WARMUP_MODELS.split(',') if name.strip()]
+    if names == ['all']:
+        return list(MODELS)
+    return [resolve_model(name).name for name in names] or [DEFAULT_MODEL]
+
+def warmup_sizes():
+    sizes = []
+    for item in WARMUP_SIZES.split(','):
+        w, _, h = item.strip().lower().partition('x')
+        sizes.append((int(w), int(h or w)))
+    return sizes
+
+# Readiness: 'ready' once every warm-up model has run the full request path
+readiness = {'status': 'cold', 'models': {}, 'error': None}
+_warmup_lock = threading.Lock()
+
+def _warmup_image(size):
+    # Subject-like ellipse on a gradient, so postprocessing sees real edges
+    w, h = size
+    yy, xx = np.mgrid[:h, :w]
+    rgb = np.empty((h, w, 3), dtype=np.uint8)
+    rgb[..., 0] = (xx * 255 // max(w - 1, 1)).astype(np.uint8)
+    rgb[..., 1] = (yy * 255 // max(h - 1, 1)).astype(np.uint8)
+    rgb[..., 2] = 160
+    subject = ((xx - w / 2) / (w * 0.3)) ** 2 + ((yy - h / 2) / (h * 0.35)) ** 2 < 1
+    rgb[subject] = (40, 30, 30)
+    return Image.fromarray(rgb)
+
+def _warmup_request(spec, image):
+    # Same stages as do_POST, bypassing the mask cache
+    img_input = preprocess(image, spec, out=input_buffer(spec.input_size))
+    if scheduler:
+        pred = scheduler.submit(img_input, spec.name)
+    else:
+        pred = sessions.acquire(spec.name).run(img_input)
+    mask = postprocess(pred, image.size, spec, guide=image)
+    encode_cutout(image, mask, 'png')
+    encode_mask(mask, 'mask')
+
+def warm_up(models=None, sizes=None):
+    """
+    Load each model and run dummy requests through preprocess -> inference ->
+    postprocess -> encode at each warm-up size, so ORT kernel selection, arena
+    growth and buffer allocation happen before real traffic. Models already
+    warmed are skipped; concurrent callers wait for the running warm-up.
+    """
+    with _warmup_lock:
+        try:
+            # Resolved once: a bad model name raises here, not from the finally below
+            required = warmup_models()
+            pending = [resolve_model(name).name for name in (models or required)]
+        except ValueError as e:
+            readiness['error'] = f"{type(e).__name__}: {e}"
+            raise
+        pending = [name for name in pending if name not in readiness['models']]
+        if not pending:
+            # Already warm (e.g. the page-load ping): leave readiness untouched
+            return readiness
+
+        readiness['status'] = 'warming'
+        try:
+            for name in pending:
+                spec = resolve_model(name)
+                t = time.perf_counter()
+                session = sessions.acquire(spec.name)
+                load_ms = (time.perf_counter() - t) * 1000
+                runs = []
+                for size in sizes or warmup_sizes():
+                    image = _warmup_image(size)
+                    # The second pass should already cost what steady state does
+                    passes = []
+                    for _ in range(2):
+                        t = time.perf_counter()
+                        _warmup_request(spec, image)
+                        passes.append(round((time.perf_counter() - t) * 1000, 1))
+                    runs.append({'size': f"{size[0]}x{size[1]}", 'first_ms': passes[0], 'second_ms': passes[1]})
+                readiness['models'][spec.name] = {
+                    'load_ms': round(load_ms, 1),
+                    'session_source': (session.load_info or {}).get('source'),
+                    'warmup': runs,
+                }
+            readiness['error'] = None
+        except Exception as e:
+            readiness['error'] = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            ready = all(name in readiness['models'] for name in required)
+            readiness['status'] = 'ready' if ready else ('failed' if readiness['error'] else 'cold')
+    return readiness
+
+def start_warmup():
+    """Warm up on a background thread (servers call this at startup)"""
+    def run():
+        try:
+            warm_up()
+        except Exception as e:
+            print(f"Warm-up failed: {e}")
+    thread = threading.Thread(target=run, name='remove-bg-warmup', daemon=True)
+    thread.start()
+    return thread
+
+def requested_model(request):
+    # Model picked by ?model=... or the X-Model header (default model otherwise)
+    query = parse_qs(urlsplit(request.path).query)
+    name = query.get('model', [None])[0] or request.headers.get('X-Model')
+    return resolve_model(name)
+
+def model_label(request):
+    # Metrics label; unknown model names are answered 400 later
+    try:
+        return requested_model(request).name
+    except ValueError:
+        return 'invalid'
+
+def preprocess(image, spec=None, out=None):
+    """
+    (1, 3, S, S) float32 model input. Pass out= (e.g. a slice of input_buffer())
+    to fill a reused buffer instead of allocating.
+    """
+    spec = spec or resolve_model()
+    # Resize to the model's native resolution (Silueta 320, ISNet 1024)
+    size = spec.input_size
+    img = image.resize((size, size), Image.BILINEAR)
+    
+    # Per-model normalization from the registry
+    # Silueta/U2Net: ImageNet Mean [0.485, 0.456, 0.406], Std [0.229, 0.224, 0.225]
+    # ISNet: Mean [0.5, 0.5, 0.5], Std [1.0, 1.0, 1.0]
+    # Fused lookup-table pass, HWC uint8 -> CHW float32 straight into the output
+    if out is None:
+        out = np.empty((1, 3, size, size), dtype=np.float32)
+    normalize_into(np.asarray(img), spec.mean, spec.std, out[0])
+    return out
+
+def composite_png_b64(input_image, mask):
+    # Cut out the subject and return it as a base64 RGBA PNG
+    body, _ = encode_cutout(input_image, mask, 'base64')
+    return body.decode()
+
+def server_timing(timings):
+    # Server-Timing header value from {stage: seconds}
+    return ', '.join(f"{name};dur={seconds * 1000:.1f}" for name, seconds in timings.items())
+
+def postprocess(pred, original_size, spec=None, guide=None, upsampler=None):
+    """
+    Low-res prediction -> full-size 'L' alpha mask. guide is the full-resolution
+    photo, used by the edge-aware 'guided' upsampler (see _upsample.py).
+    """
+    ma_img = lowres_mask(pred, spec)
+    # 3. Resize back to original size (REMOVE_BG_UPSAMPLER: bilinear | guided | lanczos)
+    return upsample_mask(ma_img, original_size, guide=guide, method=upsampler)
+
+def lowres_mask(pred, spec=None):
+    # Pred: (1, 1, S, S) -> 'L' alpha mask at model resolution
+    spec = spec or resolve_model()
+    # Pred: (1, 1, S, S) -> Alpha Mask
+    ma = np.squeeze(pred) # (S, S)
+    
+    # 1. Normalize 0..1 (Min-Max)
+    if spec.postprocess == 'minmax':
+        ma = (ma - ma.min()) / (ma.max() - ma.min() + 1e-8)
+    else:
+        ma = np.clip(ma, 0, 1)
+    
+    # 2. Relaxed Contrast (Sigmoid-like but simpler)
+    # Was (ma - 0.2) / 0.6 -> Too aggressive, kills soft edges.
+    # New: Gentle S-Curve to push values apart without clipping hard
+    # Or just return raw normalized mask for safety first.
+    # Let's just create the image from normalized 0..1 directly.
+    
+    return Image.fromarray((ma * 255).astype(np.uint8), mode='L')
+
+class PipelineHandler(BaseHTTPRequestHandler):
+    # Called as PipelineHandler.do_POST(request) from index.handler, like server.py does
+    def do_POST(self):
+        batch = urlsplit(self.path).path.rstrip('/').endswith('/batch')
+        # In-flight gauge, status counters and per-stage histograms (see _metrics.py)
+        with metrics.request('remove-bg/batch' if batch else 'remove-bg', model_label(self)) as record:
+            if batch:
+                return PipelineHandler.do_POST_batch(self, record)
+            return PipelineHandler.do_POST_single(self, record)
+
+    def do_POST_single(self, record):
+        try:
+            content_length = int(self.headers.get('Content-Length', 0))
+            if content_length == 0:
+                record.status = 400
+                self.send_error(400, "Content-Length required")
+                return
+
+            spec = requested_model(self)
+            # Response format: ?format= or Accept (legacy base64 text by default)
+            query = parse_qs(urlsplit(self.path).query)
+            fmt = negotiate(self.headers.get('Accept'), query.get('format', [None])[0])
+            background = parse_color(query.get('background', [None])[0])
+
+            timings = {}
+            start = time.perf_counter()
+            # Stream into a spooled buffer (413 over the byte budget), hashing on the way
+            upload = read_body(self.rfile, content_length)
+            try:
+                # Header only (413 over the pixel budget unless it can be downscaled);
+                # pixels are decoded when a composite or an inference needs them
+                source_image, image_size = open_image(upload.file)
+                original_size = source_image.size  # draft() changes source_image.size
+                decoded = []
+
+                def decode():
+                    if not decoded:
+                        t = time.perf_counter()
+                        decoded.append(decode_rgb(source_image, image_size))
+                        timings['decode'] = time.perf_counter() - t
+                    return decoded[0]
+
+                def compute_mask():
+                    input_image = decode()
+                    # 1. Prepare Session (LRU pool; loads on demand)
+                    t = time.perf_counter()
+                    sessions.acquire(spec.name)
+                    timings['session'] = time.perf_counter() - t
+                
+                    # 2. Inference (micro-batched with concurrent requests when enabled)
+                    # Input goes into this thread's reusable buffer; the scheduler copies it into its batch
+                    t = time.perf_counter()
+                    img_input = preprocess(input_image, spec, out=input_buffer(spec.input_size))
+                    timings['preprocess'] = time.perf_counter() - t
+                    t = time.perf_counter()
+                    if scheduler:
+                        pred = scheduler.submit(img_input, spec.name)
+                    else:
+                        pred = sessions.acquire(spec.name).run(img_input)
+                    timings['inference'] = time.perf_counter() - t
+                
+                    # 3. Post Process (Mask); mask-lowres leaves upsampling to the client
+                    t = time.perf_counter()
+                    if fmt == 'mask-lowres':
+                        mask = lowres_mask(pred, spec)
+                    else:
+                        mask = postprocess(pred, input_image.size, spec, guide=input_image)
+                    timings['postprocess'] = time.perf_counter() - t
+                    return mask
+
+                # Same upload + model + postprocessing -> same mask: serve repeats from the cache
+                if mask_cache:
+                    t = time.perf_counter()
+                    variant = 'lowres' if fmt == 'mask-lowres' else upsampler_identity()
+                    key = mask_cache.key(upload.digest, spec.name, spec.identity(), variant, image_size)
+                    mask, cache_status = mask_cache.get_or_compute(key, compute_mask)
+                    timings['mask'] = time.perf_counter() - t
+                else:
+                    mask, cache_status = compute_mask(), 'disabled'
+            
+                # 4. Apply Mask & 5. Output (raw binary unless the legacy base64 mode was negotiated)
+                # Mask-only formats skip the composite; the client applies the matte itself
+                if fmt in MASK_FORMATS:
+                    t = time.perf_counter()
+                    body, content_type = encode_mask(mask, fmt)
+                    timings['encode'] = time.perf_counter() - t
+                else:
+                    body, content_type = encode_cutout(decode(), mask, fmt, background, timings)
+                timings['total'] = time.perf_counter() - start
+                record.status, record.timings = 200, timings
+
+                self.send_response(200)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.send_header('X-Image-Size', f"{image_size[0]}x{image_size[1]}")
+                if image_size != original_size:
+                    self.send_header('X-Original-Size', f"{original_size[0]}x{original_size[1]}")
+                self.send_header('X-Cache', cache_status)
+                self.send_header('X-Model', spec.name)
+                self.send_header('X-Input-Bytes', str(content_length))
+                if fmt == 'mask-lowres':
+                    self.send_header('X-Mask-Size', f"{mask.width}x{mask.height}")
+                    self.send_header('X-Mask-Upsample', 'bilinear')
+                self.send_header('Server-Timing', server_timing(timings))
+                self.send_header('Vary', 'Accept')
+                self.send_header('Access-Control-Allow-Origin', '*')
+                self.send_header('Access-Control-Expose-Headers',
+                                 'Server-Timing, X-Cache, X-Model, X-Image-Size, X-Original-Size, X-Input-Bytes, '
+                                 'X-Mask-Size, X-Mask-Upsample')
+                self.send_header('Timing-Allow-Origin', '*')
+                self.end_headers()
+                self.wfile.write(body)
+            finally:
+                upload.close()
+            
+        except PayloadTooLarge as e:
+            record.status = 413
+            send_too_large(self, e)
+
+        except ValueError as e:
+            record.status = 400
+            self.send_response(400)
+            self.send_header('Content-Type', 'text/plain')
+            self.send_header('Access-Control-Allow-Origin', '*')
+            self.end_headers()
+            self.wfile.write(f"Bad Request: {str(e)}".encode())
+
+        except Exception as e:
+            # Capture and return actual error details
+            error_msg = f"Internal Error: {str(e)}"
+            self.send_response(500)
+            self.send_header('Content-Type', 'text/plain')
+            self.send_header('Access-Control-Allow-Origin', '*')
+            self.end_headers()
+            self.wfile.write(error_msg.encode())
+
+    def do_POST_batch(self, record):
+        # Batch Mode: multipart/form-data or zip archive -> one (N, 3, S, S) inference
+        try:
+            timings = {}
+            start = time.perf_counter()
+            spec = requested_model(self)
+            content_length = int(self.headers.get('Content-Length', 0))
+            if content_length == 0:
+                record.status = 400
+                self.send_error(400, "Content-Length required")
+                return
+
+            with read_body(self.rfile, content_length, MAX_BATCH_UPLOAD_BYTES) as upload:
+                items = read_batch_images(self.headers.get('Content-Type', ''), upload.read())
+
+            # 1. Decode (per item, so one bad file doesn't fail the batch)
+            t = time.perf_counter()
+            results = []
+            images = []
+            for name, data in items:
+                try:
+                    # Same pixel budget as single uploads (downscale or per-item error)
+                    images.append(decode_rgb(*open_image(io.BytesIO(data))))
+                    results.append({"name": name})
+                except Exception as e:
+                    images.append(None)
+                    results.append({"name": name, "error": f"Decode Error: {str(e)}"})
+
+            timings['decode'] = time.perf_counter() - t
+
+            # 2. Inference (batched runs of up to MAX_BATCH_SIZE images)
+            valid = [i for i, img in enumerate(images) if img is not None]
+            if valid:
+                session = sessions.acquire(spec.name)
+                preds = []
+                timings['preprocess'] = timings['inference'] = 0.0
+                # Chunks reuse one thread buffer of at most MAX_BATCH_SIZE rows,
+                # however many images the request holds
+                for first in range(0, len(valid), MAX_BATCH_SIZE):
+                    chunk = valid[first:first + MAX_BATCH_SIZE]
+                    t = time.perf_counter()
+                    batch = input_buffer(spec.input_size, len(chunk))
+                    for row, i in enumerate(chunk):
+                        preprocess(images[i], spec, out=batch[row:row + 1])
+                    timings['preprocess'] += time.perf_counter() - t
+                    t = time.perf_counter()
+                    preds.extend(session.run_batch(batch))
+                    timings['inference'] += time.perf_counter() - t
+
+                # 3. Post Process & Composite, in request order (stage times summed over items)
+                for stage in ('postprocess', 'composite', 'encode'):
+                    timings[stage] = 0.0
+                for i, pred in zip(valid, preds):
+                    t = time.perf_counter()
+                    mask = postprocess(pred, images[i].size, spec, guide=images[i])
+                    timings['postprocess'] += time.perf_counter() - t
+                    item = {}
+                    body, _ = encode_cutout(images[i], mask, 'base64', timings=item)
+                    results[i]["image"] = body.decode()
+                    timings['composite'] += item['composite']
+                    timings['encode'] += item['encode']
+            timings['total'] = time.perf_counter() - start
+            record.status, record.timings = 200, timings
+
+            body = json.dumps({
+                "count": len(results),
+                "results": results,
+                "timings_ms": {stage: round(seconds * 1000, 1) for stage, seconds in timings.items()},
+            }).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('X-Model', spec.name)
+            self.send_header('Server-Timing', server_timing(timings))
+            self.send_header('Access-Control-Allow-Origin', '*')
+            self.send_header('Access-Control-Expose-Headers', 'Server-Timing, X-Model')
+            self.end_headers()
+            self.wfile.write(body)
+
+        except PayloadTooLarge as e:
+            record.status = 413
+            send_too_large(self, e)
+
+        except ValueError as e:
+            record.status = 400
+            self.send_response(400)
+            self.send_header('Content-Type', 'text/plain')
+            self.send_header('Access-Control-Allow-Origin', '*')
+            self.end_headers()
+            self.wfile.write(f"Bad Request: {str(e)}".encode())
+
+        except Exception as e:
+            error_msg = f"Internal Error: {str(e)}"
+            self.send_response(500)
+            self.send_header('Content-Type', 'text/plain')
+            self.send_header('Access-Control-Allow-Origin', '*')
+            self.end_headers()
+            self.wfile.write(error_msg.encode())
+
+    def do_GET(self):
+        path = urlsplit(self.path).path.rstrip('/')
+        if path.endswith('/stats'):
+            return PipelineHandler.do_GET_stats(self)
+
+        # Warmup Endpoint - REAL LOAD
+        # Dummy requests through the full path (?model=... to warm a specific one)
+        try:
+            query = parse_qs(urlsplit(self.path).query)
+            models = [requested_model(self).name] if 'model' in query or self.headers.get('X-Model') else None
+            warm_up(models)
+        except ValueError as e:
+            self.send_error(400, str(e))
+            return
+        
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain')
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.end_headers()
+        self.wfile.write(b"Warmed Up & Model Loaded")
+
+    def do_GET_stats(self):
+        # Scheduler statistics for tuning the batching window
+        stats = {
+            "models": {name: spec.to_dict() for name, spec in MODELS.items()},
+            "sessions": {
+                **sessions.stats(),
+                "load_info": {name: sessions.wrapper(name).load_info for name in sessions.stats()['loaded']},
+            },
+            "micro_batching": scheduler.stats() if scheduler else None,
+            "mask_cache": mask_cache.stats() if mask_cache else None,
+            "readiness": readiness,
+            "metrics": metrics.snapshot(),
+        }
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.end_headers()
+        self.wfile.write(json.dumps(stats).encode())
+
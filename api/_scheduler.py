@@ -0,0 +1,141 @@
+"""
+Dynamic micro-batching in front of U2NetSession
+
+Concurrent handler threads submit their preprocessed (1, 3, H, W) tensors.
+A single worker thread collects requests arriving within `window_ms` of the
+first one (or until `max_batch_size` is reached), runs them as one batched
+inference and hands each waiting thread its own prediction. This replaces N
+threads fighting over ONNX Runtime's intra-op pool with one batched run.
+"""
+import time
+import queue
+import threading
+from collections import deque
+
+import numpy as np
+
+
+class _Request:
+    __slots__ = ('tensor', 'enqueued', 'done', 'result', 'error')
+
+    def __init__(self, tensor):
+        self.tensor = tensor
+        self.enqueued = time.perf_counter()
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class MicroBatcher:
+    def __init__(self, run_batch, window_ms=5.0, max_batch_size=8, latency_window=1000):
+        """
+        run_batch: callable (N, 3, H, W) -> (N, ...) predictions, e.g. U2NetSession.run_batch
+        window_ms: how long to wait for more requests after the first one arrives
+        max_batch_size: dispatch immediately once this many requests are queued
+        """
+        self.run_batch = run_batch
+        self.window = window_ms / 1000.0
+        self.max_batch_size = max_batch_size
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._worker = None
+
+        # Statistics
+        self._batches = 0
+        self._requests = 0
+        self._errors = 0
+        self._max_depth = 0
+        self._batch_sizes = {}
+        self._waits = deque(maxlen=latency_window)
+        self._latencies = deque(maxlen=latency_window)
+
+    def submit(self, tensor):
+        """Queue one (1, 3, H, W) tensor and block until its prediction is ready"""
+        self._ensure_worker()
+        request = _Request(tensor)
+        self._queue.put(request)
+        with self._lock:
+            self._max_depth = max(self._max_depth, self._queue.qsize())
+
+        request.done.wait()
+        if request.error is not None:
+            raise request.error
+        return request.result
+
+    def _ensure_worker(self):
+        if self._worker and self._worker.is_alive():
+            return
+        with self._lock:
+            if not (self._worker and self._worker.is_alive()):
+                self._worker = threading.Thread(target=self._loop, name='micro-batcher', daemon=True)
+                self._worker.start()
+
+    def _collect(self):
+        """Block for the first request, then gather more until the window closes"""
+        batch = [self._queue.get()]
+        deadline = batch[0].enqueued + self.window
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _loop(self):
+        while True:
+            batch = self._collect()
+            dispatched = time.perf_counter()
+
+            # Only tensors of the same shape can be stacked
+            groups = {}
+            for request in batch:
+                groups.setdefault(request.tensor.shape[1:], []).append(request)
+
+            for group in groups.values():
+                try:
+                    preds = self.run_batch(np.concatenate([r.tensor for r in group], axis=0))
+                    for request, pred in zip(group, preds):
+                        request.result = pred[np.newaxis]
+                except Exception as e:
+                    for request in group:
+                        request.error = e
+                    with self._lock:
+                        self._errors += len(group)
+
+                finished = time.perf_counter()
+                with self._lock:
+                    self._batches += 1
+                    self._requests += len(group)
+                    self._batch_sizes[len(group)] = self._batch_sizes.get(len(group), 0) + 1
+                    for request in group:
+                        self._waits.append(dispatched - request.enqueued)
+                        self._latencies.append(finished - request.enqueued)
+                for request in group:
+                    request.done.set()
+
+    def stats(self):
+        """Queue depth, achieved batch sizes and recent queue-wait/latency percentiles (ms)"""
+        with self._lock:
+            waits = np.array(self._waits) * 1000
+            latencies = np.array(self._latencies) * 1000
+            return {
+                'window_ms': self.window * 1000,
+                'max_batch_size': self.max_batch_size,
+                'queue_depth': self._queue.qsize(),
+                'max_queue_depth': self._max_depth,
+                'batches': self._batches,
+                'requests': self._requests,
+                'errors': self._errors,
+                'avg_batch_size': round(self._requests / self._batches, 3) if self._batches else 0.0,
+                'batch_size_counts': dict(sorted(self._batch_sizes.items())),
+                'queue_wait_ms': _percentiles(waits),
+                'latency_ms': _percentiles(latencies),
+            }
+
+
+def _percentiles(values):
+    if len(values) == 0:
+        return {}
+    p50, p90, p99 = np.percentile(values, [50, 90, 99])
+    return {'p50': round(p50, 3), 'p90': round(p90, 3), 'p99': round(p99, 3), 'max': round(values.max(), 3)}
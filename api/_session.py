@@ -0,0 +1,168 @@
+"""
+ONNX Runtime session factory
+
+Builds SessionOptions from environment config and caches the optimized graph
+next to the model (e.g. silueta.ort-1.17.0-extended.onnx). Later cold starts load
+the cached graph with optimizations disabled instead of re-optimizing.
+If the model directory is read-only (Vercel's /var/task), the cache goes to
+ORT_CACHE_DIR instead; ship a prebuilt cache file next to the model to get
+the fast path on every cold start. 'all'-level graphs can contain
+hardware-specific kernels (e.g. NCHWc layouts), so their cache name also
+carries a CPU fingerprint (silueta.ort-1.17.0-all-3f2a9c1e.onnx) and a graph
+built on another CPU is never loaded. Build shipped caches with
+ORT_GRAPH_OPTIMIZATION=extended unless build and serve hosts match.
+
+Config (env):
+    ORT_INTRA_OP_THREADS    intra-op threads, 0 = ORT default
+    ORT_INTER_OP_THREADS    inter-op threads, 0 = ORT default
+    ORT_EXECUTION_MODE      sequential | parallel
+    ORT_GRAPH_OPTIMIZATION  disable | basic | extended | all
+    ORT_CPU_MEM_ARENA       1 | 0
+    ORT_MEM_PATTERN         1 | 0
+    ORT_OPTIMIZED_CACHE     1 | 0, persist and reuse the optimized graph
+    ORT_CACHE_DIR           fallback cache directory
+"""
+import os
+import time
+import hashlib
+import platform
+import tempfile
+from functools import lru_cache
+
+import onnxruntime as ort
+
+OPTIMIZATION_LEVELS = {
+    'disable': ort.GraphOptimizationLevel.ORT_DISABLE_ALL,
+    'basic': ort.GraphOptimizationLevel.ORT_ENABLE_BASIC,
+    'extended': ort.GraphOptimizationLevel.ORT_ENABLE_EXTENDED,
+    'all': ort.GraphOptimizationLevel.ORT_ENABLE_ALL,
+}
+
+EXECUTION_MODES = {
+    'sequential': ort.ExecutionMode.ORT_SEQUENTIAL,
+    'parallel': ort.ExecutionMode.ORT_PARALLEL,
+}
+
+
+def _env_flag(name, default):
+    return os.environ.get(name, default).strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+def load_config():
+    """Session config from the environment"""
+    return {
+        'intra_op_threads': int(os.environ.get('ORT_INTRA_OP_THREADS', '0')),
+        'inter_op_threads': int(os.environ.get('ORT_INTER_OP_THREADS', '0')),
+        'execution_mode': os.environ.get('ORT_EXECUTION_MODE', 'sequential').lower(),
+        'graph_optimization': os.environ.get('ORT_GRAPH_OPTIMIZATION', 'all').lower(),
+        'cpu_mem_arena': _env_flag('ORT_CPU_MEM_ARENA', '1'),
+        'mem_pattern': _env_flag('ORT_MEM_PATTERN', '1'),
+        'optimized_cache': _env_flag('ORT_OPTIMIZED_CACHE', '1'),
+        'cache_dir': os.environ.get('ORT_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'ort-cache')),
+    }
+
+
+def session_options(config):
+    options = ort.SessionOptions()
+    options.intra_op_num_threads = config['intra_op_threads']
+    options.inter_op_num_threads = config['inter_op_threads']
+    options.execution_mode = EXECUTION_MODES[config['execution_mode']]
+    options.graph_optimization_level = OPTIMIZATION_LEVELS[config['graph_optimization']]
+    options.enable_cpu_mem_arena = config['cpu_mem_arena']
+    options.enable_mem_pattern = config['mem_pattern']
+    return options
+
+
+@lru_cache(maxsize=None)
+def cpu_fingerprint():
+    """Short hash of the CPU model and instruction-set flags"""
+    details = [platform.machine(), platform.processor()]
+    try:
+        with open('/proc/cpuinfo') as f:
+            for line in f:
+                key = line.split(':', 1)[0].strip()
+                if key in ('vendor_id', 'model name', 'flags', 'Features', 'CPU part'):
+                    details.append(line.strip())
+                elif not line.strip():
+                    break  # first processor is enough
+    except OSError:
+        pass
+    return hashlib.sha1('\n'.join(details).encode()).hexdigest()[:8]
+
+
+def optimized_model_paths(model_path, config):
+    """Candidate cache paths: next to the model first, then the cache dir"""
+    stem, ext = os.path.splitext(os.path.basename(model_path))
+    # Optimized graphs are tied to the ORT version and optimization level,
+    # and at 'all' to the CPU they were built on
+    level = config['graph_optimization']
+    if level == 'all':
+        level = f"all-{cpu_fingerprint()}"
+    name = f"{stem}.ort-{ort.__version__}-{level}{ext}"
+    return [os.path.join(os.path.dirname(os.path.abspath(model_path)), name),
+            os.path.join(config['cache_dir'], name)]
+
+
+def _fresh_cache(path, model_path):
+    return os.path.exists(path) and os.path.getmtime(path) >= os.path.getmtime(model_path)
+
+
+def create_session(model_path, config=None):
+    """
+    Create an InferenceSession, reusing or writing the optimized-graph cache.
+    Returns (session, info) where info records the measured load time and source.
+    """
+    config = config or load_config()
+    options = session_options(config)
+    start = time.perf_counter()
+    info = {'model': model_path, 'source': 'model', 'optimized_path': None}
+
+    use_cache = config['optimized_cache'] and config['graph_optimization'] != 'disable'
+    if use_cache:
+        candidates = optimized_model_paths(model_path, config)
+        cached = next((p for p in candidates if _fresh_cache(p, model_path)), None)
+
+        if cached:
+            # Already optimized: skip re-running the graph transformers
+            options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_DISABLE_ALL
+            session = ort.InferenceSession(cached, sess_options=options, providers=['CPUExecutionProvider'])
+            info.update(source='optimized-cache', optimized_path=cached)
+            info['load_time'] = time.perf_counter() - start
+            return session, info
+
+        target = _writable_target(candidates)
+        if target:
+            # Write to a private temp name (unique per thread and process), publish
+            # atomically once the session is built
+            fd, tmp_path = tempfile.mkstemp(prefix=os.path.basename(target) + '.',
+                                            suffix='.tmp', dir=os.path.dirname(target))
+            os.close(fd)
+            options.optimized_model_filepath = tmp_path
+            try:
+                session = ort.InferenceSession(model_path, sess_options=options, providers=['CPUExecutionProvider'])
+                try:
+                    os.replace(tmp_path, target)
+                    info['optimized_path'] = target
+                except OSError as e:
+                    print(f"Could not cache optimized model: {e}")
+            finally:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+            info['load_time'] = time.perf_counter() - start
+            return session, info
+
+    session = ort.InferenceSession(model_path, sess_options=options, providers=['CPUExecutionProvider'])
+    info['load_time'] = time.perf_counter() - start
+    return session, info
+
+
+def _writable_target(candidates):
+    for path in candidates:
+        directory = os.path.dirname(path)
+        try:
+            os.makedirs(directory, exist_ok=True)
+        except OSError:
+            continue
+        if os.access(directory, os.W_OK):
+            return path
+    return None
@@ -0,0 +1,151 @@
+"""
+Mask upsampling engines for postprocess
+
+The model predicts alpha at its input resolution (320px for Silueta); the
+cut-out needs it at photo resolution (12-24MP on phones).
+    lanczos   previous behaviour: large-kernel resample, slow and soft at hair
+    bilinear  default and fastest; edges as soft as the low-res mask
+    guided    fast guided filter (He & Sun, 2015) with the photo's luminance as
+              guide: the linear model alpha ~ a * I + b is fitted with a few box
+              filters at working resolution, then a and b are upsampled and
+              applied only on tiles along the mask edge, so edges snap to the
+              full-resolution image. Sharper than lanczos and a little faster
+              on 12MP+ photos, but about twice bilinear's cost there and slower
+              than lanczos at small sizes (fixed working-resolution cost), so
+              opt-in
+
+Config (env):
+    REMOVE_BG_UPSAMPLER         lanczos | bilinear | guided
+    REMOVE_BG_GUIDED_RADIUS     box radius in working-resolution px
+    REMOVE_BG_GUIDED_EPS        regularization; lower follows the guide more closely
+    REMOVE_BG_GUIDED_WORK_SIZE  long side of the working resolution (default: the
+                                mask resolution; larger is slower and no sharper)
+"""
+import os
+
+import numpy as np
+from PIL import Image
+
+UPSAMPLER = os.environ.get('REMOVE_BG_UPSAMPLER', 'bilinear').lower()
+GUIDED_RADIUS = int(os.environ.get('REMOVE_BG_GUIDED_RADIUS', '2'))
+GUIDED_EPS = float(os.environ.get('REMOVE_BG_GUIDED_EPS', '1e-3'))
+GUIDED_WORK_SIZE = int(os.environ.get('REMOVE_BG_GUIDED_WORK_SIZE', '320'))
+# Working-resolution tile size for the full-resolution pass (edge tiles only)
+GUIDED_TILE = 16
+
+
+def upsample_lanczos(mask, size, guide=None):
+    return mask.resize(size, Image.LANCZOS)
+
+
+def upsample_bilinear(mask, size, guide=None):
+    return mask.resize(size, Image.BILINEAR)
+
+
+def _box_sum(x, r, axis):
+    # Sliding window sum of width 2r+1 along axis via a cumulative sum (He et al.)
+    x = np.moveaxis(x, axis, 0)
+    n = x.shape[0]
+    cum = np.cumsum(x, axis=0, dtype=np.float64)
+    out = np.empty_like(cum)
+    out[:r + 1] = cum[r:2 * r + 1]
+    out[r + 1:n - r] = cum[2 * r + 1:] - cum[:n - 2 * r - 1]
+    out[n - r:] = cum[-1] - cum[n - 2 * r - 1:n - r - 1]
+    return np.moveaxis(out, 0, axis)
+
+
+def box_filter(x, r):
+    """
+    Mean over a (2r+1)^2 window, shrinking at the borders; O(1) per pixel in r.
+    x is (..., h, w), so several maps can be filtered in one pass.
+    """
+    h, w = x.shape[-2:]
+    r = min(r, (h - 1) // 2, (w - 1) // 2)
+    if r <= 0:
+        return x.astype(np.float32)
+    count_y = np.minimum(np.arange(h) + r + 1, h) - np.maximum(np.arange(h) - r, 0)
+    count_x = np.minimum(np.arange(w) + r + 1, w) - np.maximum(np.arange(w) - r, 0)
+    total = _box_sum(_box_sum(x, r, -2), r, -1)
+    return (total / np.outer(count_y, count_x)).astype(np.float32)
+
+
+def upsample_guided(mask, size, guide=None, radius=None, eps=None, work_size=None):
+    """
+    mask: low-res 'L' alpha; size: (w, h) output; guide: full-res photo (PIL).
+    Falls back to bilinear without a guide.
+    """
+    if guide is None:
+        return upsample_bilinear(mask, size)
+    radius = GUIDED_RADIUS if radius is None else radius
+    eps = GUIDED_EPS if eps is None else eps
+    work_size = work_size or GUIDED_WORK_SIZE
+
+    # Working resolution: the photo's aspect ratio, never above the output size
+    w, h = size
+    scale = min(1.0, work_size / max(w, h))
+    work = (max(1, round(w * scale)), max(1, round(h * scale)))
+
+    luma = guide.convert('L')
+    if luma.size != size:
+        luma = luma.resize(size, Image.BILINEAR)
+    # reducing_gap box-reduces by an integer factor first: far cheaper than a
+    # full-support bilinear downscale of the whole frame
+    I = np.asarray(luma.resize(work, Image.BILINEAR, reducing_gap=2.0), dtype=np.float32) / 255.0
+    p = np.asarray(mask.resize(work, Image.BILINEAR), dtype=np.float32) / 255.0
+
+    # Two stacked box-filter passes: (I, p, I*p, I*I) then (a, b)
+    mean_I, mean_p, corr_Ip, corr_I = box_filter(np.stack([I, p, I * p, I * I]), radius)
+    a = (corr_Ip - mean_I * mean_p) / (corr_I - mean_I * mean_I + eps)
+    b = mean_p - a * mean_I
+    mean_a, mean_b = box_filter(np.stack([a, b]), radius)
+    # Fold the 0..255 -> 0..1 guide scaling and the 0..1 -> 0..255 output scaling into a, b
+    mean_b *= 255.0
+
+    # Full resolution: away from edges a ~ 0 and the mask is flat (0 or 255), so a
+    # nearest-neighbour fill is exact there; the guided model a * I + b is only
+    # evaluated on tiles that contain an edge and pasted over it
+    flat = Image.fromarray(np.rint(mean_p * 255).astype(np.uint8), mode='L')
+    out = flat.resize(size, Image.NEAREST)
+    edge = (mean_p > 0.002) & (mean_p < 0.998)
+    img_a = Image.fromarray(mean_a, mode='F')
+    img_b = Image.fromarray(mean_b, mode='F')
+    fx, fy = work[0] / w, work[1] / h
+    for wy0 in range(0, work[1], GUIDED_TILE):
+        for wx0 in range(0, work[0], GUIDED_TILE):
+            wy1, wx1 = min(wy0 + GUIDED_TILE, work[1]), min(wx0 + GUIDED_TILE, work[0])
+            if not edge[wy0:wy1, wx0:wx1].any():
+                continue
+            # Tile in output pixels, and the matching (fractional) source box
+            x0, x1 = int(wx0 / fx), (w if wx1 == work[0] else int(wx1 / fx))
+            y0, y1 = int(wy0 / fy), (h if wy1 == work[1] else int(wy1 / fy))
+            box = (x0 * fx, y0 * fy, x1 * fx, y1 * fy)
+            tile = (x1 - x0, y1 - y0)
+            q = np.array(img_a.resize(tile, Image.BILINEAR, box=box))
+            q *= np.asarray(luma.crop((x0, y0, x1, y1)))
+            q += np.asarray(img_b.resize(tile, Image.BILINEAR, box=box))
+            np.clip(q, 0, 255, out=q)
+            out.paste(Image.fromarray(q.astype(np.uint8), mode='L'), (x0, y0))
+    return out
+
+
+UPSAMPLERS = {
+    'lanczos': upsample_lanczos,
+    'bilinear': upsample_bilinear,
+    'guided': upsample_guided,
+}
+
+
+def upsample_mask(mask, size, guide=None, method=None):
+    """Upsample a low-res 'L' mask to size with the configured (or given) method"""
+    method = (method or UPSAMPLER).lower()
+    if method not in UPSAMPLERS:
+        raise ValueError(f"Unknown upsampler '{method}' (available: {', '.join(UPSAMPLERS)})")
+    return UPSAMPLERS[method](mask, size, guide)
+
+
+def upsampler_identity(method=None):
+    """Method and parameters, for cache keys: masks differ when any of these change"""
+    method = (method or UPSAMPLER).lower()
+    if method == 'guided':
+        return f"guided:r{GUIDED_RADIUS}:eps{GUIDED_EPS}:w{GUIDED_WORK_SIZE}"
+    return method
@@ -1,143 +1,68 @@
 from http.server import BaseHTTPRequestHandler
+from urllib.parse import urlsplit
 import os
-import io
-import requests
-import base64
-import numpy as np
-from PIL import Image
-import onnxruntime as ort
-import json
+import sys
 
-# Configuration
-# Switching to Silueta (~40MB) for lightweight deployment.
-MODEL_PATH = os.path.join(os.path.dirname(__file__), 'silueta.onnx')
+# Vercel loads this file as a top-level module; make sibling helpers importable.
+# Helpers are underscore-prefixed so Vercel does not deploy them as functions.
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import _http  # noqa: E402
+from _metrics import metrics  # noqa: E402
 
-class U2NetSession:
-    def __init__(self):
-        self.session = None
+# Cold starts pay for every import here, including OPTIONS preflights and health
+# checks that never run a model. This module is standard library only; numpy,
+# onnxruntime, PIL and the models live in _pipeline.py, imported on first use.
+# (benchmarks/bench_import_time.py keeps this under a budget.)
 
-    def ensure_session(self):
-        if self.session:
-            return self.session
-        
-        if not os.path.exists(MODEL_PATH):
-           # Fail fast if model is missing in production
-           raise FileNotFoundError(f"Model file not found at {MODEL_PATH}")
-        
-        print(f"Loading ONNX Session from {MODEL_PATH}...")
-        self.session = ort.InferenceSession(MODEL_PATH)
-        return self.session
+def pipeline():
+    """The inference half (_pipeline.py), imported on first call"""
+    import _pipeline
+    return _pipeline
 
-# Global Singleton
-u2net = U2NetSession()
-
-def preprocess(image):
-    # Resize to 320x320 (Silueta Native Resolution)
-    img = image.resize((320, 320), Image.BILINEAR)
-    
-    img_np = np.array(img).astype(np.float32)
-    # Normalize: (Img - Mean) / Std
-    # Mean: [0.5, 0.5, 0.5], Std: [1.0, 1.0, 1.0] (ISNet usually uses simple 0.5 mean?)
-    # Wait, rembg uses [0.5,0.5,0.5] mean and [1.0,1.0,1.0] std for ISNet?
-    # Actually U2Net uses ImageNet mean. ISNet often does too.
-    # Let's double check standard U2Net/ISNet preprocessing.
-    # Rembg uses specific processing for ISNet.
-    # For safety, let's stick to standard ImageNet normalization as it's robust for most.
-    # Mean: [0.485, 0.456, 0.406], Std: [0.229, 0.224, 0.225]
-    
-    
-    img_np /= 255.0
-    # ImageNet Normalization (Standard for Silueta/U2Net)
-    # Mean: [0.485, 0.456, 0.406], Std: [0.229, 0.224, 0.225]
-    img_np -= np.array([0.485, 0.456, 0.406])
-    img_np /= np.array([0.229, 0.224, 0.225])
-    
-    # HWC -> CHW (1, 3, 320, 320)
-    img_np = img_np.transpose((2, 0, 1))
-    img_np = np.expand_dims(img_np, axis=0)
-    return img_np
-
-def postprocess(pred, original_size):
-    # Pred: (1, 1, 320, 320) -> Alpha Mask
-    ma = np.squeeze(pred) # (320, 320)
-    
-    # 1. Normalize 0..1 (Min-Max)
-    ma = (ma - ma.min()) / (ma.max() - ma.min() + 1e-8)
-    
-    # 2. Relaxed Contrast (Sigmoid-like but simpler)
-    # Was (ma - 0.2) / 0.6 -> Too aggressive, kills soft edges.
-    # New: Gentle S-Curve to push values apart without clipping hard
-    # Or just return raw normalized mask for safety first.
-    # Let's just create the image from normalized 0..1 directly.
-    
-    # 3. Resize back to original size with High Quality Interpolation
-    ma_img = Image.fromarray((ma * 255).astype(np.uint8), mode='L')
-
-    # 3. Resize back to original size with High Quality Interpolation
-    ma_img = Image.fromarray((ma * 255).astype(np.uint8), mode='L')
-    ma_img = ma_img.resize(original_size, Image.LANCZOS)
-    return ma_img
+def __getattr__(name):
+    # index.preprocess, index.sessions, index.enable_micro_batching, ... resolve
+    # lazily in _pipeline so existing imports keep working
+    if name.startswith('__'):
+        raise AttributeError(name)
+    return getattr(pipeline(), name)
 
 class handler(BaseHTTPRequestHandler):
     def do_POST(self):
-        try:
-            content_length = int(self.headers.get('Content-Length', 0))
-            if content_length == 0:
-                self.send_error(400, "Content-Length required")
-                return
-
-            post_data = self.rfile.read(content_length)
-            input_image = Image.open(io.BytesIO(post_data)).convert("RGB")
-            
-            # 1. Prepare Session
-            session = u2net.ensure_session()
-            
-            # 2. Inference
-            input_name = session.get_inputs()[0].name
-            img_input = preprocess(input_image)
-            output = session.run(None, {input_name: img_input})
-            
-            # 3. Post Process (Mask)
-            mask = postprocess(output[0], input_image.size)
-            
-            # 4. Apply Mask
-            empty = Image.new("RGBA", input_image.size, 0)
-            final_image = Image.composite(input_image, empty, mask)
-            
-            # 5. Output
-            buffered = io.BytesIO()
-            final_image.save(buffered, format="PNG")
-            img_str = base64.b64encode(buffered.getvalue()).decode()
-
-            self.send_response(200)
-            self.send_header('Content-Type', 'text/plain')
-            self.send_header('Access-Control-Allow-Origin', '*')
-            self.end_headers()
-            self.wfile.write(img_str.encode())
-            
-        except Exception as e:
-            # Capture and return actual error details
-            error_msg = f"Internal Error: {str(e)}"
-            self.send_response(500)
-            self.send_header('Content-Type', 'text/plain')
-            self.send_header('Access-Control-Allow-Origin', '*')
-            self.end_headers()
-            self.wfile.write(error_msg.encode())
+        pipeline().PipelineHandler.do_POST(self)
 
     def do_OPTIONS(self):
         self.send_response(200)
         self.send_header('Access-Control-Allow-Origin', '*')
         self.send_header('Access-Control-Allow-Methods', 'POST, GET, OPTIONS')
-        self.send_header('Access-Control-Allow-Headers', 'Content-Type')
+        self.send_header('Access-Control-Allow-Headers', 'Content-Type, Accept, X-Model')
         self.end_headers()
 
     def do_GET(self):
-        # Warmup Endpoint - REAL LOAD
-        # Force model load into memory
-        u2net.ensure_session()
-        
+        path = urlsplit(self.path).path.rstrip('/')
+        if path.endswith('/live'):
+            # Liveness: the process answers; never touches a model
+            return handler.send_json(self, 200, {'status': 'alive'})
+        if path.endswith('/ready'):
+            # Readiness: 503 until warm-up has run the full path for every warm-up model
+            loaded = sys.modules.get('_pipeline')
+            readiness = loaded.readiness if loaded else {'status': 'cold', 'models': {}, 'error': None}
+            return handler.send_json(self, 200 if readiness['status'] == 'ready' else 503, readiness)
+
+        if path.endswith('/metrics'):
+            # Prometheus text format; stage histograms, in-flight gauges, error counters
+            return handler.send_metrics(self)
+
+        # Warm-up and stats
+        pipeline().PipelineHandler.do_GET(self)
+
+    send_json = _http.send_json
+    send_too_large = _http.send_too_large
+
+    def send_metrics(self, registry=None):
+        body = (registry or metrics).render().encode()
         self.send_response(200)
-        self.send_header('Content-Type', 'text/plain')
-        self.send_header('Access-Control-Allow-Origin', '*')
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Cache-Control', 'no-store')
         self.end_headers()
-        self.wfile.write(b"Warmed Up & Model Loaded")
+        self.wfile.write(body)
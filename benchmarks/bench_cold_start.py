@@ -0,0 +1,89 @@
+"""
+ONNX session cold-start benchmark
+
+Each measurement runs in a fresh Python process, like a serverless cold start:
+  default   ort.InferenceSession(model) with default options (previous behaviour)
+  factory   create_session() with the optimized-graph cache removed (first deploy)
+  cached    create_session() loading the cached optimized graph (later starts)
+plus the first inference on a (1, 3, S, S) input, which pays kernel selection.
+
+Usage:
+    python benchmarks/bench_cold_start.py [--model api/silueta.onnx] [--runs 5]
+"""
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+CHILD = r'''
+import sys, time, json
+t0 = time.perf_counter()
+import numpy as np
+import onnxruntime as ort
+sys.path.insert(0, {api_dir!r})
+from _session import create_session
+t_import = time.perf_counter() - t0
+
+t1 = time.perf_counter()
+if {mode!r} == 'default':
+    session = ort.InferenceSession({model!r})
+    source = 'model'
+else:
+    session, info = create_session({model!r})
+    source = info['source']
+t_load = time.perf_counter() - t1
+
+inp = session.get_inputs()[0]
+size = inp.shape[2] if isinstance(inp.shape[2], int) else 320
+x = np.zeros((1, 3, size, size), dtype=np.float32)
+t2 = time.perf_counter()
+session.run(None, {{inp.name: x}})
+t_first = time.perf_counter() - t2
+
+print(json.dumps({{'import': t_import, 'load': t_load, 'first_run': t_first, 'source': source}}))
+'''
+
+
+def run_child(mode, model):
+    code = CHILD.format(api_dir=os.path.join(ROOT, 'api'), mode=mode, model=model)
+    out = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def clear_cache(model):
+    sys.path.insert(0, os.path.join(ROOT, 'api'))
+    from _session import load_config, optimized_model_paths
+    for path in optimized_model_paths(model, load_config()):
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--model', default=os.path.join(ROOT, 'api', 'silueta.onnx'))
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+    model = os.path.abspath(args.model)
+
+    results = {'default': [], 'factory': [], 'cached': []}
+    for _ in range(args.runs):
+        results['default'].append(run_child('default', model))
+        clear_cache(model)
+        results['factory'].append(run_child('factory', model))
+        results['cached'].append(run_child('cached', model))
+
+    print(f"Model: {model} ({os.path.getsize(model) / 1e6:.1f}MB), {args.runs} cold starts each (median)")
+    print(f"{'path':>8} {'import':>9} {'load':>9} {'1st run':>9} {'total':>9}  source")
+    for mode, runs in results.items():
+        med = {k: statistics.median(r[k] for r in runs) * 1000 for k in ('import', 'load', 'first_run')}
+        total = sum(med.values())
+        print(f"{mode:>8} {med['import']:>7.1f}ms {med['load']:>7.1f}ms {med['first_run']:>7.1f}ms "
+              f"{total:>7.1f}ms  {runs[-1]['source']}")
+
+
+if __name__ == '__main__':
+    main()
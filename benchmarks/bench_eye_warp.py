@@ -0,0 +1,116 @@
+"""
+Eye enlargement warp benchmark
+
+Times AutoHairModel._enlarge_eyes on synthetic photos to show that the ROI
+warp engine scales with the eye region, not with the photo size.
+
+Usage:
+    python benchmarks/bench_eye_warp.py [--repeat 5] [--legacy]
+
+--legacy also times the old per-pixel loop on the smallest photo only
+(it takes minutes on large inputs).
+"""
+import os
+import sys
+import time
+import argparse
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'modal_app'))
+from auto_hair import AutoHairModel  # noqa: E402
+
+# (width, height) of synthetic uploads
+PHOTO_SIZES = [(750, 1000), (1500, 2000), (3000, 4000)]
+# Eye radius in px for the fixed-photo sweep
+EYE_RADII = [20, 40, 80, 160]
+
+
+def legacy_spherical_magnify(img, cx, cy, radius, scale):
+    """Original per-pixel implementation, kept for comparison"""
+    import cv2
+    h, w = img.shape[:2]
+    map_x = np.zeros((h, w), dtype=np.float32)
+    map_y = np.zeros((h, w), dtype=np.float32)
+    for y in range(h):
+        for x in range(w):
+            map_x[y, x] = x
+            map_y[y, x] = y
+    for y in range(max(0, cy - radius * 2), min(h, cy + radius * 2)):
+        for x in range(max(0, cx - radius * 2), min(w, cx + radius * 2)):
+            dx = x - cx
+            dy = y - cy
+            dist = np.sqrt(dx**2 + dy**2)
+            if dist < radius * 1.5:
+                factor = (dist / radius) ** (1 / scale)
+                map_x[y, x] = max(0, min(w - 1, cx + dx * factor))
+                map_y[y, x] = max(0, min(h - 1, cy + dy * factor))
+    return cv2.remap(img, map_x, map_y, cv2.INTER_LINEAR)
+
+
+def make_face(w, h, eye_radius=None):
+    """Synthetic face positions; optionally force a given eye radius"""
+    face = AutoHairModel()._estimate_face_positions(w, h)
+    if eye_radius is not None:
+        # _enlarge_eyes uses radius = spacing * 0.18
+        spacing = eye_radius / 0.18
+        face['pupilLeft']['x'] = w / 2 - spacing / 2
+        face['pupilRight']['x'] = w / 2 + spacing / 2
+    return face
+
+
+def time_call(fn, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--scale', type=float, default=1.2)
+    parser.add_argument('--legacy', action='store_true')
+    args = parser.parse_args()
+
+    model = AutoHairModel()
+    rng = np.random.default_rng(0)
+
+    print("Photo size sweep (eye radius fixed at 40px)")
+    print(f"{'photo':>12} {'pixels':>10} {'roi warp':>10}")
+    for w, h in PHOTO_SIZES:
+        img = rng.integers(0, 256, (h, w, 3), dtype=np.uint8)
+        face = make_face(w, h, eye_radius=40)
+        t = time_call(lambda: model._enlarge_eyes(img, face, args.scale, inplace=True), args.repeat)
+        print(f"{f'{w}x{h}':>12} {w * h:>10} {t * 1000:>8.2f}ms")
+
+    w, h = PHOTO_SIZES[-1]
+    img = rng.integers(0, 256, (h, w, 3), dtype=np.uint8)
+    print(f"\nEye radius sweep (photo fixed at {w}x{h})")
+    print(f"{'radius':>12} {'eye px':>10} {'roi warp':>10}")
+    for radius in EYE_RADII:
+        face = make_face(w, h, eye_radius=radius)
+        t = time_call(lambda: model._enlarge_eyes(img, face, args.scale, inplace=True), args.repeat)
+        print(f"{radius:>12} {(3 * radius) ** 2 * 2:>10} {t * 1000:>8.2f}ms")
+
+    if args.legacy:
+        w, h = PHOTO_SIZES[0]
+        img = rng.integers(0, 256, (h, w, 3), dtype=np.uint8)
+        face = make_face(w, h, eye_radius=40)
+        radius = int(abs(face['pupilRight']['x'] - face['pupilLeft']['x']) * 0.18)
+
+        def legacy():
+            out = img
+            for key in ['pupilLeft', 'pupilRight']:
+                out = legacy_spherical_magnify(out, int(face[key]['x']), int(face[key]['y']), radius, args.scale)
+            return out
+
+        t_legacy = time_call(legacy, 1)
+        t_roi = time_call(lambda: model._enlarge_eyes(img, face, args.scale, inplace=True), args.repeat)
+        print(f"\nLegacy per-pixel loop at {w}x{h}: {t_legacy * 1000:.1f}ms "
+              f"(roi warp {t_roi * 1000:.2f}ms, {t_legacy / t_roi:.0f}x faster)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,129 @@
+"""
+DeepLab CPU profile benchmark for AutoHairModel
+
+Compares DeepLabBackend's plain eager path (NCHW, default threads, the
+weights built from torchvision on every start) against the CPU profile
+(frozen TorchScript graph, channels-last, torch.inference_mode,
+AUTO_HAIR_TORCH_THREADS) on synthetic portraits. Reports per backend:
+  load      container-start cost: eager build, first start (script + cache
+            the graph) and later starts (reload the cached graph)
+  ms        median segment() time per photo size
+  IoU       mask agreement between the two paths (1.0 = identical)
+  parity    lowest IoU between segment_batch() and per-image segment() on
+            photos that share one size bucket (so get edge-padded); exits 1
+            below --min-parity-iou
+
+The TorchScript cache goes to a temporary directory, not the models volume.
+Needs torch and torchvision (the Modal image's versions); the first run
+downloads the DeepLab weights into TORCH_HOME.
+
+Usage:
+    python benchmarks/bench_hair_cpu.py [--backends deeplab-mobilenet,deeplab-resnet101]
+                                        [--sizes 1000x750,4000x3000] [--repeat 3] [--threads 0]
+                                        [--parity-sizes 900x700,960x720,1000x750]
+                                        [--min-parity-iou 0.98]
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import statistics
+
+import numpy as np
+
+
+def timed(fn):
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def median_ms(fn, repeat):
+    fn()
+    return statistics.median(timed(fn) for _ in range(repeat)) * 1000
+
+
+def iou(a, b):
+    a, b = a > 127, b > 127
+    union = np.logical_or(a, b).sum()
+    return np.logical_and(a, b).sum() / union if union else 1.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--backends', default='deeplab-mobilenet,deeplab-resnet101')
+    parser.add_argument('--sizes', default='1000x750,4000x3000', help='HxW photo sizes')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--threads', type=int, default=0, help='AUTO_HAIR_TORCH_THREADS (0 = all cores)')
+    parser.add_argument('--parity-sizes', default='900x700,960x720,1000x750',
+                        help='HxW photo sizes batched together (same 128px bucket)')
+    parser.add_argument('--min-parity-iou', type=float, default=0.98)
+    args = parser.parse_args()
+
+    try:
+        import torch
+    except ImportError as e:
+        sys.exit(f"bench_hair_cpu needs torch and torchvision: {e}")
+
+    cache_dir = tempfile.mkdtemp(prefix='auto-hair-torchscript-')
+    # Read by auto_hair at import time
+    os.environ['AUTO_HAIR_TORCHSCRIPT_CACHE'] = cache_dir
+    os.environ['AUTO_HAIR_TORCH_THREADS'] = str(args.threads)
+    here = os.path.dirname(os.path.abspath(__file__))
+    sys.path.insert(0, os.path.join(here, '..', 'modal_app'))
+    sys.path.insert(0, here)
+    from auto_hair import SEGMENTATION_BACKENDS, DeepLabBackend  # noqa: E402
+    from bench_upsample import synthetic_portrait  # noqa: E402
+
+    def portraits(sizes):
+        photos = []
+        for size in sizes.split(','):
+            h, w = (int(v) for v in size.split('x'))
+            image, _, _ = synthetic_portrait(w, h)
+            photos.append((f"{w}x{h}", np.asarray(image)))
+        return photos
+
+    photos = portraits(args.sizes)
+    parity_photos = [img for _, img in portraits(args.parity_sizes)]
+    parity_failed = False
+
+    default_threads = torch.get_num_threads()
+    for name in args.backends.split(','):
+        arch = SEGMENTATION_BACKENDS[name]().arch
+        eager = DeepLabBackend(name, arch, cpu_profile=False)
+        eager_load = timed(eager.load)
+        eager_ms, eager_masks = [], []
+        for _, img in photos:
+            eager_ms.append(median_ms(lambda: eager.segment(img), args.repeat))
+            eager_masks.append(eager.segment(img))
+        # Free the eager model before loading the profiled one
+        eager = None
+
+        profile = DeepLabBackend(name, arch)
+        first_load = timed(profile.load)
+        again = DeepLabBackend(name, arch)
+        cached_load = timed(again.load)
+        print(f"\n{name} ({arch}), CPU profile with {torch.get_num_threads()} threads "
+              f"(eager: {default_threads}), graph {profile.load_source} -> {again.load_source}")
+        print(f"    load      eager {eager_load:.2f}s | profile first start {first_load:.2f}s, "
+              f"cached {cached_load:.2f}s")
+        print(f"    {'photo':<12} {'eager':>10} {'profile':>10} {'speedup':>8} {'IoU':>7}")
+        for (label, img), before, mask in zip(photos, eager_ms, eager_masks):
+            after = median_ms(lambda: again.segment(img), args.repeat)
+            print(f"    {label:<12} {before:>8.1f}ms {after:>8.1f}ms {before / after:>7.2f}x "
+                  f"{iou(mask, again.segment(img)):>7.4f}")
+
+        batched, buckets = again.segment_batch(parity_photos)
+        parity = min(iou(mask, again.segment(img)) for mask, img in zip(batched, parity_photos))
+        shapes = ', '.join('{}x{}'.format(*bucket['shape']) for bucket in buckets)
+        print(f"    parity    batch of {len(parity_photos)} in {shapes} vs single: min IoU {parity:.4f}")
+        parity_failed |= parity < args.min_parity_iou
+        torch.set_num_threads(default_threads)
+
+    if parity_failed:
+        sys.exit(f"batched masks differ from single-image masks (IoU < {args.min_parity_iou})")
+
+
+if __name__ == '__main__':
+    main()
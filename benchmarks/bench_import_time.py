@@ -0,0 +1,95 @@
+"""
+Cold-start import profile for api/index.py, with a budget check
+
+Every cold start of the serverless function pays for `import index` before
+the first byte is served, including OPTIONS preflights and health checks.
+index.py is meant to stay standard library only, with numpy / onnxruntime /
+PIL deferred to _pipeline.py. Each run is a fresh interpreter with
+-X importtime, measuring two scenarios:
+    http      import index                    (what every request pays)
+    pipeline  import index; index.pipeline()  (first inference request)
+and printing the median wall time plus the slowest packages by import time.
+
+Exits 1 (usable as a CI check) if the http scenario's median exceeds
+--budget-ms, or if importing index pulls in any of the heavy packages.
+
+Usage:
+    python benchmarks/bench_import_time.py [--runs 5] [--budget-ms 75] [--top 12]
+"""
+import os
+import re
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+from collections import defaultdict
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+HEAVY = ('numpy', 'onnxruntime', 'PIL')
+
+CHILD = r'''
+import sys, time, json
+sys.path.insert(0, {api_dir!r})
+t0 = time.perf_counter()
+import index
+t_index = time.perf_counter() - t0
+heavy = [name for name in {heavy!r} if name in sys.modules]
+if {pipeline!r}:
+    index.pipeline()
+print(json.dumps({{'index': t_index, 'total': time.perf_counter() - t0, 'heavy': heavy}}))
+'''
+
+LINE = re.compile(r'import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)')
+
+
+def run_child(pipeline):
+    code = CHILD.format(api_dir=os.path.join(ROOT, 'api'), heavy=HEAVY, pipeline=pipeline)
+    out = subprocess.run([sys.executable, '-X', 'importtime', '-c', code],
+                         capture_output=True, text=True, check=True)
+    result = json.loads(out.stdout.strip().splitlines()[-1])
+    # Self time per top-level package, for modules imported by the code above
+    packages = defaultdict(float)
+    for match in LINE.finditer(out.stderr):
+        self_us, _, _, module = match.groups()
+        packages[module.split('.')[0]] += int(self_us) / 1000
+    result['packages'] = packages
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--budget-ms', type=float, default=75.0, help='Budget for `import index` (median)')
+    parser.add_argument('--top', type=int, default=12, help='Packages to list per scenario')
+    args = parser.parse_args()
+
+    failures = []
+    for scenario, pipeline in (('http', False), ('pipeline', True)):
+        runs = [run_child(pipeline) for _ in range(args.runs)]
+        wall = statistics.median(r['total'] for r in runs) * 1000
+        packages = defaultdict(list)
+        for r in runs:
+            for name, ms in r['packages'].items():
+                packages[name].append(ms)
+        ranked = sorted(((statistics.median(v), name) for name, v in packages.items()), reverse=True)
+
+        print(f"{scenario}: {wall:.1f}ms median over {args.runs} fresh interpreters")
+        for ms, name in ranked[:args.top]:
+            print(f"    {name:<24} {ms:>7.1f}ms")
+
+        if scenario == 'http':
+            heavy = sorted({name for r in runs for name in r['heavy']})
+            if heavy:
+                failures.append(f"import index loaded {', '.join(heavy)}")
+            if wall > args.budget_ms:
+                failures.append(f"import index took {wall:.1f}ms (budget {args.budget_ms:.0f}ms)")
+
+    if failures:
+        print("FAIL: " + "; ".join(failures))
+        sys.exit(1)
+    print(f"OK: import index within {args.budget_ms:.0f}ms, no heavy packages")
+
+
+if __name__ == '__main__':
+    main()
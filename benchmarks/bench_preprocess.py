@@ -0,0 +1,90 @@
+"""
+Preprocessing / inference-call microbenchmark
+
+Compares, per call:
+  legacy    float32 copy, float64 mean/std broadcasts, transpose + expand_dims,
+            then session.run() (previous preprocess in api/index.py)
+  buffered  lookup-table normalization into this thread's reusable NCHW buffer,
+            then U2NetSession.run() through ORT IO binding
+reporting median time and the Python-side heap peak per call (tracemalloc,
+which sees NumPy's array allocations). ORT's own arena is not visible to it.
+
+Usage:
+    python benchmarks/bench_preprocess.py [--model silueta] [--size 1000x750] [--runs 200]
+"""
+import os
+import sys
+import time
+import argparse
+import statistics
+import tracemalloc
+
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'api'))
+import index  # noqa: E402
+from _preprocess import input_buffer  # noqa: E402
+
+
+def legacy_preprocess(image, spec):
+    img = image.resize((spec.input_size, spec.input_size), Image.BILINEAR)
+    img_np = np.array(img).astype(np.float32)
+    img_np /= 255.0
+    img_np -= np.array(spec.mean)
+    img_np /= np.array(spec.std)
+    img_np = img_np.transpose((2, 0, 1))
+    return np.expand_dims(img_np, axis=0)
+
+
+def measure(fn, runs):
+    fn()  # warm up buffers, bindings and LUTs
+    times = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    tracemalloc.reset_peak()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return statistics.median(times) * 1000, peak - before
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--model', default=index.DEFAULT_MODEL)
+    parser.add_argument('--size', default='1000x750', help='Input photo WxH')
+    parser.add_argument('--runs', type=int, default=200)
+    args = parser.parse_args()
+
+    spec = index.resolve_model(args.model)
+    w, h = (int(v) for v in args.size.split('x'))
+    image = Image.fromarray(np.random.default_rng(0).integers(0, 256, (h, w, 3), dtype=np.uint8))
+    wrapper = index.sessions.acquire(spec.name)
+    session = wrapper.ensure_session()
+    input_name = session.get_inputs()[0].name
+
+    legacy = legacy_preprocess(image, spec)
+    buffered = index.preprocess(image, spec, out=input_buffer(spec.input_size))
+    print(f"Model: {spec.name} ({spec.input_size}px)  photo {w}x{h}  "
+          f"identical tensors: {np.array_equal(legacy, buffered)}")
+
+    cases = {
+        'legacy preprocess': lambda: legacy_preprocess(image, spec),
+        'buffered preprocess': lambda: index.preprocess(image, spec, out=input_buffer(spec.input_size)),
+        'legacy + session.run': lambda: session.run(None, {input_name: legacy_preprocess(image, spec)})[0],
+        'buffered + io binding': lambda: wrapper.run(
+            index.preprocess(image, spec, out=input_buffer(spec.input_size))),
+    }
+    print(f"{'path':<24} {'median':>10} {'heap peak':>11}")
+    for name, fn in cases.items():
+        ms, peak = measure(fn, args.runs)
+        print(f"{name:<24} {ms:>8.3f}ms {peak / 1024:>9.1f}KB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+"""
+Remove-bg batch throughput benchmark
+
+Sends the same set of images to a running server twice:
+  1. one POST /api/remove-bg per image (current per-request path)
+  2. one POST /api/remove-bg/batch with all images as multipart/form-data
+and reports images/sec for both.
+
+Usage:
+    python server.py                      # in another terminal
+    python benchmarks/bench_remove_bg_batch.py [--images DIR] [--count 24] [--url http://localhost:8000]
+
+Without --images, synthetic 1000px JPEGs are generated (the client resizes to
+1000px before upload, see prepareImageForUpload in js/api.js).
+"""
+import io
+import os
+import sys
+import glob
+import time
+import json
+import uuid
+import argparse
+import urllib.request
+import numpy as np
+from PIL import Image
+
+
+def synthetic_jpegs(count, size=(750, 1000)):
+    rng = np.random.default_rng(0)
+    images = []
+    for i in range(count):
+        w, h = size
+        arr = np.empty((h, w, 3), dtype=np.uint8)
+        arr[:] = rng.integers(120, 230, 3, dtype=np.uint8)
+        # Rough "head and shoulders" blob so the mask isn't trivial
+        yy, xx = np.ogrid[:h, :w]
+        head = ((xx - w / 2) / (w * 0.22)) ** 2 + ((yy - h * 0.42) / (h * 0.2)) ** 2 < 1
+        body = (yy > h * 0.62) & (np.abs(xx - w / 2) < w * 0.4)
+        arr[head | body] = rng.integers(30, 110, 3, dtype=np.uint8)
+        buf = io.BytesIO()
+        Image.fromarray(arr).save(buf, format='JPEG', quality=90)
+        images.append((f"synthetic_{i}.jpg", buf.getvalue()))
+    return images
+
+
+def load_images(folder, count):
+    paths = sorted(glob.glob(os.path.join(folder, '*.jpg')) + glob.glob(os.path.join(folder, '*.png')))
+    if not paths:
+        sys.exit(f"No .jpg/.png images in {folder}")
+    paths = (paths * (count // len(paths) + 1))[:count]
+    return [(os.path.basename(p), open(p, 'rb').read()) for p in paths]
+
+
+def post(url, body, content_type):
+    req = urllib.request.Request(url, data=body, method='POST', headers={'Content-Type': content_type})
+    with urllib.request.urlopen(req, timeout=600) as res:
+        return res.read()
+
+
+def multipart(images):
+    boundary = uuid.uuid4().hex
+    parts = []
+    for name, data in images:
+        parts.append(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="images"; filename="{name}"\r\n'
+            f'Content-Type: application/octet-stream\r\n\r\n'.encode() + data + b'\r\n'
+        )
+    parts.append(f'--{boundary}--\r\n'.encode())
+    return b''.join(parts), f'multipart/form-data; boundary={boundary}'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default='http://localhost:8000')
+    parser.add_argument('--images', help='Folder of .jpg/.png images (default: synthetic)')
+    parser.add_argument('--count', type=int, default=24)
+    args = parser.parse_args()
+
+    images = load_images(args.images, args.count) if args.images else synthetic_jpegs(args.count)
+    single_url = f"{args.url}/api/remove-bg"
+    batch_url = f"{args.url}/api/remove-bg/batch"
+
+    # Warm up the model so neither path pays the session load
+    urllib.request.urlopen(single_url, timeout=600).read()
+
+    start = time.perf_counter()
+    for name, data in images:
+        post(single_url, data, 'application/octet-stream')
+    t_single = time.perf_counter() - start
+
+    body, content_type = multipart(images)
+    start = time.perf_counter()
+    result = json.loads(post(batch_url, body, content_type))
+    t_batch = time.perf_counter() - start
+
+    failed = [r['name'] for r in result['results'] if 'error' in r]
+    print(f"Images: {len(images)}")
+    print(f"Per-request: {t_single:.2f}s  {len(images) / t_single:.2f} img/s")
+    print(f"Batch:       {t_batch:.2f}s  {len(images) / t_batch:.2f} img/s  ({t_single / t_batch:.2f}x)")
+    if failed:
+        print(f"Failed in batch: {failed}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+"""
+Server load benchmark: throughput and tail latency under concurrency
+
+Runs --clients concurrent clients, each on its own keep-alive connection,
+posting images to /api/remove-bg for --duration seconds, and reports
+requests/sec, latency percentiles and status codes (429/503 mean the server
+shed load instead of queueing without bound; clients honour Retry-After). Run it against both servers,
+with the mask cache off so every request runs inference:
+
+Usage:
+    REMOVE_BG_CACHE=0 python server.py                        # threading, port 8000
+    REMOVE_BG_CACHE=0 python server_async.py --port 8001      # asyncio + bounded pool
+    python benchmarks/bench_server_load.py --url http://localhost:8000 [--clients 32] [--duration 20]
+    python benchmarks/bench_server_load.py --url http://localhost:8001 [--clients 32] [--duration 20]
+"""
+import os
+import sys
+import time
+import argparse
+import threading
+import http.client
+from urllib.parse import urlsplit
+from collections import Counter
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from bench_remove_bg_batch import synthetic_jpegs  # noqa: E402
+
+
+def client(url, images, deadline, query, results, lock):
+    parts = urlsplit(url)
+    conn = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=120)
+    reconnects = 0
+    i = 0
+    while time.perf_counter() < deadline:
+        data = images[i % len(images)]
+        i += 1
+        t0 = time.perf_counter()
+        try:
+            conn.request('POST', f'/api/remove-bg{query}', body=data,
+                         headers={'Content-Type': 'image/jpeg', 'Accept': 'image/png'})
+            response = conn.getresponse()
+            response.read()
+            status = response.status
+            if response.getheader('Connection', '').lower() == 'close':
+                conn.close()
+                conn = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=120)
+                reconnects += 1
+        except (OSError, http.client.HTTPException):
+            status = 'error'
+            conn.close()
+            conn = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=120)
+            reconnects += 1
+        with lock:
+            results.append((status, time.perf_counter() - t0))
+        if status in (429, 503):
+            # Back off as told instead of hammering a saturated server
+            time.sleep(min(float(response.getheader('Retry-After') or 1), max(0, deadline - time.perf_counter())))
+    conn.close()
+    with lock:
+        results.append(('reconnects', reconnects))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default='http://localhost:8000')
+    parser.add_argument('--clients', type=int, default=32)
+    parser.add_argument('--duration', type=float, default=20.0)
+    parser.add_argument('--count', type=int, default=8, help='Distinct synthetic images')
+    parser.add_argument('--format', default='png', help='?format= to request (mask is cheaper)')
+    args = parser.parse_args()
+
+    images = [data for _, data in synthetic_jpegs(args.count)]
+    query = f'?format={args.format}'
+    results, lock = [], threading.Lock()
+    deadline = time.perf_counter() + args.duration
+    threads = [threading.Thread(target=client, args=(args.url, images, deadline, query, results, lock))
+               for _ in range(args.clients)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    reconnects = sum(n for status, n in results if status == 'reconnects')
+    samples = [(status, latency) for status, latency in results if status != 'reconnects']
+    statuses = Counter(status for status, _ in samples)
+    ok = np.array([latency for status, latency in samples if status == 200]) * 1000
+
+    print(f"{args.url}  {args.clients} clients, {elapsed:.1f}s, {len(samples)} requests, {reconnects} reconnects")
+    print(f"Status codes: {dict(statuses)}")
+    print(f"Throughput (200s): {len(ok) / elapsed:.2f} req/s")
+    if len(ok):
+        p50, p90, p99 = np.percentile(ok, [50, 90, 99])
+        print(f"Latency (200s): p50 {p50:.0f}ms  p90 {p90:.0f}ms  p99 {p99:.0f}ms  max {ok.max():.0f}ms")
+
+
+if __name__ == '__main__':
+    main()
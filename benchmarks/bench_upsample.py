@@ -0,0 +1,92 @@
+"""
+Mask upsampling benchmark
+
+Builds synthetic portraits with a known full-resolution alpha (a head with a
+wavy, hair-like outline over a textured background), downsamples that alpha
+to the model resolution as a stand-in for the prediction, and upsamples it
+back with each engine in api/_upsample.py. Reports per output size:
+  ms        median upsampling time
+  edge MAE  mean absolute alpha error (0..255) in a band around the true edge
+  sharp     mean alpha gradient in that band relative to the true alpha
+            (1.0 = as crisp as ground truth, lower = blurrier)
+
+Usage:
+    python benchmarks/bench_upsample.py [--sizes 1000x750,4000x3000,6000x4000] [--repeat 3]
+"""
+import os
+import sys
+import time
+import argparse
+import statistics
+
+import numpy as np
+from PIL import Image, ImageFilter
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'api'))
+from _upsample import UPSAMPLERS  # noqa: E402
+
+MASK_SIZE = 320
+
+
+def synthetic_portrait(w, h):
+    rng = np.random.default_rng(0)
+    yy, xx = np.mgrid[:h, :w].astype(np.float32)
+    # Head + shoulders with a high-frequency wavy outline (hair strands)
+    angle = np.arctan2(yy - h * 0.4, xx - w / 2)
+    wave = 1 + 0.04 * np.sin(angle * 60) + 0.02 * np.sin(angle * 23)
+    head = ((xx - w / 2) / (w * 0.22)) ** 2 + ((yy - h * 0.4) / (h * 0.22)) ** 2 < wave ** 2
+    body = (yy > h * 0.65) & (np.abs(xx - w / 2) < w * 0.38)
+    alpha = (head | body).astype(np.float32)
+
+    # Textured background, darker subject
+    bg = np.array([200, 190, 170], np.float32) + rng.normal(0, 12, (h // 8 + 1, w // 8 + 1, 3)).repeat(8, 0).repeat(8, 1)[:h, :w]
+    fg = np.array([60, 45, 40], np.float32) + rng.normal(0, 6, (h, w, 3)).astype(np.float32)
+    photo = fg * alpha[..., None] + bg * (1 - alpha[..., None])
+    image = Image.fromarray(np.clip(photo, 0, 255).astype(np.uint8))
+
+    truth = Image.fromarray((alpha * 255).astype(np.uint8), mode='L')
+    # Model-resolution prediction: area downsample plus a little blur
+    low = truth.resize((MASK_SIZE, MASK_SIZE), Image.BOX).filter(ImageFilter.GaussianBlur(0.7))
+    return image, truth, low
+
+
+def edge_band(truth):
+    # Pixels within a few px of the true edge (box blur is neither 0 nor 255 there)
+    radius = max(2, max(truth.size) // 400)
+    blurred = np.asarray(truth.filter(ImageFilter.BoxBlur(radius)))
+    return (blurred > 0) & (blurred < 255)
+
+
+def edge_metrics(result, truth, band):
+    res = np.asarray(result, dtype=np.float32)
+    gt = np.asarray(truth, dtype=np.float32)
+    mae = float(np.abs(res - gt)[band].mean())
+    gy_r, gx_r = np.gradient(res)
+    gy_t, gx_t = np.gradient(gt)
+    sharp = float(np.hypot(gx_r, gy_r)[band].mean() / np.hypot(gx_t, gy_t)[band].mean())
+    return mae, sharp
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default='1000x750,4000x3000,6000x4000', help='Comma-separated WxH outputs')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'size':>11} {'method':>9} {'ms':>9} {'edge MAE':>9} {'sharp':>6}")
+    for item in args.sizes.split(','):
+        w, h = (int(v) for v in item.split('x'))
+        image, truth, low = synthetic_portrait(w, h)
+        band = edge_band(truth)
+        for name, fn in UPSAMPLERS.items():
+            times = []
+            for _ in range(args.repeat):
+                t0 = time.perf_counter()
+                result = fn(low, (w, h), image)
+                times.append(time.perf_counter() - t0)
+            mae, sharp = edge_metrics(result, truth, band)
+            print(f"{item:>11} {name:>9} {statistics.median(times) * 1000:>9.1f} {mae:>9.2f} {sharp:>6.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,329 @@
+"""
+Offline stage-level benchmark suite
+
+Times every stage of the remove-bg pipeline (api/_pipeline.py) and of
+AutoHairModel on deterministic synthetic portraits at several resolutions,
+without network access or real model weights:
+    api     decode, preprocess, inference, postprocess, composite,
+            encode_png, encode_mask_rle
+    hair    _generate_trimap, _enhance_hair_region, _composite_alpha
+    beauty  skin_smooth, blemish_remove, lip_color, blush, eye_enlarge
+            (on the face-ROI crop, as process_beauty runs them)
+Inference runs a tiny generated ONNX graph with the model's input/output
+shapes, so its numbers cover ORT overhead only, not the real network.
+
+Each stage reports median time and ops/sec, plus two peak-memory figures
+from untimed warm-up runs: the resident-set high-water mark above the level
+before the stage (Linux only, via /proc/self/clear_refs; misses reuse of
+freed heap pages) and tracemalloc's peak (numpy and Python allocations, not
+PIL's or OpenCV's).
+
+Results are written as JSON with --output and compared against a baseline
+(a previous --output file). Stages slower than the baseline by more than
+--threshold are listed, and --fail-on-regression exits 1 for CI.
+
+Requires the onnx package to build the tiny graph; the hair and beauty
+groups need opencv and the modal package (modal_app/auto_hair.py imports it)
+and are skipped if they are missing.
+
+Usage:
+    python benchmarks/run_suite.py [--sizes 1,4,12,24] [--repeat 3] [--groups api,hair,beauty]
+                                   [--output results.json] [--baseline baseline.json]
+                                   [--threshold 0.25] [--fail-on-regression]
+"""
+import io
+import os
+import sys
+import json
+import importlib
+import time
+import argparse
+import platform
+import statistics
+import tempfile
+import tracemalloc
+
+import numpy as np
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, os.path.join(ROOT, 'api'))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from bench_upsample import synthetic_portrait  # noqa: E402
+
+BEAUTY_PARAMS = {
+    'skin_smooth': 60, 'blemish_remove': True, 'blemish_sensitivity': 50,
+    'lip_color': '#dc5050', 'lip_intensity': 50,
+    'blush_color': '#ff9696', 'blush_intensity': 40,
+    'eye_enlarge': 115,
+}
+
+
+def portrait_size(megapixels):
+    # 3:4 portrait with the requested pixel count
+    w = int((megapixels * 1e6 * 3 / 4) ** 0.5)
+    return w, int(w * 4 / 3)
+
+
+def tiny_model(path, input_size):
+    """(N, 3, S, S) -> (N, 1, S, S): channel mean through a sigmoid"""
+    import onnx
+    from onnx import helper, TensorProto
+
+    graph = helper.make_graph(
+        [helper.make_node('ReduceMean', ['input'], ['mean'], axes=[1], keepdims=1),
+         helper.make_node('Sigmoid', ['mean'], ['output'])],
+        'bench_tiny',
+        [helper.make_tensor_value_info('input', TensorProto.FLOAT, ['N', 3, input_size, input_size])],
+        [helper.make_tensor_value_info('output', TensorProto.FLOAT, ['N', 1, input_size, input_size])],
+    )
+    model = helper.make_model(graph, opset_imports=[helper.make_opsetid('', 13)])
+    model.ir_version = 8
+    onnx.save(model, path)
+    return path
+
+
+# -- measurement -------------------------------------------------------------
+
+def _status_kb(field):
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith(field + ':'):
+                return int(line.split()[1])
+    return None
+
+
+def _reset_rss_peak():
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def peak_memory_mb(run):
+    """
+    Peak memory of one run() above the level before it, in MB:
+    (resident-set high-water mark or None, tracemalloc peak)
+    """
+    rss = None
+    if _reset_rss_peak():
+        before = _status_kb('VmRSS')
+        run()
+        rss = max(0, _status_kb('VmHWM') - before) / 1024
+    # Freed heap pages stay resident, so also count numpy's allocations directly
+    tracemalloc.start()
+    try:
+        run()
+        return rss, tracemalloc.get_traced_memory()[1] / 2**20
+    finally:
+        tracemalloc.stop()
+
+
+def measure(run, setup=None, repeat=3):
+    """Median time of run(*setup()) over repeat runs, after warm-up runs that measure memory"""
+    setup = setup or (lambda: ())
+    args = setup()
+    rss, traced = peak_memory_mb(lambda: run(*args))
+    args = setup()
+    run(*args)
+    times = []
+    for _ in range(repeat):
+        args = setup()
+        t = time.perf_counter()
+        run(*args)
+        times.append(time.perf_counter() - t)
+    median = statistics.median(times)
+    return {
+        'median_ms': round(median * 1000, 2),
+        'ops_per_sec': round(1 / median, 3) if median > 0 else None,
+        'peak_rss_mb': round(rss, 1) if rss is not None else None,
+        'peak_traced_mb': round(traced, 1),
+    }
+
+
+# -- stage groups --------------------------------------------------------------
+
+def api_stages(image, tmpdir):
+    import _pipeline
+    from _models import ModelSpec, MODELS
+    from _preprocess import input_buffer
+    from _ingest import open_image, decode_rgb
+    from _encode import cutout, encode_rle, PNG_COMPRESS_LEVEL
+
+    real = MODELS[_pipeline.DEFAULT_MODEL]
+    path = os.path.join(tmpdir, f"tiny-{real.input_size}.onnx")
+    if not os.path.exists(path):
+        tiny_model(path, real.input_size)
+    # Same input size and normalization as the default model, tiny graph
+    spec = ModelSpec('bench-tiny', path, real.input_size, real.mean, real.std, real.postprocess)
+    session = _pipeline.U2NetSession(spec)
+    session.ensure_session()
+
+    jpeg = io.BytesIO()
+    image.save(jpeg, format='JPEG', quality=90)
+    jpeg = jpeg.getvalue()
+    tensor = _pipeline.preprocess(image, spec).copy()
+    pred = session.run(tensor).copy()
+    mask = _pipeline.postprocess(pred, image.size, spec, guide=image)
+    rgba = cutout(image, mask)
+
+    def encode_png():
+        rgba.save(io.BytesIO(), format='PNG', compress_level=PNG_COMPRESS_LEVEL)
+
+    return [
+        ('decode', lambda: decode_rgb(*open_image(io.BytesIO(jpeg))), None),
+        ('preprocess', lambda: _pipeline.preprocess(image, spec, out=input_buffer(spec.input_size)), None),
+        ('inference', lambda: session.run(tensor), None),
+        ('postprocess', lambda: _pipeline.postprocess(pred, image.size, spec, guide=image), None),
+        ('composite', lambda: cutout(image, mask), None),
+        ('encode_png', encode_png, None),
+        ('encode_mask_rle', lambda: encode_rle(mask), None),
+    ]
+
+
+def _auto_hair():
+    sys.path.insert(0, os.path.join(ROOT, 'modal_app'))
+    from auto_hair import AutoHairModel, FaceContext
+    return AutoHairModel(), FaceContext
+
+
+def hair_stages(image, truth):
+    model, _ = _auto_hair()
+    img = np.asarray(image).copy()
+    mask = np.asarray(truth).copy()
+    trimap = model._generate_trimap(mask, dilate=10, erode=5)
+    alpha = model._enhance_hair_region(img, trimap, mask)
+    return [
+        ('generate_trimap', lambda: model._generate_trimap(mask, dilate=10, erode=5), None),
+        ('enhance_hair_region', lambda: model._enhance_hair_region(img, trimap, mask), None),
+        ('composite_alpha', lambda: model._composite_alpha(img, alpha), None),
+    ]
+
+
+def beauty_stages(image):
+    import cv2
+    model, FaceContext = _auto_hair()
+    img = np.asarray(image)
+    h, w = img.shape[:2]
+    face = model._estimate_face_positions(w, h)
+    # Same face-ROI crop process_beauty uses with every module enabled
+    x0, y0, x1, y1 = model._face_roi_bounds(face, w, h, BEAUTY_PARAMS) or (0, 0, w, h)
+    face = model._shift_face(face, x0, y0, w, h)
+    crop = cv2.cvtColor(img[y0:y1, x0:x1], cv2.COLOR_RGB2BGR)
+
+    def fresh():
+        # Each module starts from the same crop with an empty per-request context
+        bgr = crop.copy()
+        return bgr, FaceContext(model, bgr, face)
+
+    p = BEAUTY_PARAMS
+    return [
+        ('skin_smooth', lambda bgr, ctx: model._skin_smoothing(bgr, face, p['skin_smooth'], ctx=ctx), fresh),
+        ('blemish_remove', lambda bgr, ctx: model._remove_blemishes(bgr, face, p['blemish_sensitivity'], ctx=ctx), fresh),
+        ('lip_color', lambda bgr, ctx: model._apply_lip_color(bgr, face, p['lip_color'], p['lip_intensity'], ctx=ctx), fresh),
+        ('blush', lambda bgr, ctx: model._apply_blush(bgr, face, p['blush_color'], p['blush_intensity'], ctx=ctx), fresh),
+        ('eye_enlarge', lambda bgr, ctx: model._enlarge_eyes(bgr, face, p['eye_enlarge'] / 100, inplace=True, ctx=ctx), fresh),
+    ]
+
+
+def available_groups(groups):
+    missing = {}
+    if 'hair' in groups or 'beauty' in groups:
+        try:
+            importlib.import_module('cv2')
+            _auto_hair()
+        except ImportError as e:
+            for group in ('hair', 'beauty'):
+                missing[group] = str(e)
+    return [g for g in groups if g not in missing], missing
+
+
+# -- baseline ------------------------------------------------------------------
+
+def compare(results, baseline, threshold):
+    """[(key, baseline ops/s, ops/s, ratio)] for stages slower than baseline by more than threshold"""
+    regressions = []
+    for key, current in results.items():
+        previous = baseline.get(key)
+        if not previous or not previous.get('ops_per_sec') or not current.get('ops_per_sec'):
+            continue
+        ratio = current['ops_per_sec'] / previous['ops_per_sec']
+        if ratio < 1 - threshold:
+            regressions.append((key, previous['ops_per_sec'], current['ops_per_sec'], ratio))
+    return regressions
+
+
+def environment():
+    import onnxruntime as ort
+    import PIL
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'numpy': np.__version__,
+        'pillow': PIL.__version__,
+        'onnxruntime': ort.__version__,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default='1,4,12,24', help='Megapixels, comma-separated')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--groups', default='api,hair,beauty')
+    parser.add_argument('--output', help='Write results JSON here')
+    parser.add_argument('--baseline', help='Results JSON from an earlier run to compare against')
+    parser.add_argument('--threshold', type=float, default=0.25, help='Allowed ops/sec drop vs baseline')
+    parser.add_argument('--fail-on-regression', action='store_true')
+    args = parser.parse_args()
+
+    groups, missing = available_groups([g.strip() for g in args.groups.split(',') if g.strip()])
+    for group, reason in missing.items():
+        print(f"Skipping {group}: {reason}")
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for mp in [float(s) for s in args.sizes.split(',')]:
+            size = portrait_size(mp)
+            image, truth, _ = synthetic_portrait(*size)
+            label = f"{mp:g}MP"
+            print(f"\n{label} ({size[0]}x{size[1]})")
+            print(f"    {'stage':<28} {'median':>10} {'ops/s':>9} {'rss':>9} {'traced':>9}")
+            for group in groups:
+                if group == 'api':
+                    stages = api_stages(image, tmpdir)
+                elif group == 'hair':
+                    stages = hair_stages(image, truth)
+                else:
+                    stages = beauty_stages(image)
+                for name, run, setup in stages:
+                    r = measure(run, setup, args.repeat)
+                    results[f"{group}/{name}@{label}"] = r
+                    rss = f"{r['peak_rss_mb']:.1f}MB" if r['peak_rss_mb'] is not None else '-'
+                    print(f"    {group + '/' + name:<28} {r['median_ms']:>8.1f}ms {r['ops_per_sec']:>9.2f} "
+                          f"{rss:>9} {r['peak_traced_mb']:>7.1f}MB")
+
+    report = {'environment': environment(), 'repeat': args.repeat, 'results': results}
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline['results'], args.threshold)
+        print(f"\nAgainst {args.baseline} (threshold {args.threshold:.0%}):")
+        if baseline.get('environment') != report['environment']:
+            print("    note: baseline was recorded in a different environment")
+        for key, before, after, ratio in regressions:
+            print(f"    REGRESSION {key}: {before:.2f} -> {after:.2f} ops/s ({ratio - 1:+.0%})")
+        if not regressions:
+            print("    no regressions")
+        if regressions and args.fail_on_regression:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
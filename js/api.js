@@ -791,8 +791,10 @@ export async function fetchTransparentImage(base64) {
     const optimizedBlob = await prepareImageForUpload(cleanBase64);
 
     console.log("Calling Vercel Backend...");
-    const vercelRes = await fetch('/api/remove-bg', {
+    // Ask for the alpha matte only (grayscale PNG); we already hold the photo and composite locally
+    const vercelRes = await fetch('/api/remove-bg?format=mask', {
         method: 'POST',
+        headers: { 'Accept': 'image/png' },
         body: optimizedBlob
     });
     console.timeEnd("    ⏱️ [圖片準備與上傳]");
@@ -803,12 +805,47 @@ export async function fetchTransparentImage(base64) {
         throw new Error(`Vercel Fail: ${vercelRes.status} - ${errorText}`);
     }
 
-    const base64Data = await vercelRes.text();
-    const blob = await (await fetch(`data:image/png;base64,${base64Data}`)).blob();
+    const timing = vercelRes.headers.get('Server-Timing');
+    if (timing) console.log("Vercel Server-Timing:", timing);
+
+    let blob;
+    if ((vercelRes.headers.get('Content-Type') || '').startsWith('image/')) {
+        blob = await applyAlphaMask(optimizedBlob, await vercelRes.blob());
+    } else {
+        // Legacy base64 text response (older deployment)
+        const base64Data = await vercelRes.text();
+        blob = await (await fetch(`data:image/png;base64,${base64Data}`)).blob();
+    }
     console.timeEnd("  ⏱️ [Vercel 背景移除 - 總時間]");
     return blob;
 }
 
+// Helper: Apply a grayscale alpha matte (any size, stretched bilinearly) to the photo -> transparent PNG Blob
+async function applyAlphaMask(photoBlob, maskBlob) {
+    const [photo, mask] = await Promise.all([createImageBitmap(photoBlob), createImageBitmap(maskBlob)]);
+    const canvas = document.createElement('canvas');
+    canvas.width = photo.width;
+    canvas.height = photo.height;
+    const ctx = canvas.getContext('2d', { willReadFrequently: true });
+
+    // 1. Matte at photo size (mask-lowres mattes are upscaled here)
+    ctx.imageSmoothingEnabled = true;
+    ctx.imageSmoothingQuality = 'high';
+    ctx.drawImage(mask, 0, 0, canvas.width, canvas.height);
+    const alpha = ctx.getImageData(0, 0, canvas.width, canvas.height).data;
+
+    // 2. Photo with the matte as its alpha channel
+    ctx.clearRect(0, 0, canvas.width, canvas.height);
+    ctx.drawImage(photo, 0, 0);
+    const pixels = ctx.getImageData(0, 0, canvas.width, canvas.height);
+    for (let i = 3; i < pixels.data.length; i += 4) {
+        pixels.data[i] = alpha[i - 3];
+    }
+    ctx.putImageData(pixels, 0, 0);
+
+    return new Promise((resolve) => canvas.toBlob(resolve, 'image/png'));
+}
+
 // 2b. Parallel Production (New Entry Point)
 export async function executeParallelProduction(compressedBase64, originalBase64, specKey = 'taiwan_passport', userAdjustments = {}, cachedFaceData = null) {
     const config = PHOTO_CONFIGS[specKey] || PHOTO_CONFIGS['taiwan_passport'];
@@ -4,10 +4,39 @@ Optimized version using KNN Matting instead of heavy Deep Image Matting
 """
 import modal
 import io
+import os
 import base64
 import numpy as np
 from PIL import Image
 
+# Person segmentation backend for enhance_hair (see SEGMENTATION_BACKENDS), read
+# at deploy time: AUTO_HAIR_SEGMENTATION=onnx-silueta modal deploy auto_hair.py
+SEGMENTATION_BACKEND = os.environ.get("AUTO_HAIR_SEGMENTATION", "deeplab-resnet101")
+# Container GPU ("" = CPU only); only DeepLab-ResNet101 needs one by default
+SEGMENTATION_GPU = os.environ.get(
+    "AUTO_HAIR_GPU", "T4" if SEGMENTATION_BACKEND == "deeplab-resnet101" else ""
+) or None
+# Long side DeepLab runs at, e.g. 768 (0 = native resolution, the previous
+# behaviour); the person/background decision is upsampled back to full size
+SEGMENTATION_MAX_SIDE = int(os.environ.get("AUTO_HAIR_SEGMENTATION_MAX_SIDE", "0"))
+# Images per forward pass in enhance_hair_batch
+SEGMENTATION_BATCH_SIZE = int(os.environ.get("AUTO_HAIR_SEGMENTATION_BATCH_SIZE", "8"))
+# CPU profile for DeepLab (no GPU): intra-op threads (0 = all cores) and where
+# the frozen TorchScript graph is cached ("" = run the eager model)
+TORCH_THREADS = int(os.environ.get("AUTO_HAIR_TORCH_THREADS", "0"))
+TORCHSCRIPT_CACHE_DIR = os.environ.get("AUTO_HAIR_TORCHSCRIPT_CACHE", "/models/torchscript")
+# Width in px of the background band around the alpha boundary that
+# _composite_alpha refills with foreground colour
+DECONTAM_BAND = int(os.environ.get("AUTO_HAIR_DECONTAM_BAND", "16"))
+
+# The remove-bg models api/index.py ships, with the same input size and normalization
+API_MODEL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "api")
+ONNX_MODEL_DIR = "/onnx"
+ONNX_MODELS = {
+    "onnx-silueta": ("silueta.onnx", 320, (0.485, 0.456, 0.406), (0.229, 0.224, 0.225)),
+    "onnx-isnet": ("isnet-general-use.onnx", 1024, (0.5, 0.5, 0.5), (1.0, 1.0, 1.0)),
+}
+
 # Define Modal image with dependencies
 auto_hair_image = (
     modal.Image.debian_slim(python_version="3.10")
@@ -19,9 +48,26 @@ auto_hair_image = (
         "numpy==1.24.3",
         "scikit-image==0.21.0",
         "fastapi[standard]==0.115.0",  # Required for web endpoints
+        "onnxruntime==1.16.3",  # onnx-* segmentation backends
     )
     .apt_install("libgl1-mesa-glx", "libglib2.0-0")
+    .env({
+        "AUTO_HAIR_SEGMENTATION": SEGMENTATION_BACKEND,
+        "AUTO_HAIR_SEGMENTATION_MAX_SIDE": str(SEGMENTATION_MAX_SIDE),
+        "AUTO_HAIR_SEGMENTATION_BATCH_SIZE": str(SEGMENTATION_BATCH_SIZE),
+        "AUTO_HAIR_TORCH_THREADS": str(TORCH_THREADS),
+        "AUTO_HAIR_TORCHSCRIPT_CACHE": TORCHSCRIPT_CACHE_DIR,
+        "AUTO_HAIR_DECONTAM_BAND": str(DECONTAM_BAND),
+        # torchvision weights land on the models volume instead of being re-downloaded
+        "TORCH_HOME": "/models/torch",
+    })
 )
+if SEGMENTATION_BACKEND in ONNX_MODELS:
+    # Only the configured model is shipped (ISNet alone is ~170MB)
+    _onnx_file = ONNX_MODELS[SEGMENTATION_BACKEND][0]
+    auto_hair_image = auto_hair_image.copy_local_file(
+        os.path.join(API_MODEL_DIR, _onnx_file), f"{ONNX_MODEL_DIR}/{_onnx_file}"
+    )
 
 # Create Modal app
 app = modal.App("auto-hair-segmentation", image=auto_hair_image)
@@ -30,8 +76,398 @@ app = modal.App("auto-hair-segmentation", image=auto_hair_image)
 models_volume = modal.Volume.from_name("auto-hair-models", create_if_missing=True)
 
 
+class FaceContext:
+    """
+    Per-request cache of derived products shared by the beauty modules
+    
+    Products are computed lazily on first access and memoized. Geometry
+    products (ellipses, masks, colors) live for the whole request; image
+    products (grayscale, local mean, frequency layers) are dropped by
+    set_image() whenever a module hands back a modified image.
+    `computes` counts how many times each product was built.
+    """
+    
+    def __init__(self, model, img: np.ndarray, face: dict):
+        self.model = model
+        self.face = face
+        self.img = img
+        self.computes = {}
+        self._geometry = {}
+        self._image = {}
+    
+    def set_image(self, img: np.ndarray):
+        """Adopt the latest image; drop products derived from the old one"""
+        # Modules may modify in place, so identity alone doesn't prove freshness
+        self.img = img
+        self._image.clear()
+    
+    def _memo(self, store: dict, key, fn):
+        if key not in store:
+            store[key] = fn()
+            # Parameterized products are counted per parameter set
+            name = key if isinstance(key, str) else f"{key[0]}({','.join(map(str, key[1:]))})"
+            self.computes[name] = self.computes.get(name, 0) + 1
+        return store[key]
+    
+    # Geometry products
+    
+    def face_ellipse(self) -> tuple:
+        h, w = self.img.shape[:2]
+        return self._memo(self._geometry, 'face_ellipse',
+                          lambda: self.model._face_ellipse(self.face, w, h))
+    
+    def mouth_ellipse(self, scale_x: float = 1.0, scale_y: float = 1.0) -> tuple:
+        return self._memo(self._geometry, ('mouth_ellipse', scale_x, scale_y),
+                          lambda: self.model._mouth_ellipse(self.face, scale_x, scale_y))
+    
+    def eye_geometry(self) -> tuple:
+        """(centers, radius) of both eyes"""
+        def build():
+            eye_spacing = abs(self.face['pupilRight']['x'] - self.face['pupilLeft']['x'])
+            centers = [(int(self.face[k]['x']), int(self.face[k]['y'])) for k in ['pupilLeft', 'pupilRight']]
+            return centers, int(eye_spacing * 0.18)
+        return self._memo(self._geometry, 'eye_geometry', build)
+    
+    def cheek_spots(self) -> tuple:
+        return self._memo(self._geometry, 'cheek_spots',
+                          lambda: self.model._cheek_spots(self.face, self.img.shape[0]))
+    
+    def skin_mask(self) -> np.ndarray:
+        """Feathered skin mask (uint8), excluding eyes and mouth"""
+        return self._memo(self._geometry, 'skin_mask',
+                          lambda: self.model._generate_skin_mask(self.img, self.face, ctx=self))
+    
+    def skin_alpha(self) -> np.ndarray:
+        """Skin mask as float weights (H, W, 1), broadcastable over channels"""
+        return self._memo(self._geometry, 'skin_alpha',
+                          lambda: (self.skin_mask() / 255.0)[..., None])
+    
+    def color(self, hex_color: str) -> tuple:
+        return self._memo(self._geometry, ('color', hex_color),
+                          lambda: self.model._hex_to_bgr(hex_color))
+    
+    # Image products
+    
+    def gray(self) -> np.ndarray:
+        import cv2
+        return self._memo(self._image, 'gray',
+                          lambda: cv2.cvtColor(self.img, cv2.COLOR_BGR2GRAY))
+    
+    def local_mean(self, ksize: int = 21) -> np.ndarray:
+        import cv2
+        return self._memo(self._image, ('local_mean', ksize),
+                          lambda: cv2.blur(self.gray(), (ksize, ksize)))
+    
+    def frequency_layers(self, blur_size: int) -> tuple:
+        """(low, high) frequency layers; high is offset by +128"""
+        import cv2
+        
+        def build():
+            low = cv2.GaussianBlur(self.img, (blur_size, blur_size), 0)
+            high = cv2.subtract(self.img, low) + 128
+            return low, high
+        return self._memo(self._image, ('frequency', blur_size), build)
+
+
+class SegmentationBackend:
+    """
+    Person segmentation for enhance_hair: RGB uint8 (H, W, 3) -> uint8 mask,
+    255 = person.
+
+    Subclasses provide the per-step hooks (_input, _pad, _forward, _mask);
+    segment_batch() groups images whose working sizes fall in the same
+    bucket_shape() and runs one forward pass per bucket (chunked by
+    SEGMENTATION_BATCH_SIZE). segment() is a batch of one.
+    """
+    name = None
+
+    def load(self):
+        raise NotImplementedError
+
+    @property
+    def device(self) -> str:
+        return "cpu"
+
+    def working_size(self, w: int, h: int) -> tuple:
+        """(width, height) the network actually sees for a w x h input"""
+        return w, h
+
+    def bucket_shape(self, sw: int, sh: int) -> tuple:
+        """(width, height) inputs of working size sw x sh are padded to"""
+        return sw, sh
+
+    def segment(self, img: np.ndarray, timings: dict = None) -> np.ndarray:
+        """Mask for one image; records preprocess / inference / postprocess seconds into timings"""
+        masks, buckets = self.segment_batch([img])
+        if timings is not None:
+            timings.update(buckets[0]['timings'])
+        return masks[0]
+
+    def segment_batch(self, images: list, batch_size: int = None) -> tuple:
+        """
+        Masks for a list of images, plus one entry per bucket:
+        {"shape": (w, h), "images": [indices], "timings": {stage: seconds}}
+        """
+        import time
+
+        batch_size = batch_size or SEGMENTATION_BATCH_SIZE
+        buckets = {}
+        for i, img in enumerate(images):
+            h, w = img.shape[:2]
+            buckets.setdefault(self.bucket_shape(*self.working_size(w, h)), []).append(i)
+
+        masks = [None] * len(images)
+        report = []
+        for shape, indices in buckets.items():
+            timings = {'preprocess': 0.0, 'inference': 0.0, 'postprocess': 0.0}
+            for start in range(0, len(indices), batch_size):
+                chunk = indices[start:start + batch_size]
+                stage_start = time.time()
+                inputs = [self._input(images[i]) for i in chunk]
+                if len(inputs) > 1:
+                    inputs = [self._pad(x, *shape) for x in inputs]
+                timings['preprocess'] += time.time() - stage_start
+
+                stage_start = time.time()
+                probs = self._forward(inputs)
+                timings['inference'] += time.time() - stage_start
+
+                stage_start = time.time()
+                for j, i in enumerate(chunk):
+                    h, w = images[i].shape[:2]
+                    sw, sh = self.working_size(w, h)
+                    # Drop the bucket padding, then back to full size
+                    masks[i] = self._mask(probs[j, :sh, :sw], w, h)
+                timings['postprocess'] += time.time() - stage_start
+            report.append({"shape": shape, "images": indices, "timings": timings})
+        return masks, report
+
+    def _input(self, img: np.ndarray):
+        """Normalized (3, sh, sw) network input at working size"""
+        raise NotImplementedError
+
+    def _pad(self, x, bw: int, bh: int):
+        """Input padded right / bottom to the bucket shape"""
+        return x
+
+    def _forward(self, inputs: list):
+        """(N, H, W) person scores for same-shape inputs, thresholded by _mask"""
+        raise NotImplementedError
+
+    def _mask(self, score, w: int, h: int) -> np.ndarray:
+        """Working-size score -> full-size uint8 mask"""
+        raise NotImplementedError
+
+
+class DeepLabBackend(SegmentationBackend):
+    """
+    torchvision DeepLabV3 (21 VOC classes on COCO), keeping class 15 (person).
+    Pixels are person where class 15 wins the 21-class argmax. With max_side
+    set it runs at that long side and upsamples the person logit's margin
+    over the best other class to full size before thresholding at 0, so cost
+    stays flat as photos grow; at native resolution this is the plain argmax.
+
+    Without a GPU (and with cpu_profile) it runs a frozen TorchScript graph in
+    channels-last layout under torch.inference_mode with TORCH_THREADS
+    threads. The graph is scripted once and cached in TORCHSCRIPT_CACHE_DIR
+    (the models volume), so later containers load it instead of the weights.
+    """
+    PERSON_CLASS = 15
+    # Batched inputs are padded up to multiples of this, keeping buckets few
+    BUCKET_STEP = 128
+
+    def __init__(self, name: str, arch: str, max_side: int = SEGMENTATION_MAX_SIDE,
+                 cpu_profile: bool = True):
+        self.name = name
+        self.arch = arch
+        self.max_side = max_side
+        self.cpu_profile = cpu_profile
+        self.channels_last = False
+        self.model = None
+        self.load_source = None
+
+    @property
+    def device(self) -> str:
+        import torch
+        return "cuda" if torch.cuda.is_available() else "cpu"
+
+    def torchscript_path(self) -> str:
+        import torch
+        import torchvision
+        if not TORCHSCRIPT_CACHE_DIR:
+            return None
+        # Frozen graphs are tied to the torch / torchvision build that wrote them
+        return os.path.join(TORCHSCRIPT_CACHE_DIR,
+                            f"{self.arch}-torch{torch.__version__}-tv{torchvision.__version__}.pt")
+
+    def load(self):
+        import torch
+        import torchvision
+
+        cpu_profile = self.cpu_profile and self.device == "cpu"
+        path = self.torchscript_path() if cpu_profile else None
+        if cpu_profile:
+            torch.set_num_threads(TORCH_THREADS or os.cpu_count() or 1)
+            self.channels_last = True
+        if path and os.path.exists(path):
+            self.model = torch.jit.optimize_for_inference(torch.jit.load(path))
+            self.load_source = "torchscript-cache"
+            return
+
+        model = getattr(torchvision.models.segmentation, self.arch)(weights='DEFAULT')
+        model.eval()
+        self.load_source = "eager"
+        if self.device == "cuda":
+            self.model = model.cuda()
+            return
+        if self.channels_last:
+            model = model.to(memory_format=torch.channels_last)
+        if path:
+            scripted = torch.jit.freeze(torch.jit.script(model))
+            try:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                torch.jit.save(scripted, path)
+                if path.startswith("/models/"):
+                    models_volume.commit()
+                self.load_source = "torchscript"
+            except Exception as e:
+                # Still usable, just scripted again on the next container start
+                print(f"⚠️ Could not cache TorchScript graph at {path}: {e}")
+            model = torch.jit.optimize_for_inference(scripted)
+        self.model = model
+
+    def working_size(self, w: int, h: int) -> tuple:
+        scale = self.max_side / max(w, h) if self.max_side else 1.0
+        if scale >= 1.0:
+            return w, h
+        return max(1, round(w * scale)), max(1, round(h * scale))
+
+    def bucket_shape(self, sw: int, sh: int) -> tuple:
+        step = self.BUCKET_STEP
+        return -(-sw // step) * step, -(-sh // step) * step
+
+    def _input(self, img: np.ndarray):
+        import cv2
+        import torchvision.transforms as T
+
+        h, w = img.shape[:2]
+        sw, sh = self.working_size(w, h)
+        if (sw, sh) != (w, h):
+            img = cv2.resize(img, (sw, sh), interpolation=cv2.INTER_AREA)
+        transform = T.Compose([
+            T.ToTensor(),
+            T.Normalize(mean=[0.485, 0.456, 0.406], std=[0.229, 0.224, 0.225])
+        ])
+        return transform(img)
+
+    def _pad(self, x, bw: int, bh: int):
+        import torch.nn.functional as F
+        # Edge replication, not zeros: ASPP's image-level pooling averages over
+        # the padding too, and replicated edges keep that average (and the mask)
+        # close to the unpadded single-image pass. The padded logits are cropped
+        # off in segment_batch.
+        return F.pad(x[None], (0, bw - x.shape[2], 0, bh - x.shape[1]), mode='replicate')[0]
+
+    def _forward(self, inputs: list):
+        import torch
+
+        batch = torch.stack(inputs)
+        if self.device == "cuda":
+            batch = batch.cuda()
+        if self.channels_last:
+            batch = batch.contiguous(memory_format=torch.channels_last)
+        with torch.inference_mode():
+            output = self.model(batch)['out']
+            # Person logit minus the best other class: > 0 where argmax is person,
+            # and a single channel to upsample instead of 21
+            person = output[:, self.PERSON_CLASS]
+            others = torch.cat([output[:, :self.PERSON_CLASS], output[:, self.PERSON_CLASS + 1:]], dim=1)
+            score = person - others.amax(dim=1)
+        if self.device == "cuda":
+            torch.cuda.synchronize()
+        return score
+
+    def _mask(self, score, w: int, h: int) -> np.ndarray:
+        import torch
+        import torch.nn.functional as F
+
+        with torch.inference_mode():
+            if tuple(score.shape) != (h, w):
+                score = F.interpolate(score[None, None], size=(h, w), mode='bilinear', align_corners=False)[0, 0]
+            return (score > 0).to(torch.uint8).mul_(255).cpu().numpy()
+
+
+class OnnxBackend(SegmentationBackend):
+    """
+    Silueta / ISNet salient-object models through ONNX Runtime on CPU,
+    preprocessed like api/index.py and thresholded at 0.5 to a binary mask
+    """
+
+    def __init__(self, name: str, filename: str, input_size: int, mean: tuple, std: tuple):
+        self.name = name
+        self.filename = filename
+        self.input_size = input_size
+        self.mean = np.array(mean, dtype=np.float32)
+        self.std = np.array(std, dtype=np.float32)
+        self.session = None
+
+    def load(self):
+        import onnxruntime as ort
+
+        # Shipped into the image, or straight from api/ when running locally
+        self.path = os.path.join(ONNX_MODEL_DIR, self.filename)
+        if not os.path.exists(self.path):
+            self.path = os.path.join(API_MODEL_DIR, self.filename)
+        if not os.path.exists(self.path):
+            raise FileNotFoundError(
+                f"{self.filename} is not in the image; deploy with AUTO_HAIR_SEGMENTATION={self.name}"
+            )
+        self.session = ort.InferenceSession(self.path, providers=['CPUExecutionProvider'])
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        # Models exported with a fixed batch dimension run in chunks of that size
+        self.max_batch = model_input.shape[0] if isinstance(model_input.shape[0], int) else None
+
+    def working_size(self, w: int, h: int) -> tuple:
+        return self.input_size, self.input_size
+
+    def _input(self, img: np.ndarray):
+        import cv2
+
+        size = self.input_size
+        small = cv2.resize(img, (size, size), interpolation=cv2.INTER_AREA).astype(np.float32) / 255.0
+        return ((small - self.mean) / self.std).transpose(2, 0, 1)
+
+    def _forward(self, inputs: list):
+        batch = np.ascontiguousarray(np.stack(inputs))
+        chunk = self.max_batch or len(batch)
+        pred = np.concatenate([
+            self.session.run(None, {self.input_name: batch[start:start + chunk]})[0]
+            for start in range(0, len(batch), chunk)
+        ])[:, 0]
+        # Min-max per image, as the API does
+        lo = pred.min(axis=(1, 2), keepdims=True)
+        hi = pred.max(axis=(1, 2), keepdims=True)
+        return (pred - lo) / (hi - lo + 1e-8)
+
+    def _mask(self, prob, w: int, h: int) -> np.ndarray:
+        import cv2
+
+        prob = cv2.resize(prob, (w, h), interpolation=cv2.INTER_LINEAR)
+        return (prob >= 0.5).astype(np.uint8) * 255
+
+
+SEGMENTATION_BACKENDS = {
+    # ~60M parameters; the original pipeline, needs a GPU for interactive latency
+    "deeplab-resnet101": lambda: DeepLabBackend("deeplab-resnet101", "deeplabv3_resnet101"),
+    # ~11M parameters, same classes; usable on CPU
+    "deeplab-mobilenet": lambda: DeepLabBackend("deeplab-mobilenet", "deeplabv3_mobilenet_v3_large"),
+    **{name: (lambda name=name, spec=spec: OnnxBackend(name, *spec)) for name, spec in ONNX_MODELS.items()},
+}
+
+
 @app.cls(
-    gpu="T4",
+    gpu=SEGMENTATION_GPU,
     timeout=120,
     container_idle_timeout=300,  # Keep warm 5 min
     volumes={"/models": models_volume},
@@ -41,72 +477,65 @@ class AutoHairModel:
     
     @modal.enter()
     def load_models(self):
-        """Load models on container start"""
-        import torch
-        import torchvision
-        
-        print("🚀 Loading Auto Hair models...")
-        
-        # Load DeepLab v3+ for segmentation
-        self.model = torchvision.models.segmentation.deeplabv3_resnet101(
-            weights='DEFAULT'
-        )
-        self.model.eval()
-        
-        if torch.cuda.is_available():
-            self.model = self.model.cuda()
+        """Load the configured segmentation backend on container start"""
+        print(f"🚀 Loading Auto Hair models ({SEGMENTATION_BACKEND})...")
+        self.backends = {}
+        backend = self._segmentation_backend(SEGMENTATION_BACKEND)
+        if backend.device == "cuda":
             print("✅ Models loaded on GPU")
+        elif getattr(backend, "channels_last", False):
+            print(f"✅ Models loaded on CPU ({backend.load_source}, {TORCH_THREADS or os.cpu_count()} threads)")
         else:
             print("⚠️ Models loaded on CPU")
+
+    def _segmentation_backend(self, name: str = None) -> SegmentationBackend:
+        """Loaded backend by name (default: AUTO_HAIR_SEGMENTATION), loading it on first use"""
+        name = name or SEGMENTATION_BACKEND
+        if name not in SEGMENTATION_BACKENDS:
+            raise ValueError(f"Unknown segmentation backend '{name}'; "
+                             f"available: {', '.join(SEGMENTATION_BACKENDS)}")
+        if not hasattr(self, 'backends'):
+            self.backends = {}
+        if name not in self.backends:
+            backend = SEGMENTATION_BACKENDS[name]()
+            backend.load()
+            self.backends[name] = backend
+        return self.backends[name]
     
     @modal.method()
-    def enhance_hair(self, image_b64: str) -> dict:
+    def enhance_hair(self, image_b64: str, backend: str = None) -> dict:
         """
         Main hair enhancement pipeline
         
         Pipeline:
-        1. DeepLab v3+ Segmentation
+        1. Person Segmentation (backend: see SEGMENTATION_BACKENDS, default
+           AUTO_HAIR_SEGMENTATION)
         2. Trimap Generation  
         3. KNN Matting (lightweight alternative to Deep Image Matting)
         4. Alpha Refinement
         """
         import time
-        import torch
-        import cv2
         
         start_time = time.time()
         timings = {}
+        segmentation_timings = {}
         
         try:
             # Decode image
+            stage_start = time.time()
             img_array = self._decode_image(image_b64)
             h, w = img_array.shape[:2]
+            timings['decode'] = time.time() - stage_start
             
             # Stage 1: Segmentation
-            print("🎯 Stage 1: DeepLab Segmentation...")
+            segmenter = self._segmentation_backend(backend)
+            print(f"🎯 Stage 1: Segmentation ({segmenter.name})...")
             stage_start = time.time()
-            mask = self._run_segmentation(img_array)
+            mask = segmenter.segment(img_array, timings=segmentation_timings)
             timings['segmentation'] = time.time() - stage_start
             
-            # Stage 2: Trimap Generation
-            print("🎨 Stage 2: Trimap Generation...")
-            stage_start = time.time()
-            trimap = self._generate_trimap(mask, dilate=10, erode=5)
-            timings['trimap'] = time.time() - stage_start
-            
-            # Stage 3: Hair Region Enhancement
-            print("✨ Stage 3: Hair Enhancement...")
-            stage_start = time.time()
-            alpha = self._enhance_hair_region(img_array, trimap, mask)
-            timings['enhancement'] = time.time() - stage_start
-            
-            # Stage 4: Composite
-            stage_start = time.time()
-            result_img = self._composite_alpha(img_array, alpha)
-            timings['composite'] = time.time() - stage_start
-            
-            # Encode output
-            result_b64 = self._encode_image(result_img)
+            # Stages 2-4 and encode
+            result_b64 = self._refine_and_encode(img_array, mask, timings)
             
             total_time = time.time() - start_time
             timings['total'] = total_time
@@ -116,6 +545,13 @@ class AutoHairModel:
             return {
                 "refined_image": result_b64,
                 "timings": {k: f"{v:.3f}s" for k, v in timings.items()},
+                "timings_ms": {k: round(v * 1000, 1) for k, v in timings.items()},
+                "segmentation": {
+                    "backend": segmenter.name,
+                    "device": segmenter.device,
+                    "resolution": "{}x{}".format(*segmenter.working_size(w, h)),
+                    "timings_ms": {k: round(v * 1000, 1) for k, v in segmentation_timings.items()},
+                },
                 "success": True,
                 "size": f"{w}x{h}"
             }
@@ -131,6 +567,111 @@ class AutoHairModel:
                 "timings": timings
             }
     
+    def _refine_and_encode(self, img_array: np.ndarray, mask: np.ndarray, timings: dict) -> str:
+        """Trimap, hair enhancement, composite and encode for one segmented image"""
+        import time
+        
+        # Stage 2: Trimap Generation
+        print("🎨 Stage 2: Trimap Generation...")
+        stage_start = time.time()
+        trimap = self._generate_trimap(mask, dilate=10, erode=5)
+        timings['trimap'] = time.time() - stage_start
+        
+        # Stage 3: Hair Region Enhancement
+        print("✨ Stage 3: Hair Enhancement...")
+        stage_start = time.time()
+        alpha = self._enhance_hair_region(img_array, trimap, mask)
+        timings['enhancement'] = time.time() - stage_start
+        
+        # Stage 4: Composite
+        stage_start = time.time()
+        result_img = self._composite_alpha(img_array, alpha)
+        timings['composite'] = time.time() - stage_start
+        
+        # Encode output
+        stage_start = time.time()
+        result_b64 = self._encode_image(result_img)
+        timings['encode'] = time.time() - stage_start
+        return result_b64
+    
+    @modal.method()
+    def enhance_hair_batch(self, images_b64: list, backend: str = None) -> dict:
+        """
+        enhance_hair for a list of images in one call.
+        
+        Segmentation runs once per size bucket (see SegmentationBackend.segment_batch)
+        instead of once per image; trimap, enhancement, composite and encode then
+        run per image. A failing image gets its own error entry and does not fail
+        the rest of the batch.
+        """
+        import time
+        
+        start_time = time.time()
+        results = [None] * len(images_b64)
+        decoded = {}
+        
+        try:
+            segmenter = self._segmentation_backend(backend)
+        except Exception as e:
+            return {"error": str(e), "success": False}
+        
+        for i, image_b64 in enumerate(images_b64):
+            stage_start = time.time()
+            try:
+                decoded[i] = self._decode_image(image_b64)
+            except Exception as e:
+                results[i] = {"error": str(e), "success": False}
+                continue
+            results[i] = {"timings": {'decode': time.time() - stage_start}}
+        
+        indices = list(decoded)
+        print(f"🎯 Segmentation ({segmenter.name}) of {len(indices)} images...")
+        stage_start = time.time()
+        try:
+            masks, buckets = segmenter.segment_batch([decoded[i] for i in indices])
+        except Exception as e:
+            print(f"❌ Error: {str(e)}")
+            return {"error": str(e), "success": False}
+        segmentation_time = time.time() - stage_start
+        
+        for mask, i in zip(masks, indices):
+            img_array = decoded.pop(i)
+            h, w = img_array.shape[:2]
+            timings = results[i]["timings"]
+            try:
+                result_b64 = self._refine_and_encode(img_array, mask, timings)
+            except Exception as e:
+                print(f"❌ Error on image {i}: {str(e)}")
+                results[i] = {"error": str(e), "success": False}
+                continue
+            results[i] = {
+                "refined_image": result_b64,
+                "timings_ms": {k: round(v * 1000, 1) for k, v in timings.items()},
+                "resolution": "{}x{}".format(*segmenter.working_size(w, h)),
+                "success": True,
+                "size": f"{w}x{h}"
+            }
+        
+        total_time = time.time() - start_time
+        print(f"✅ Batch of {len(images_b64)} complete in {total_time:.2f}s")
+        return {
+            "results": results,
+            "segmentation": {
+                "backend": segmenter.name,
+                "device": segmenter.device,
+                "buckets": [{
+                    "shape": "{}x{}".format(*bucket["shape"]),
+                    "images": [indices[j] for j in bucket["images"]],
+                    "timings_ms": {k: round(v * 1000, 1) for k, v in bucket["timings"].items()},
+                } for bucket in buckets],
+            },
+            "timings_ms": {
+                "segmentation": round(segmentation_time * 1000, 1),
+                "total": round(total_time * 1000, 1),
+            },
+            "success": any(r.get("success") for r in results),
+        }
+    
     @modal.method()
     def process_beauty(self, image_b64: str, landmarks: dict = None, params: dict = None) -> dict:
         """
@@ -148,8 +689,12 @@ class AutoHairModel:
             "lip_intensity": 0-100,
             "blush_color": "#hex", 
             "blush_intensity": 0-100,
-            "eye_enlarge": 100-130
+            "eye_enlarge": 100-130,
+            "face_roi": bool (default True)
         }
+        
+        With face_roi enabled every module runs on a padded crop covering only
+        the regions the enabled modules touch; the crop is composited back once.
         """
         import time
         import cv2
@@ -160,21 +705,34 @@ class AutoHairModel:
         
         try:
             # Decode image
+            stage_start = time.time()
             img = self._decode_image(image_b64)
             h, w = img.shape[:2]
-            img_bgr = cv2.cvtColor(img, cv2.COLOR_RGB2BGR)
+            timings['decode'] = time.time() - stage_start
             
             # Generate face data if not provided
             face = self._estimate_face_positions(w, h, landmarks)
             
-            print(f"💄 Beauty processing: {w}x{h}")
+            # Face-ROI mode: crop to the union of the enabled modules' footprints
+            roi = None
+            if params.get('face_roi', True):
+                roi = self._face_roi_bounds(face, w, h, params)
+            x0, y0, x1, y1 = roi or (0, 0, w, h)
+            face = self._shift_face(face, x0, y0, w, h)
+            img_bgr = cv2.cvtColor(img[y0:y1, x0:x1], cv2.COLOR_RGB2BGR)
+            
+            # Shared, lazily computed products for all modules
+            ctx = FaceContext(self, img_bgr, face)
+            
+            print(f"💄 Beauty processing: {w}x{h} (roi {x1 - x0}x{y1 - y0} at {x0},{y0})")
             
             # Module A: Pixel-Level Processing
             
             # 1. Skin Smoothing
             if params.get('skin_smooth', 0) > 0:
                 stage_start = time.time()
-                img_bgr = self._skin_smoothing(img_bgr, face, params['skin_smooth'])
+                img_bgr = self._skin_smoothing(img_bgr, face, params['skin_smooth'], ctx=ctx)
+                ctx.set_image(img_bgr)
                 timings['skin_smooth'] = time.time() - stage_start
                 print(f"✅ Skin smoothing: {timings['skin_smooth']:.3f}s")
             
@@ -182,7 +740,8 @@ class AutoHairModel:
             if params.get('blemish_remove', False):
                 stage_start = time.time()
                 sensitivity = params.get('blemish_sensitivity', 50)
-                img_bgr = self._remove_blemishes(img_bgr, face, sensitivity)
+                img_bgr = self._remove_blemishes(img_bgr, face, sensitivity, ctx=ctx)
+                ctx.set_image(img_bgr)
                 timings['blemish_remove'] = time.time() - stage_start
                 print(f"✅ Blemish removal: {timings['blemish_remove']:.3f}s")
             
@@ -193,7 +752,8 @@ class AutoHairModel:
                 stage_start = time.time()
                 color = params.get('lip_color', '#dc5050')
                 intensity = params['lip_intensity']
-                img_bgr = self._apply_lip_color(img_bgr, face, color, intensity)
+                img_bgr = self._apply_lip_color(img_bgr, face, color, intensity, ctx=ctx)
+                ctx.set_image(img_bgr)
                 timings['lip_color'] = time.time() - stage_start
                 print(f"✅ Lip color: {timings['lip_color']:.3f}s")
             
@@ -202,7 +762,8 @@ class AutoHairModel:
                 stage_start = time.time()
                 color = params.get('blush_color', '#ff9696')
                 intensity = params['blush_intensity']
-                img_bgr = self._apply_blush(img_bgr, face, color, intensity)
+                img_bgr = self._apply_blush(img_bgr, face, color, intensity, ctx=ctx)
+                ctx.set_image(img_bgr)
                 timings['blush'] = time.time() - stage_start
                 print(f"✅ Blush: {timings['blush']:.3f}s")
             
@@ -210,13 +771,16 @@ class AutoHairModel:
             if params.get('eye_enlarge', 100) > 100:
                 stage_start = time.time()
                 scale = params['eye_enlarge'] / 100.0
-                img_bgr = self._enlarge_eyes(img_bgr, face, scale)
+                img_bgr = self._enlarge_eyes(img_bgr, face, scale, inplace=True, ctx=ctx)
+                ctx.set_image(img_bgr)
                 timings['eye_enlarge'] = time.time() - stage_start
                 print(f"✅ Eye enlargement: {timings['eye_enlarge']:.3f}s")
             
-            # Convert back to RGB and encode
-            img_rgb = cv2.cvtColor(img_bgr, cv2.COLOR_BGR2RGB)
-            result_b64 = self._encode_image_rgb(img_rgb)
+            # Convert back to RGB, composite the ROI into the frame and encode
+            stage_start = time.time()
+            img[y0:y1, x0:x1] = cv2.cvtColor(img_bgr, cv2.COLOR_BGR2RGB)
+            result_b64 = self._encode_image_rgb(img)
+            timings['encode'] = time.time() - stage_start
             
             total_time = time.time() - start_time
             timings['total'] = total_time
@@ -226,8 +790,11 @@ class AutoHairModel:
             return {
                 "enhanced_image": result_b64,
                 "timings": {k: f"{v:.3f}s" for k, v in timings.items()},
+                "timings_ms": {k: round(v * 1000, 1) for k, v in timings.items()},
+                "face_context_computes": ctx.computes,
                 "success": True,
-                "size": f"{w}x{h}"
+                "size": f"{w}x{h}",
+                "roi": f"{x0},{y0},{x1 - x0}x{y1 - y0}"
             }
             
         except Exception as e:
@@ -257,25 +824,105 @@ class AutoHairModel:
             'faceWidth': w * 0.6
         }
     
-    def _skin_smoothing(self, img: np.ndarray, face: dict, intensity: int) -> np.ndarray:
+    def _face_ellipse(self, face: dict, w: int, h: int) -> tuple:
+        """Face ellipse (cx, cy, rx, ry) used by the skin mask"""
+        w = face.get('frameWidth', w)
+        h = face.get('frameHeight', h)
+        face_cx = int(face['noseTip']['x'])
+        face_cy = int((face['pupilLeft']['y'] + face['underLipBottom']['y']) / 2)
+        face_rx = int(face.get('faceWidth', w * 0.5) / 2)
+        face_ry = int(h * 0.35)
+        return face_cx, face_cy, face_rx, face_ry
+    
+    def _mouth_ellipse(self, face: dict, scale_x: float = 1.0, scale_y: float = 1.0) -> tuple:
+        """Mouth ellipse (cx, cy, rx, ry) with per-axis scaling"""
+        mouth_cx = int((face['mouthLeft']['x'] + face['mouthRight']['x']) / 2)
+        mouth_cy = int((face['upperLipTop']['y'] + face['underLipBottom']['y']) / 2)
+        mouth_rx = int(abs(face['mouthRight']['x'] - face['mouthLeft']['x']) / 2 * scale_x)
+        mouth_ry = int(abs(face['underLipBottom']['y'] - face['upperLipTop']['y']) / 2 * scale_y)
+        return mouth_cx, mouth_cy, mouth_rx, mouth_ry
+    
+    def _cheek_spots(self, face: dict, h: int) -> tuple:
+        """Blush spot geometry (left_x, right_x, y, radius)"""
+        h = face.get('frameHeight', h)
+        eye_spacing = abs(face['pupilRight']['x'] - face['pupilLeft']['x'])
+        cheek_y = int(face['noseTip']['y'] + h * 0.03)
+        cheek_r = int(eye_spacing * 0.35)
+        
+        left_cheek_x = int(face['pupilLeft']['x'] - eye_spacing * 0.2)
+        right_cheek_x = int(face['pupilRight']['x'] + eye_spacing * 0.2)
+        return left_cheek_x, right_cheek_x, cheek_y, cheek_r
+    
+    def _face_roi_bounds(self, face: dict, w: int, h: int, params: dict,
+                         margin: int = 32) -> tuple:
+        """
+        Padded bounding box (x0, y0, x1, y1) of everything the enabled beauty
+        modules read or write. The margin covers the filter footprints
+        (Gaussian/bilateral/box blurs, feathering, inpainting) so results
+        inside the crop match a full-frame run. Returns None if no module is on.
+        """
+        boxes = []
+        
+        if params.get('skin_smooth', 0) > 0 or params.get('blemish_remove', False):
+            cx, cy, rx, ry = self._face_ellipse(face, w, h)
+            boxes.append((cx - rx, cy - ry, cx + rx, cy + ry))
+        
+        if params.get('lip_intensity', 0) > 0:
+            cx, cy, rx, ry = self._mouth_ellipse(face, 0.9, 1.2)
+            boxes.append((cx - rx, cy - ry, cx + rx, cy + ry))
+        
+        if params.get('blush_intensity', 0) > 0:
+            left_x, right_x, cy, r = self._cheek_spots(face, h)
+            boxes.append((left_x - r, cy - r, right_x + r, cy + r))
+        
+        if params.get('eye_enlarge', 100) > 100:
+            eye_spacing = abs(face['pupilRight']['x'] - face['pupilLeft']['x'])
+            # Warp sources reach up to 2.25r from each pupil
+            reach = int(np.ceil(int(eye_spacing * 0.18) * 2.25)) + 1
+            for key in ['pupilLeft', 'pupilRight']:
+                cx, cy = int(face[key]['x']), int(face[key]['y'])
+                boxes.append((cx - reach, cy - reach, cx + reach, cy + reach))
+        
+        if not boxes:
+            return None
+        
+        x0 = max(0, min(b[0] for b in boxes) - margin)
+        y0 = max(0, min(b[1] for b in boxes) - margin)
+        x1 = min(w, max(b[2] for b in boxes) + margin + 1)
+        y1 = min(h, max(b[3] for b in boxes) + margin + 1)
+        if x0 >= x1 or y0 >= y1:
+            return None
+        return x0, y0, x1, y1
+    
+    def _shift_face(self, face: dict, x0: int, y0: int, w: int, h: int) -> dict:
+        """Translate landmarks into ROI coordinates, keeping the frame size"""
+        shifted = {}
+        for key, value in face.items():
+            if isinstance(value, dict) and 'x' in value and 'y' in value:
+                shifted[key] = {**value, 'x': value['x'] - x0, 'y': value['y'] - y0}
+            else:
+                shifted[key] = value
+        shifted['frameWidth'] = face.get('frameWidth', w)
+        shifted['frameHeight'] = face.get('frameHeight', h)
+        return shifted
+    
+    def _skin_smoothing(self, img: np.ndarray, face: dict, intensity: int,
+                        ctx: FaceContext = None) -> np.ndarray:
         """
         Frequency Separation Skin Smoothing
         Preserves texture while smoothing color variations
         """
         import cv2
         
-        # Generate skin mask (exclude eyes/mouth)
-        skin_mask = self._generate_skin_mask(img, face)
+        ctx = ctx or FaceContext(self, img, face)
         
         # Frequency separation
         blur_radius = 5 + int(intensity / 20)  # 5-10 pixels
         blur_size = blur_radius * 2 + 1
         
         # Low frequency = color information
-        low_freq = cv2.GaussianBlur(img, (blur_size, blur_size), 0)
-        
         # High frequency = texture detail
-        high_freq = cv2.subtract(img, low_freq) + 128
+        low_freq, high_freq = ctx.frequency_layers(blur_size)
         
         # Smooth the low frequency with bilateral filter
         d = 9
@@ -286,25 +933,24 @@ class AutoHairModel:
         # Recombine
         result = cv2.add(smoothed_low, cv2.subtract(high_freq, 128))
         
-        # Blend with original using skin mask
+        # Blend with original using skin mask (exclude eyes/mouth)
         blend = intensity / 100.0 * 0.8  # Max 80% blend
-        mask_3d = np.stack([skin_mask / 255.0] * 3, axis=-1)
+        mask_3d = ctx.skin_alpha()
         output = img * (1 - mask_3d * blend) + result * (mask_3d * blend)
         
         return output.astype(np.uint8)
     
-    def _generate_skin_mask(self, img: np.ndarray, face: dict) -> np.ndarray:
+    def _generate_skin_mask(self, img: np.ndarray, face: dict,
+                            ctx: FaceContext = None) -> np.ndarray:
         """Generate mask for skin region (excluding eyes, mouth)"""
         import cv2
         
+        ctx = ctx or FaceContext(self, img, face)
         h, w = img.shape[:2]
         mask = np.zeros((h, w), dtype=np.uint8)
         
         # Face ellipse (main region)
-        face_cx = int(face['noseTip']['x'])
-        face_cy = int((face['pupilLeft']['y'] + face['underLipBottom']['y']) / 2)
-        face_rx = int(face.get('faceWidth', w * 0.5) / 2)
-        face_ry = int(h * 0.35)
+        face_cx, face_cy, face_rx, face_ry = ctx.face_ellipse()
         cv2.ellipse(mask, (face_cx, face_cy), (face_rx, face_ry), 0, 0, 360, 255, -1)
         
         # Exclude eyes
@@ -315,10 +961,7 @@ class AutoHairModel:
                    eye_r * 2, 0, -1)
         
         # Exclude mouth
-        mouth_cx = int((face['mouthLeft']['x'] + face['mouthRight']['x']) / 2)
-        mouth_cy = int((face['upperLipTop']['y'] + face['underLipBottom']['y']) / 2)
-        mouth_rx = int(abs(face['mouthRight']['x'] - face['mouthLeft']['x']) / 2)
-        mouth_ry = int(abs(face['underLipBottom']['y'] - face['upperLipTop']['y']) / 2 * 1.5)
+        mouth_cx, mouth_cy, mouth_rx, mouth_ry = ctx.mouth_ellipse(1.0, 1.5)
         cv2.ellipse(mask, (mouth_cx, mouth_cy), (mouth_rx, mouth_ry), 0, 0, 360, 0, -1)
         
         # Feather edges
@@ -326,18 +969,19 @@ class AutoHairModel:
         
         return mask
     
-    def _remove_blemishes(self, img: np.ndarray, face: dict, sensitivity: int) -> np.ndarray:
+    def _remove_blemishes(self, img: np.ndarray, face: dict, sensitivity: int,
+                          ctx: FaceContext = None) -> np.ndarray:
         """Auto-detect and remove blemishes using inpainting"""
         import cv2
         
-        # Generate skin mask
-        skin_mask = self._generate_skin_mask(img, face)
+        ctx = ctx or FaceContext(self, img, face)
         
-        # Convert to grayscale
-        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+        # Skin mask shared with skin smoothing
+        skin_mask = ctx.skin_mask()
         
-        # Local contrast detection
-        local_mean = cv2.blur(gray, (21, 21))
+        # Local contrast detection on grayscale
+        gray = ctx.gray()
+        local_mean = ctx.local_mean(21)
         diff = cv2.absdiff(gray, local_mean)
         
         # Threshold for blemish detection
@@ -357,57 +1001,47 @@ class AutoHairModel:
         
         return img
     
-    def _apply_lip_color(self, img: np.ndarray, face: dict, color: str, intensity: int) -> np.ndarray:
+    def _apply_lip_color(self, img: np.ndarray, face: dict, color: str, intensity: int,
+                         ctx: FaceContext = None) -> np.ndarray:
         """Apply lip color using alpha blending"""
         import cv2
         
+        ctx = ctx or FaceContext(self, img, face)
         h, w = img.shape[:2]
         
         # Create lip mask
         lip_mask = np.zeros((h, w), dtype=np.uint8)
         
         # Lip ellipse
-        mouth_cx = int((face['mouthLeft']['x'] + face['mouthRight']['x']) / 2)
-        mouth_cy = int((face['upperLipTop']['y'] + face['underLipBottom']['y']) / 2)
-        mouth_rx = int(abs(face['mouthRight']['x'] - face['mouthLeft']['x']) / 2 * 0.9)
-        mouth_ry = int(abs(face['underLipBottom']['y'] - face['upperLipTop']['y']) / 2 * 1.2)
+        mouth_cx, mouth_cy, mouth_rx, mouth_ry = ctx.mouth_ellipse(0.9, 1.2)
         
         cv2.ellipse(lip_mask, (mouth_cx, mouth_cy), (mouth_rx, mouth_ry), 0, 0, 360, 255, -1)
         
         # Feather edges
         lip_mask = cv2.GaussianBlur(lip_mask, (11, 11), 0)
         
-        # Parse color
-        color_bgr = self._hex_to_bgr(color)
-        
-        # Create color layer
-        color_layer = np.full_like(img, color_bgr)
+        # Parse color; broadcast instead of allocating a full color layer
+        color_layer = np.array(ctx.color(color), dtype=np.uint8)
         
         # Alpha blending
         alpha = (intensity / 100.0) * 0.5  # Max 50% opacity
-        mask_3d = np.stack([lip_mask / 255.0 * alpha] * 3, axis=-1)
+        mask_3d = (lip_mask / 255.0 * alpha)[..., None]
         
         result = img * (1 - mask_3d) + color_layer * mask_3d
         
         return result.astype(np.uint8)
     
-    def _apply_blush(self, img: np.ndarray, face: dict, color: str, intensity: int) -> np.ndarray:
+    def _apply_blush(self, img: np.ndarray, face: dict, color: str, intensity: int,
+                     ctx: FaceContext = None) -> np.ndarray:
         """Apply blush effect with radial gradient"""
-        import cv2
-        
-        h, w = img.shape[:2]
+        ctx = ctx or FaceContext(self, img, face)
         result = img.copy()
         
         # Cheek positions
-        eye_spacing = abs(face['pupilRight']['x'] - face['pupilLeft']['x'])
-        cheek_y = int(face['noseTip']['y'] + h * 0.03)
-        cheek_r = int(eye_spacing * 0.35)
-        
-        left_cheek_x = int(face['pupilLeft']['x'] - eye_spacing * 0.2)
-        right_cheek_x = int(face['pupilRight']['x'] + eye_spacing * 0.2)
+        left_cheek_x, right_cheek_x, cheek_y, cheek_r = ctx.cheek_spots()
         
         # Parse color
-        color_bgr = self._hex_to_bgr(color)
+        color_bgr = ctx.color(color)
         
         # Apply blush spots
         for cx in [left_cheek_x, right_cheek_x]:
@@ -418,81 +1052,118 @@ class AutoHairModel:
     def _draw_blush_spot(self, img: np.ndarray, cx: int, cy: int, radius: int, 
                           color_bgr: tuple, intensity: int) -> np.ndarray:
         """Draw a single blush spot with radial gradient"""
-        import cv2
-        
         h, w = img.shape[:2]
+        result = img.copy()
+        
+        # Gradient is zero outside the radius, so only its bounding box is touched
+        x0, x1 = max(0, cx - radius), min(w, cx + radius + 1)
+        y0, y1 = max(0, cy - radius), min(h, cy + radius + 1)
+        if radius <= 0 or x0 >= x1 or y0 >= y1:
+            return result
+        patch = img[y0:y1, x0:x1]
         
         # Create mask with radial gradient
-        mask = np.zeros((h, w), dtype=np.float32)
-        y, x = np.ogrid[:h, :w]
+        y, x = np.ogrid[y0:y1, x0:x1]
         dist = np.sqrt((x - cx)**2 + (y - cy)**2)
         mask = np.clip(1 - dist / radius, 0, 1)
         mask = np.power(mask, 1.5)  # Softer falloff
         
         # Color layer
-        color_layer = np.full_like(img, color_bgr)
+        color_layer = np.full_like(patch, color_bgr)
         
         # Blend using overlay mode
         alpha = (intensity / 100.0) * 0.35  # Max 35% opacity
         mask_3d = np.stack([mask * alpha] * 3, axis=-1)
         
-        result = img * (1 - mask_3d) + color_layer * mask_3d
+        result[y0:y1, x0:x1] = (patch * (1 - mask_3d) + color_layer * mask_3d).astype(np.uint8)
         
-        return result.astype(np.uint8)
+        return result
     
-    def _enlarge_eyes(self, img: np.ndarray, face: dict, scale: float) -> np.ndarray:
+    def _enlarge_eyes(self, img: np.ndarray, face: dict, scale: float,
+                      inplace: bool = False, ctx: FaceContext = None) -> np.ndarray:
         """Enlarge eyes using spherical magnification"""
-        import cv2
-        
         if scale <= 1.0:
             return img
         
-        result = img.copy()
-        
-        eye_spacing = abs(face['pupilRight']['x'] - face['pupilLeft']['x'])
-        eye_radius = int(eye_spacing * 0.18)
-        
-        for eye_key in ['pupilLeft', 'pupilRight']:
-            cx = int(face[eye_key]['x'])
-            cy = int(face[eye_key]['y'])
-            result = self._spherical_magnify(result, cx, cy, eye_radius, scale)
-        
-        return result
+        ctx = ctx or FaceContext(self, img, face)
+        centers, eye_radius = ctx.eye_geometry()
+        return self._warp_eyes_roi(img, centers, eye_radius, scale, inplace=inplace)
     
     def _spherical_magnify(self, img: np.ndarray, cx: int, cy: int, 
                             radius: int, scale: float) -> np.ndarray:
         """Apply spherical magnification to a region"""
+        return self._warp_eyes_roi(img, [(cx, cy)], radius, scale)
+    
+    def _warp_eyes_roi(self, img: np.ndarray, centers: list, 
+                       radius: int, scale: float, inplace: bool = False) -> np.ndarray:
+        """
+        ROI-only spherical magnification for one or more eyes
+        
+        Displacement maps are built with NumPy for each eye's bounding box only,
+        all eyes share a single cv2.remap over the cropped union region and the
+        result is pasted back. Cost scales with the eye region, not the photo
+        (with inplace=True the full-frame copy is skipped as well).
+        """
         import cv2
         
         h, w = img.shape[:2]
-        result = img.copy()
+        if radius <= 0 or scale <= 1.0 or not centers:
+            return img
+        
+        # Pixels within 1.5r are displaced; their sources reach at most
+        # 1.5r * 1.5^(1/scale) < 2.25r from the center (scale > 1)
+        warp_r = int(np.ceil(radius * 1.5))
+        src_r = int(np.ceil(radius * 2.25)) + 1
+        
+        # Destination region (pixels that change) and source region (pixels read)
+        dx0 = max(0, min(cx for cx, _ in centers) - warp_r)
+        dy0 = max(0, min(cy for _, cy in centers) - warp_r)
+        dx1 = min(w, max(cx for cx, _ in centers) + warp_r + 1)
+        dy1 = min(h, max(cy for _, cy in centers) + warp_r + 1)
+        if dx0 >= dx1 or dy0 >= dy1:
+            return img
+        
+        sx0 = max(0, min(cx for cx, _ in centers) - src_r)
+        sy0 = max(0, min(cy for _, cy in centers) - src_r)
+        sx1 = min(w, max(cx for cx, _ in centers) + src_r + 1)
+        sy1 = min(h, max(cy for _, cy in centers) + src_r + 1)
+        
+        # Identity maps for the destination region, relative to the source crop.
+        # Coordinates stay small and translation-invariant, so float32 rounding
+        # is the same whether the photo or the face ROI (process_beauty) is
+        # passed in, which keeps the ROI path bit-identical to a full-frame run
+        xs = np.arange(dx0 - sx0, dx1 - sx0, dtype=np.float32)
+        ys = np.arange(dy0 - sy0, dy1 - sy0, dtype=np.float32)
+        map_x = np.broadcast_to(xs, (dy1 - dy0, dx1 - dx0)).copy()
+        map_y = np.broadcast_to(ys[:, None], (dy1 - dy0, dx1 - dx0)).copy()
+        
+        for cx, cy in centers:
+            # Per-eye box, relative to the destination region
+            bx0, by0 = max(dx0, cx - warp_r), max(dy0, cy - warp_r)
+            bx1, by1 = min(dx1, cx + warp_r + 1), min(dy1, cy + warp_r + 1)
+            if bx0 >= bx1 or by0 >= by1:
+                continue
+            
+            ddx = np.arange(bx0, bx1, dtype=np.float32)[None, :] - cx
+            ddy = np.arange(by0, by1, dtype=np.float32)[:, None] - cy
+            dist = np.sqrt(ddx ** 2 + ddy ** 2)
+            inside = dist < radius * 1.5
+            
+            # Spherical magnification formula
+            factor = (dist / radius) ** (1 / scale)
+            src_x = np.clip((cx - sx0) + ddx * factor, -sx0, w - 1 - sx0)
+            src_y = np.clip((cy - sy0) + ddy * factor, -sy0, h - 1 - sy0)
+            
+            box = (slice(by0 - dy0, by1 - dy0), slice(bx0 - dx0, bx1 - dx0))
+            map_x[box] = np.where(inside, src_x, map_x[box])
+            map_y[box] = np.where(inside, src_y, map_y[box])
         
-        # Create coordinate maps
-        map_x = np.zeros((h, w), dtype=np.float32)
-        map_y = np.zeros((h, w), dtype=np.float32)
-        
-        for y in range(h):
-            for x in range(w):
-                map_x[y, x] = x
-                map_y[y, x] = y
-        
-        # Apply magnification within radius
-        for y in range(max(0, cy - radius * 2), min(h, cy + radius * 2)):
-            for x in range(max(0, cx - radius * 2), min(w, cx + radius * 2)):
-                dx = x - cx
-                dy = y - cy
-                dist = np.sqrt(dx**2 + dy**2)
-                
-                if dist < radius * 1.5:
-                    # Spherical magnification formula
-                    factor = (dist / radius) ** (1 / scale)
-                    src_x = cx + dx * factor
-                    src_y = cy + dy * factor
-                    
-                    map_x[y, x] = max(0, min(w - 1, src_x))
-                    map_y[y, x] = max(0, min(h - 1, src_y))
-        
-        result = cv2.remap(img, map_x, map_y, cv2.INTER_LINEAR)
+        # Single remap on the cropped source region, then paste back
+        src = img[sy0:sy1, sx0:sx1]
+        warped = cv2.remap(src, map_x, map_y, cv2.INTER_LINEAR, borderMode=cv2.BORDER_REPLICATE)
+        
+        result = img if inplace else img.copy()
+        result[dy0:dy1, dx0:dx1] = warped
         
         return result
     
@@ -540,32 +1211,9 @@ class AutoHairModel:
         
         return b64_str
     
-    def _run_segmentation(self, img: np.ndarray) -> np.ndarray:
-        """Run DeepLab v3+ person segmentation"""
-        import torch
-        import torchvision.transforms as T
-        
-        # Prepare input
-        transform = T.Compose([
-            T.ToTensor(),
-            T.Normalize(mean=[0.485, 0.456, 0.406], std=[0.229, 0.224, 0.225])
-        ])
-        
-        # Convert to tensor
-        input_tensor = transform(img).unsqueeze(0)
-        
-        if torch.cuda.is_available():
-            input_tensor = input_tensor.cuda()
-        
-        # Run inference
-        with torch.no_grad():
-            output = self.model(input_tensor)['out'][0]
-        
-        # Get person mask (class 15 in COCO)
-        mask = output.argmax(0).cpu().numpy()
-        person_mask = (mask == 15).astype(np.uint8) * 255
-        
-        return person_mask
+    def _run_segmentation(self, img: np.ndarray, backend: str = None) -> np.ndarray:
+        """Person segmentation with the given (or configured) backend"""
+        return self._segmentation_backend(backend).segment(img)
     
     def _generate_trimap(self, mask: np.ndarray, dilate: int = 10, erode: int = 5) -> np.ndarray:
         """Generate trimap with automatic boundary detection"""
@@ -656,18 +1304,16 @@ class AutoHairModel:
         return alpha
     
     def _composite_alpha(self, img: np.ndarray, alpha: np.ndarray) -> np.ndarray:
-        """[BALANCED] Optimized inpainting for speed"""
+        """RGBA output with the background band around the subject refilled (see _decontaminate_band)"""
         import cv2
         
         # Ensure alpha is same size
         if alpha.shape != img.shape[:2]:
             alpha = cv2.resize(alpha, (img.shape[1], img.shape[0]))
         
-        # 1. Color de-contamination with BALANCED radius
-        edge_mask = (alpha > 0).astype(np.uint8) * 255
-        
-        # [OPTIMIZED] Inpaint radius: 25 → 15 (40% faster, still effective)
-        img_clean = cv2.inpaint(img, 255 - edge_mask, 15, cv2.INPAINT_TELEA)
+        # 1. Color de-contamination: only transparent pixels within DECONTAM_BAND
+        # px of the subject can bleed into visible edges when the cutout is resampled
+        img_clean = self._decontaminate_band(img, alpha, DECONTAM_BAND)
         
         # 2. Alpha Channel Integrity
         img_clean = np.nan_to_num(img_clean, nan=0.0)
@@ -680,6 +1326,79 @@ class AutoHairModel:
         
         return result
     
+    def _decontaminate_band(self, img: np.ndarray, alpha: np.ndarray, band: int,
+                            tile: int = 128) -> np.ndarray:
+        """
+        Replace background colour (alpha == 0) within band px of the subject
+        with colour pushed out from the subject (alpha > 0), like the Telea
+        inpaint this replaces but only where it is visible. Works tile by tile:
+        only tiles within reach of the boundary are touched, so the cost
+        follows the contour length rather than the image area.
+        """
+        import cv2
+        
+        known = alpha > 0
+        result = img.copy()
+        if band <= 0 or known.all() or not known.any():
+            return result
+        
+        # Tiles with background pixels and subject pixels within band of them
+        h, w = known.shape
+        rows, cols = -(-h // tile), -(-w // tile)
+        
+        def any_per_tile(mask):
+            padded = np.zeros((rows * tile, cols * tile), dtype=bool)
+            padded[:h, :w] = mask
+            return padded.reshape(rows, tile, cols, tile).any(axis=(1, 3))
+        
+        reach = 2 * -(-band // tile) + 1
+        near_subject = cv2.dilate(any_per_tile(known).view(np.uint8), np.ones((reach, reach), np.uint8)) > 0
+        active = near_subject & any_per_tile(~known)
+        
+        kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (2 * band + 1, 2 * band + 1))
+        margin = 2 * band
+        for ty, tx in zip(*np.nonzero(active)):
+            y0, x0 = ty * tile, tx * tile
+            y1, x1 = min(y0 + tile, h), min(x0 + tile, w)
+            cy0, cx0 = max(0, y0 - margin), max(0, x0 - margin)
+            cy1, cx1 = min(h, y1 + margin), min(w, x1 + margin)
+            crop_known = known[cy0:cy1, cx0:cx1]
+            if not crop_known.any():
+                continue
+            inner = (slice(y0 - cy0, y1 - cy0), slice(x0 - cx0, x1 - cx0))
+            in_band = (cv2.dilate(crop_known.view(np.uint8), kernel) > 0) & ~crop_known
+            in_band = in_band[inner]
+            if not in_band.any():
+                continue
+            filled = self._push_pull_fill(img[cy0:cy1, cx0:cx1], crop_known)[inner]
+            result[y0:y1, x0:x1][in_band] = np.clip(filled[in_band] + 0.5, 0, 255).astype(np.uint8)
+        
+        return result
+    
+    def _push_pull_fill(self, img: np.ndarray, known: np.ndarray) -> np.ndarray:
+        """
+        Push-pull interpolation: averages known pixels down a 2x pyramid
+        (pull), then fills each level's gaps from the level above (push).
+        Known pixels keep their colour; returns float32.
+        """
+        import cv2
+        
+        weight = known.astype(np.float32)
+        colors = [img.astype(np.float32) * weight[..., None]]
+        weights = [weight]
+        while min(weights[-1].shape) > 1 and weights[-1].min() == 0:
+            h, w = weights[-1].shape
+            size = ((w + 1) // 2, (h + 1) // 2)
+            colors.append(cv2.resize(colors[-1], size, interpolation=cv2.INTER_AREA))
+            weights.append(cv2.resize(weights[-1], size, interpolation=cv2.INTER_AREA))
+        
+        # colors are premultiplied by coverage: colour = C / W where covered
+        filled = colors[-1] / np.maximum(weights[-1], 1e-6)[..., None]
+        for color, weight in zip(reversed(colors[:-1]), reversed(weights[:-1])):
+            up = cv2.resize(filled, (weight.shape[1], weight.shape[0]), interpolation=cv2.INTER_LINEAR)
+            filled = color + (1 - weight)[..., None] * up
+        return filled
+    
     def _decontaminate_colors(self, img: np.ndarray, alpha: np.ndarray) -> np.ndarray:
         """[EXTREME FIX] Aggressive color dilation - expand clean colors outward"""
         import cv2
@@ -792,9 +1511,20 @@ def api_endpoint(data: dict):
     
     POST Request:
     {
-        "image": "base64_string"
+        "image": "base64_string",
+        "backend": optional segmentation backend, e.g. "deeplab-mobilenet"
+    }
+    or, for a whole session in one call (see enhance_hair_batch):
+    {
+        "images": ["base64_string", ...],
+        "backend": ...
     }
     """
+    images_b64 = data.get("images")
+    if images_b64:
+        model = AutoHairModel()
+        return model.enhance_hair_batch.remote(images_b64, data.get("backend"))
+    
     image_b64 = data.get("image")
     
     if not image_b64:
@@ -802,7 +1532,7 @@ def api_endpoint(data: dict):
     
     # Process
     model = AutoHairModel()
-    result = model.enhance_hair.remote(image_b64)
+    result = model.enhance_hair.remote(image_b64, data.get("backend"))
     
     return result
 
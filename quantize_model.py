@@ -0,0 +1,138 @@
+"""
+INT8 quantization of the Silueta model with a mask-quality gate
+
+Produces api/silueta.int8.onnx from api/silueta.onnx, then runs both models
+over a local image set and compares their masks. The quantized model is only
+published if mean IoU and mean absolute alpha error stay within thresholds.
+Select it at runtime with REMOVE_BG_MODEL=silueta-int8 or ?model=silueta-int8.
+
+Usage:
+    python quantize_model.py --images ./samples [--mode static] [--min-iou 0.97] [--max-mae 0.02]
+
+--mode dynamic   weights INT8, activations quantized on the fly (no calibration)
+--mode static    weights and activations INT8, calibrated on --images (faster, needs data)
+"""
+import os
+import sys
+import glob
+import time
+import shutil
+import argparse
+import tempfile
+import numpy as np
+from PIL import Image
+import onnxruntime as ort
+from onnxruntime.quantization import (
+    quantize_dynamic, quantize_static, CalibrationDataReader, QuantFormat, QuantType
+)
+from onnxruntime.quantization.shape_inference import quant_pre_process
+
+API_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'api')
+sys.path.insert(0, API_DIR)
+from index import preprocess  # noqa: E402
+from _models import MODELS  # noqa: E402
+
+FP32_PATH = MODELS['silueta'].path
+INT8_PATH = MODELS['silueta-int8'].path
+
+
+def load_images(folder):
+    paths = sorted(p for ext in ('jpg', 'jpeg', 'png') for p in glob.glob(os.path.join(folder, f'*.{ext}')))
+    if not paths:
+        sys.exit(f"No images found in {folder}")
+    return [(os.path.basename(p), Image.open(p).convert("RGB")) for p in paths]
+
+
+class ImageCalibrationReader(CalibrationDataReader):
+    def __init__(self, images, input_name):
+        self._inputs = iter([{input_name: preprocess(img, MODELS['silueta'])} for _, img in images])
+
+    def get_next(self):
+        return next(self._inputs, None)
+
+
+def quantize(mode, images, output_path):
+    # Shape inference + graph cleanup first, as recommended for ORT quantization
+    prepared = output_path + '.prep.onnx'
+    quant_pre_process(FP32_PATH, prepared, skip_symbolic_shape=True)
+
+    if mode == 'dynamic':
+        quantize_dynamic(prepared, output_path, weight_type=QuantType.QUInt8)
+    else:
+        input_name = ort.InferenceSession(FP32_PATH).get_inputs()[0].name
+        quantize_static(
+            prepared, output_path, ImageCalibrationReader(images, input_name),
+            quant_format=QuantFormat.QDQ, per_channel=True,
+            activation_type=QuantType.QUInt8, weight_type=QuantType.QInt8,
+        )
+
+
+def predict_alpha(session, img):
+    # Same normalization as postprocess(), kept at model resolution
+    input_name = session.get_inputs()[0].name
+    ma = np.squeeze(session.run(None, {input_name: preprocess(img, MODELS['silueta'])})[0])
+    return (ma - ma.min()) / (ma.max() - ma.min() + 1e-8)
+
+
+def compare(fp32_path, int8_path, images):
+    """Per-image mask IoU (alpha > 0.5), mean absolute alpha error and latency"""
+    fp32 = ort.InferenceSession(fp32_path)
+    int8 = ort.InferenceSession(int8_path)
+    rows = []
+    for name, img in images:
+        t0 = time.perf_counter()
+        a = predict_alpha(fp32, img)
+        t1 = time.perf_counter()
+        b = predict_alpha(int8, img)
+        t2 = time.perf_counter()
+
+        fa, fb = a > 0.5, b > 0.5
+        union = np.logical_or(fa, fb).sum()
+        iou = np.logical_and(fa, fb).sum() / union if union else 1.0
+        rows.append({'name': name, 'iou': float(iou), 'mae': float(np.abs(a - b).mean()),
+                     'fp32_ms': (t1 - t0) * 1000, 'int8_ms': (t2 - t1) * 1000})
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--images', required=True, help='Folder of sample photos (quality gate + calibration)')
+    parser.add_argument('--mode', choices=['dynamic', 'static'], default='dynamic')
+    parser.add_argument('--min-iou', type=float, default=0.97, help='Minimum mean mask IoU vs FP32')
+    parser.add_argument('--max-mae', type=float, default=0.02, help='Maximum mean absolute alpha error (0..1)')
+    parser.add_argument('--output', default=INT8_PATH)
+    args = parser.parse_args()
+
+    if not os.path.exists(FP32_PATH):
+        sys.exit(f"Model file not found at {FP32_PATH}")
+    images = load_images(args.images)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        candidate = os.path.join(tmp, 'candidate.int8.onnx')
+        print(f"Quantizing ({args.mode}) {FP32_PATH}...")
+        quantize(args.mode, images, candidate)
+
+        rows = compare(FP32_PATH, candidate, images)
+        for r in rows:
+            print(f"  {r['name']:<32} IoU {r['iou']:.4f}  MAE {r['mae']:.4f}  "
+                  f"{r['fp32_ms']:.1f}ms -> {r['int8_ms']:.1f}ms")
+
+        mean_iou = float(np.mean([r['iou'] for r in rows]))
+        mean_mae = float(np.mean([r['mae'] for r in rows]))
+        fp32_ms = float(np.median([r['fp32_ms'] for r in rows]))
+        int8_ms = float(np.median([r['int8_ms'] for r in rows]))
+        print(f"Images: {len(rows)}  mean IoU {mean_iou:.4f} (min {args.min_iou})  "
+              f"mean MAE {mean_mae:.4f} (max {args.max_mae})")
+        print(f"Size: {os.path.getsize(FP32_PATH) / 1e6:.1f}MB -> {os.path.getsize(candidate) / 1e6:.1f}MB  "
+              f"Median latency: {fp32_ms:.1f}ms -> {int8_ms:.1f}ms")
+
+        if mean_iou < args.min_iou or mean_mae > args.max_mae:
+            print("❌ Quality gate failed; quantized model NOT published.")
+            sys.exit(1)
+
+        shutil.move(candidate, args.output)
+        print(f"✅ Quality gate passed; published {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,29 +1,130 @@
-
 from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
-from api.index import handler as APIHandler
+from urllib.parse import urlsplit
+from api.index import handler as APIHandler, metrics, model_label, enable_micro_batching, start_warmup, BATCH_WINDOW_MS
+from api._ingest import PayloadTooLarge, MAX_UPLOAD_BYTES, MAX_BATCH_UPLOAD_BYTES
+from server_workers import WorkerPool, WorkerUnavailable, PROCESSES
+import io
 import os
+import sys
+import json
+import http.client
+import signal
+import argparse
+
+# Leading bytes of a worker's response searched for its status line and headers
+RESPONSE_HEAD_BYTES = 64 * 1024
 
 class CORSRequestHandler(SimpleHTTPRequestHandler):
+    # Set to a WorkerPool in multi-process mode; API requests then run in workers
+    workers = None
+
     def end_headers(self):
         self.send_header('Access-Control-Allow-Origin', '*')
         self.send_header('Cache-Control', 'no-cache')
         super().end_headers()
 
     def do_POST(self):
-        if self.path == '/api/remove-bg':
+        if self.path.split('?')[0] in ('/api/remove-bg', '/api/remove-bg/batch'):
+            if self.workers:
+                return self.forward()
             # Correctly delegate to the APIHandler's method using the current instance
             APIHandler.do_POST(self)
         else:
             self.send_error(404)
 
     def do_GET(self):
-        if self.path == '/api/remove-bg':
+        path = self.path.split('?')[0]
+        if path in ('/api/remove-bg/live', '/api/remove-bg/ready') and self.workers:
+            # Answered here: alive while this process serves, ready once every worker has warmed up
+            if path.endswith('/live'):
+                return APIHandler.send_json(self, 200, {'status': 'alive'})
+            ready = self.workers.ready()
+            return APIHandler.send_json(self, 200 if ready else 503,
+                                        {'status': 'ready' if ready else 'warming', **self.workers.stats()})
+        if path == '/api/remove-bg/metrics' and self.workers:
+            # Recorded here from worker responses (see forward)
+            return APIHandler.send_metrics(self)
+        if path in ('/api/remove-bg', '/api/remove-bg/stats', '/api/remove-bg/live', '/api/remove-bg/ready',
+                    '/api/remove-bg/metrics'):
+            if self.workers:
+                return self.forward()
             # Correctly delegate to the APIHandler's method using the current instance
             APIHandler.do_GET(self)
+        elif path == '/api/server/stats' and self.workers:
+            body = json.dumps(self.workers.stats()).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
         else:
             super().do_GET()
 
-print("Starting Local Server on port 8000 (Threading)...")
-print("Open http://localhost:8000 in your browser.")
-httpd = ThreadingHTTPServer(('localhost', 8000), CORSRequestHandler)
-httpd.serve_forever()
+    def forward(self):
+        path = urlsplit(self.path).path
+        length = int(self.headers.get('Content-Length') or 0)
+        limit = MAX_BATCH_UPLOAD_BYTES if path.endswith('/batch') else MAX_UPLOAD_BYTES
+        if length > limit:
+            return APIHandler.send_too_large(self, PayloadTooLarge(f"Upload of {length} bytes exceeds the {limit} byte limit"))
+        if self.command != 'POST':
+            self.relay(length)
+            return
+        # Metrics live here: the workers' own registries are per process
+        endpoint = 'remove-bg/batch' if path.endswith('/batch') else 'remove-bg'
+        with metrics.request(endpoint, model_label(self)) as record:
+            record.status, record.timings = self.relay(length)
+
+    def relay(self, length):
+        """Run the request in a worker and send its response; returns (status, {stage: seconds})"""
+        def respond(raw):
+            # Complete response from the worker (status line, headers, body),
+            # written straight from its shared memory segment
+            self.wfile.write(raw)
+            return bytes(raw[:RESPONSE_HEAD_BYTES]).partition(b'\r\n\r\n')[0]
+
+        try:
+            head = self.workers.forward(self.command, self.path, self.request_version, self.headers,
+                                        self.rfile, length, self.client_address, respond)
+        except WorkerUnavailable as e:
+            self.send_error(503, str(e))
+            return 503, None
+        except Exception as e:
+            self.send_error(500, str(e))
+            return 500, None
+        self.close_connection = True
+        status_line, _, head = head.partition(b'\r\n')
+        headers = http.client.parse_headers(io.BytesIO(head))
+        return int(status_line.split()[1]), metrics.parse_server_timing(headers.get('Server-Timing'))
+
+def main():
+    parser = argparse.ArgumentParser(description="Local development server")
+    parser.add_argument('--processes', type=int, default=PROCESSES,
+                        help="API worker processes (0 = serve API requests in this process)")
+    args = parser.parse_args()
+
+    if args.processes > 0:
+        # API requests run in pre-forked workers, one request per worker at a time
+        CORSRequestHandler.workers = WorkerPool(args.processes)
+        print(f"Starting Local Server on port 8000 (Threading, {args.processes} worker processes)...")
+        print("Worker statistics: http://localhost:8000/api/server/stats")
+    else:
+        # Concurrent requests share batched inference (set REMOVE_BG_BATCH_WINDOW_MS to tune)
+        scheduler = enable_micro_batching(window_ms=BATCH_WINDOW_MS or 5)
+        print("Starting Local Server on port 8000 (Threading)...")
+        print(f"Micro-batching: {scheduler.window_ms:.1f}ms window (per model), max batch {scheduler.max_batch_size}")
+        # Dummy requests through the full path; /api/remove-bg/ready turns 200 when done
+        start_warmup()
+    print("Open http://localhost:8000 in your browser.")
+    httpd = ThreadingHTTPServer(('localhost', 8000), CORSRequestHandler)
+    # Stop workers and free shared memory on SIGTERM too
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if CORSRequestHandler.workers:
+            CORSRequestHandler.workers.close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,277 @@
+"""
+asyncio local server (alternative to server.py)
+
+server.py's ThreadingHTTPServer starts a thread per connection and every one
+of them calls straight into ONNX inference, so under load the CPU is
+oversubscribed and latency collapses. Here a single event loop owns the
+sockets (HTTP/1.1 keep-alive, static files) and /api/* requests run on a
+bounded worker pool:
+    - at most --workers requests execute at once (decode, inference, encode)
+    - up to --queue-limit more wait; beyond that the reply is 429 + Retry-After
+    - a request that waited longer than --queue-timeout is answered 503
+      without running
+The API code itself is the unchanged api/index.py handler, run against an
+in-memory request/response.
+
+Usage:
+    python server_async.py [--port 8001] [--workers 4] [--queue-limit 16] [--queue-timeout 10]
+Pool statistics: GET /api/server/stats
+"""
+import io
+import os
+import sys
+import json
+import time
+import argparse
+import asyncio
+import mimetypes
+import posixpath
+import http.client
+from urllib.parse import urlsplit, unquote
+from concurrent.futures import ThreadPoolExecutor
+
+from api.index import handler as APIHandler, metrics, model_label, enable_micro_batching, start_warmup, BATCH_WINDOW_MS
+from api._ingest import MAX_UPLOAD_BYTES, MAX_BATCH_UPLOAD_BYTES
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+API_POST_PATHS = ('/api/remove-bg', '/api/remove-bg/batch')
+# Health checks and metrics never touch a model: answered on the event loop, never shed
+INLINE_PATHS = ('/api/remove-bg/live', '/api/remove-bg/ready', '/api/remove-bg/metrics')
+API_GET_PATHS = ('/api/remove-bg', '/api/remove-bg/stats') + INLINE_PATHS
+MAX_HEADER_BYTES = 64 * 1024
+KEEPALIVE_TIMEOUT = 15.0
+
+
+class Saturated(Exception):
+    def __init__(self, status, message, retry_after=1):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+
+class BoundedPool:
+    """Thread pool with an admission limit; counters are only touched on the event loop"""
+
+    def __init__(self, workers, queue_limit, queue_timeout):
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self.queue_timeout = queue_timeout
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='api-worker')
+        self.pending = 0
+        self.max_pending = 0
+        self.counters = {'accepted': 0, 'completed': 0, 'rejected_429': 0, 'expired_503': 0}
+
+    async def run(self, fn):
+        if self.pending >= self.workers + self.queue_limit:
+            self.counters['rejected_429'] += 1
+            raise Saturated(429, f"Server busy: {self.pending} requests in flight")
+
+        self.pending += 1
+        self.max_pending = max(self.max_pending, self.pending)
+        self.counters['accepted'] += 1
+        enqueued = time.monotonic()
+
+        def job():
+            # Checked when a worker picks the job up: stale requests are not run
+            if time.monotonic() - enqueued > self.queue_timeout:
+                raise Saturated(503, f"Queued for more than {self.queue_timeout:.0f}s")
+            return fn()
+
+        try:
+            result = await asyncio.get_running_loop().run_in_executor(self.executor, job)
+            self.counters['completed'] += 1
+            return result
+        except Saturated:
+            self.counters['expired_503'] += 1
+            raise
+        finally:
+            self.pending -= 1
+
+    def stats(self):
+        return {
+            'workers': self.workers,
+            'queue_limit': self.queue_limit,
+            'queue_timeout_s': self.queue_timeout,
+            'in_flight': self.pending,
+            'max_in_flight': self.max_pending,
+            **self.counters,
+        }
+
+
+class BufferedRequest(APIHandler):
+    """
+    The api/index.py handler run against an in-memory request: body (bytes or a
+    readable binary file) in rfile, the complete raw HTTP response collected in
+    wfile.
+    """
+    protocol_version = 'HTTP/1.1'
+
+    def __init__(self, method, target, version, headers, body, client_address):
+        self.command = method
+        self.path = target
+        self.request_version = version
+        self.requestline = f"{method} {target} {version}"
+        self.headers = headers
+        self.rfile = io.BytesIO(body) if isinstance(body, bytes) else body
+        self.wfile = io.BytesIO()
+        self.client_address = client_address
+        self.server = None
+        self.close_connection = False
+
+    def dispatch(self):
+        path = urlsplit(self.path).path
+        if self.command == 'POST' and path in API_POST_PATHS:
+            APIHandler.do_POST(self)
+        elif self.command == 'GET' and path in API_GET_PATHS:
+            APIHandler.do_GET(self)
+        elif self.command == 'OPTIONS':
+            APIHandler.do_OPTIONS(self)
+        else:
+            self.send_error(404)
+        return self.wfile.getvalue()
+
+
+def frame_response(raw, keep_alive):
+    """
+    Make a buffered handler response safe for a persistent connection: ensure
+    Content-Length and the Connection header. Returns (bytes, keep_alive).
+    """
+    head, sep, body = raw.partition(b'\r\n\r\n')
+    lines = head.split(b'\r\n')
+    headers = [line for line in lines[1:] if not line.lower().startswith((b'content-length:', b'connection:'))]
+    if any(line.lower() == b'connection: close' for line in lines[1:]):
+        keep_alive = False
+    headers.append(b'Content-Length: %d' % len(body))
+    headers.append(b'Connection: keep-alive' if keep_alive else b'Connection: close')
+    return b'\r\n'.join([lines[0]] + headers) + sep + body, keep_alive
+
+
+def simple_response(status, body=b'', content_type='text/plain', extra=(), keep_alive=True):
+    reason = http.client.responses.get(status, '')
+    lines = [f"HTTP/1.1 {status} {reason}", f"Content-Type: {content_type}",
+             f"Content-Length: {len(body)}", "Access-Control-Allow-Origin: *",
+             f"Connection: {'keep-alive' if keep_alive else 'close'}", *extra]
+    return ('\r\n'.join(lines) + '\r\n\r\n').encode() + body
+
+
+def static_response(method, target, keep_alive):
+    # Same files SimpleHTTPRequestHandler would serve from the repo root
+    path = posixpath.normpath(unquote(urlsplit(target).path))
+    full = os.path.join(ROOT, *[p for p in path.split('/') if p and p not in ('.', '..')])
+    if os.path.isdir(full):
+        full = os.path.join(full, 'index.html')
+    if not os.path.isfile(full):
+        return simple_response(404, b'Not Found', keep_alive=keep_alive)
+    with open(full, 'rb') as f:
+        data = f.read()
+    content_type = mimetypes.guess_type(full)[0] or 'application/octet-stream'
+    response = simple_response(200, data, content_type, ('Cache-Control: no-cache',), keep_alive)
+    if method == 'HEAD':
+        response = response[:len(response) - len(data)]
+    return response
+
+
+class AsyncServer:
+    def __init__(self, pool):
+        self.pool = pool
+
+    async def handle_connection(self, reader, writer):
+        peer = writer.get_extra_info('peername') or ('', 0)
+        try:
+            keep_alive = True
+            while keep_alive:
+                try:
+                    head = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), KEEPALIVE_TIMEOUT)
+                except (asyncio.TimeoutError, asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+                    break
+                response, keep_alive = await self.handle_request(head, reader, peer)
+                writer.write(response)
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def handle_request(self, head, reader, peer):
+        request_line, _, header_block = head.partition(b'\r\n')
+        try:
+            method, target, version = request_line.decode('latin-1').split()
+        except ValueError:
+            return simple_response(400, b'Bad Request', keep_alive=False), False
+        headers = http.client.parse_headers(io.BytesIO(header_block))
+        connection = (headers.get('Connection') or '').lower()
+        keep_alive = connection != 'close' if version == 'HTTP/1.1' else connection == 'keep-alive'
+
+        path = urlsplit(target).path
+        length = (headers.get('Content-Length') or '0').strip()
+        if not (length.isascii() and length.isdigit()):
+            # Unknown body length: the connection can't be reused
+            return simple_response(400, b'Bad Request: invalid Content-Length', keep_alive=False), False
+        length = int(length)
+        limit = MAX_BATCH_UPLOAD_BYTES if path.endswith('/batch') else MAX_UPLOAD_BYTES
+        if length > limit:
+            # Refuse before reading; the unread body makes the connection unusable
+            body = f"Payload Too Large: upload of {length} bytes exceeds the {limit} byte limit".encode()
+            return simple_response(413, body, keep_alive=False), False
+        try:
+            body = await reader.readexactly(length) if length else b''
+        except asyncio.IncompleteReadError:
+            # Client closed before sending the whole body: nobody to answer
+            return b'', False
+
+        if path == '/api/server/stats':
+            data = json.dumps(self.pool.stats()).encode()
+            return simple_response(200, data, 'application/json', keep_alive=keep_alive), keep_alive
+        if not path.startswith('/api/'):
+            if method not in ('GET', 'HEAD'):
+                return simple_response(405, b'Method Not Allowed', keep_alive=keep_alive), keep_alive
+            response = await asyncio.to_thread(static_response, method, target, keep_alive)
+            return response, keep_alive
+
+        request = BufferedRequest(method, target, version, headers, body, peer)
+        if path in INLINE_PATHS:
+            return frame_response(request.dispatch(), keep_alive)
+        try:
+            raw = await self.pool.run(request.dispatch)
+        except Saturated as e:
+            if method == 'POST':
+                metrics.record('remove-bg/batch' if path.endswith('/batch') else 'remove-bg', model_label(request), e.status)
+            return simple_response(e.status, str(e).encode(), extra=(f"Retry-After: {e.retry_after}",),
+                                   keep_alive=keep_alive), keep_alive
+        return frame_response(raw, keep_alive)
+
+
+async def serve(host, port, pool):
+    server = AsyncServer(pool)
+    listener = await asyncio.start_server(server.handle_connection, host, port, limit=MAX_HEADER_BYTES)
+    async with listener:
+        await listener.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='localhost')
+    parser.add_argument('--port', type=int, default=8001)
+    parser.add_argument('--workers', type=int, default=int(os.environ.get('REMOVE_BG_WORKERS', '4')))
+    parser.add_argument('--queue-limit', type=int, default=int(os.environ.get('REMOVE_BG_QUEUE_LIMIT', '16')))
+    parser.add_argument('--queue-timeout', type=float, default=float(os.environ.get('REMOVE_BG_QUEUE_TIMEOUT_S', '10')))
+    args = parser.parse_args()
+
+    # Workers share batched inference, as in server.py
+    scheduler = enable_micro_batching(window_ms=BATCH_WINDOW_MS or 5)
+    pool = BoundedPool(args.workers, args.queue_limit, args.queue_timeout)
+    # Dummy requests through the full path; /api/remove-bg/ready turns 200 when done
+    start_warmup()
+
+    print(f"Starting Local Server on port {args.port} (asyncio)...")
+    print(f"Workers: {args.workers}, queue limit {args.queue_limit}, queue timeout {args.queue_timeout:.0f}s")
+    print(f"Micro-batching: {scheduler.window_ms:.1f}ms window (per model), max batch {scheduler.max_batch_size}")
+    print(f"Open http://{args.host}:{args.port} in your browser.")
+    try:
+        asyncio.run(serve(args.host, args.port, pool))
+    except KeyboardInterrupt:
+        sys.exit(0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,351 @@
+"""
+Pre-fork worker processes for server.py (--processes N)
+
+In one process only session.run releases the GIL, so decode, preprocessing,
+PNG encoding and compositing of concurrent requests serialize on a single
+core. With --processes N the server process only speaks HTTP; /api/* requests
+are handed to N worker processes, each with its own sessions, mask cache
+memory tier and ORT thread budget (cores / N unless ORT_INTRA_OP_THREADS is
+set). The disk cache tier is shared.
+
+Workers are forked from a forkserver that has already imported api.index, so
+numpy / onnxruntime / PIL are loaded once and a restarted worker is up in
+milliseconds. Upload bodies and responses cross the process boundary through
+shared memory segments owned by the server process; the pipe to each worker
+only carries small control messages. The server reads the upload straight into
+a segment and writes the response to the client straight from one; the worker
+streams the body out of its segment and copies the finished response in, so
+neither body is copied whole on either side:
+    server -> worker   ('request', method, target, version, headers, peer,
+                        body segment, body length, response segment)
+    worker -> server   ('grow', n)      response segment is too small
+    server -> worker   ('segment', name) re-allocated response segment
+    worker -> server   ('response', n) | ('error', message)
+
+Each worker warms up (api.index.warm_up) before taking requests and sets its
+ready event when done. A supervisor thread restarts workers that die; a
+request that was running in one is answered 503. A worker that does not
+answer within REMOVE_BG_REQUEST_TIMEOUT_S is killed and replaced the same way.
+
+Config (env):
+    REMOVE_BG_PROCESSES          worker processes (0 = serve in-process, the default)
+    REMOVE_BG_WORKER_TIMEOUT_S   how long a request waits for an idle worker before 503
+    REMOVE_BG_REQUEST_TIMEOUT_S  how long a worker may take to answer before it is killed (503)
+"""
+import os
+import io
+import queue
+import signal
+import threading
+import http.client
+import multiprocessing
+from multiprocessing import shared_memory
+
+PROCESSES = int(os.environ.get('REMOVE_BG_PROCESSES', '0'))
+WORKER_TIMEOUT = float(os.environ.get('REMOVE_BG_WORKER_TIMEOUT_S', '30'))
+REQUEST_TIMEOUT = float(os.environ.get('REMOVE_BG_REQUEST_TIMEOUT_S', '120'))
+RESPONSE_SEGMENT_BYTES = 4 * 1024 * 1024
+SUPERVISE_INTERVAL = 0.5
+
+
+class WorkerUnavailable(Exception):
+    """No worker could serve the request; answered 503"""
+
+
+class WorkerTimeout(Exception):
+    """A worker did not answer in time"""
+
+
+class Segment:
+    """Growable shared memory segment, created and unlinked by the server process"""
+
+    def __init__(self, size):
+        self.shm = shared_memory.SharedMemory(create=True, size=size)
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    @property
+    def size(self):
+        return self.shm.size
+
+    def ensure(self, size):
+        if size > self.shm.size:
+            self.release()
+            self.shm = shared_memory.SharedMemory(create=True, size=max(size, self.shm.size * 2))
+        return self
+
+    def release(self):
+        self.shm.close()
+        try:
+            self.shm.unlink()
+        except FileNotFoundError:
+            pass
+
+
+class _Worker:
+    def __init__(self, index, context, processes):
+        self.index = index
+        self.context = context
+        self.processes = processes
+        self.response = Segment(RESPONSE_SEGMENT_BYTES)
+        self.process = None
+        self.conn = None
+        self.busy = False
+        self.requests = 0
+        self.restarts = 0
+        self.lock = threading.Lock()
+        self.start()
+
+    def start(self):
+        parent_conn, child_conn = self.context.Pipe()
+        self.warm = self.context.Event()
+        self.process = self.context.Process(
+            target=worker_main, args=(self.index, child_conn, self.processes, self.warm),
+            name=f"remove-bg-worker-{self.index}", daemon=True,
+        )
+        self.process.start()
+        # Only the child keeps its end, so recv() sees EOF if the child dies
+        child_conn.close()
+        self.conn = parent_conn
+
+    def restart(self):
+        with self.lock:
+            if self.process.is_alive():
+                return
+            self.conn.close()
+            self.process.join(timeout=0)
+            self.restarts += 1
+            print(f"Worker {self.index} (pid {self.process.pid}) exited with {self.process.exitcode}; restarting")
+            self.start()
+
+    def kill(self):
+        """Stop a hung worker; restart() replaces it"""
+        self.process.kill()
+        self.process.join(timeout=5)
+
+    def call(self, message, timeout):
+        """
+        Send a request and wait for ('response', n); returns a view of the response
+        in this worker's segment, valid until the worker takes another request
+        """
+        self.conn.send(message)
+        while True:
+            if not self.conn.poll(timeout):
+                raise WorkerTimeout(f"Worker {self.index} did not answer within {timeout:.0f}s")
+            reply = self.conn.recv()
+            if reply[0] == 'grow':
+                self.response.ensure(reply[1])
+                self.conn.send(('segment', self.response.name))
+            elif reply[0] == 'response':
+                return self.response.shm.buf[:reply[1]]
+            else:
+                raise RuntimeError(reply[1])
+
+    def stop(self):
+        try:
+            self.conn.send(('stop',))
+        except OSError:
+            pass
+        self.process.join(timeout=2)
+        if self.process.is_alive():
+            self.process.terminate()
+        self.conn.close()
+        self.response.release()
+
+
+class WorkerPool:
+    def __init__(self, processes, timeout=WORKER_TIMEOUT, request_timeout=REQUEST_TIMEOUT):
+        methods = multiprocessing.get_all_start_methods()
+        if 'forkserver' in methods:
+            context = multiprocessing.get_context('forkserver')
+            # Imported once in the fork server, inherited by every worker
+            context.set_forkserver_preload(['server_workers', 'server_async'])
+        else:
+            context = multiprocessing.get_context('spawn')
+        self.timeout = timeout
+        self.request_timeout = request_timeout
+        self.workers = [_Worker(i, context, processes) for i in range(processes)]
+        self._idle = queue.Queue()
+        for worker in self.workers:
+            self._idle.put(worker)
+        # Upload segments are pooled: one per concurrently forwarded request
+        self._segments = queue.LifoQueue()
+        self._closed = threading.Event()
+        self._supervisor = threading.Thread(target=self._supervise, name='remove-bg-supervisor', daemon=True)
+        self._supervisor.start()
+
+    def _supervise(self):
+        while not self._closed.wait(SUPERVISE_INTERVAL):
+            for worker in self.workers:
+                # Busy workers are restarted by the request that finds them dead
+                if not worker.busy and not worker.process.is_alive():
+                    worker.restart()
+
+    def _read_body(self, rfile, length):
+        try:
+            segment = self._segments.get_nowait()
+        except queue.Empty:
+            segment = Segment(max(length, 1))
+        segment.ensure(length)
+        view = segment.shm.buf[:length]
+        try:
+            received = 0
+            while received < length:
+                n = rfile.readinto(view[received:])
+                if not n:
+                    raise ValueError(f"Body ended after {received} of {length} bytes")
+                received += n
+        except Exception:
+            view.release()
+            self._segments.put(segment)
+            raise
+        view.release()
+        return segment
+
+    def forward(self, method, target, version, headers, rfile, length, peer, respond):
+        """
+        Run an API request in a worker and pass the raw HTTP response to
+        respond(view), a memoryview of the worker's response segment that is only
+        valid during the call. Returns what respond returns.
+        """
+        body = self._read_body(rfile, length) if length else None
+        try:
+            try:
+                worker = self._idle.get(timeout=self.timeout)
+            except queue.Empty:
+                raise WorkerUnavailable(f"All {len(self.workers)} workers busy for {self.timeout:.0f}s")
+            worker.busy = True
+            try:
+                if not worker.process.is_alive():
+                    worker.restart()
+                message = ('request', method, target, version, list(headers.items()), peer,
+                           body.name if body else None, length, worker.response.name)
+                raw = worker.call(message, self.request_timeout)
+                worker.requests += 1
+            except WorkerTimeout as e:
+                # Hung (stuck in ORT, a pathological decode...): replace it, fail this request
+                worker.kill()
+                worker.restart()
+                raise WorkerUnavailable(str(e))
+            except (EOFError, OSError):
+                # The worker died mid-request: replace it, fail this request
+                worker.process.join(timeout=1)
+                worker.restart()
+                raise WorkerUnavailable(f"Worker {worker.index} exited while serving the request")
+            else:
+                # Before the worker is released: its next request reuses the segment
+                try:
+                    return respond(raw)
+                finally:
+                    raw.release()
+            finally:
+                worker.busy = False
+                self._idle.put(worker)
+        finally:
+            if body:
+                self._segments.put(body)
+
+    def ready(self):
+        return all(worker.warm.is_set() and worker.process.is_alive() for worker in self.workers)
+
+    def stats(self):
+        return {
+            'processes': len(self.workers),
+            'idle': self._idle.qsize(),
+            'workers': [{
+                'pid': worker.process.pid,
+                'alive': worker.process.is_alive(),
+                'busy': worker.busy,
+                'warm': worker.warm.is_set(),
+                'requests': worker.requests,
+                'restarts': worker.restarts,
+            } for worker in self.workers],
+        }
+
+    def close(self):
+        self._closed.set()
+        for worker in self.workers:
+            worker.stop()
+        while not self._segments.empty():
+            self._segments.get_nowait().release()
+
+
+class _SegmentReader(io.RawIOBase):
+    """Readable file over a shared memory view; reads copy only what they return"""
+
+    def __init__(self, view):
+        self.view = view
+        self.pos = 0
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        n = min(len(buffer), len(self.view) - self.pos)
+        buffer[:n] = self.view[self.pos:self.pos + n]
+        self.pos += n
+        return n
+
+
+def _attach(segments, name):
+    if name not in segments:
+        segments[name] = shared_memory.SharedMemory(name=name)
+    return segments[name]
+
+
+def _headers(items):
+    message = http.client.HTTPMessage()
+    for key, value in items:
+        message[key] = value
+    return message
+
+
+def worker_main(index, conn, processes, warm):
+    # Split the cores between workers unless the thread count is configured
+    os.environ.setdefault('ORT_INTRA_OP_THREADS', str(max(1, (os.cpu_count() or 1) // processes)))
+    # Ctrl+C is handled by the server process, which stops the workers
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    from server_async import BufferedRequest
+    from api.index import warm_up
+
+    try:
+        warm_up()
+        warm.set()
+    except Exception as e:
+        # Still serve; readiness stays 503 so the problem is visible
+        print(f"Worker {index} warm-up failed: {e}")
+
+    segments = {}
+    while True:
+        try:
+            message = conn.recv()
+        except EOFError:
+            break
+        if message[0] == 'stop':
+            break
+        _, method, target, version, header_items, peer, body_name, length, response_name = message
+        try:
+            body = _SegmentReader(_attach(segments, body_name).buf[:length]) if body_name else b''
+            try:
+                request = BufferedRequest(method, target, version, _headers(header_items), body, tuple(peer))
+                # The server process closes the connection after each forwarded response
+                request.protocol_version = 'HTTP/1.0'
+                raw = request.dispatch()
+            finally:
+                if body:
+                    body.view.release()
+
+            out = _attach(segments, response_name)
+            if len(raw) > out.size:
+                conn.send(('grow', len(raw)))
+                _, response_name = conn.recv()
+                out = _attach(segments, response_name)
+            out.buf[:len(raw)] = raw
+            conn.send(('response', len(raw)))
+        except Exception as e:
+            conn.send(('error', f"{type(e).__name__}: {e}"))
+        # Segments the server has re-allocated are no longer needed
+        for name in [n for n in segments if n not in (body_name, response_name)]:
+            segments.pop(name).close()